@@ -0,0 +1,270 @@
+"""
+BM25 Benchmark
+Per-query latency of BM25 retrieval as the collection grows
+
+Uses a synthetic corpus with a Zipfian vocabulary so that common terms
+have long posting lists, like "policy" or "employee" in the HR corpus.
+
+Usage:
+    python benchmarks/bench_bm25.py lookup [sizes...]
+    python benchmarks/bench_bm25.py engine [sizes...]
+    python benchmarks/bench_bm25.py pruning [sizes...]
+    python benchmarks/bench_bm25.py incremental [sizes...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+DEFAULT_SIZES = {
+    'lookup': [1_000, 10_000, 100_000, 1_000_000],
+    'engine': [10_000, 100_000, 1_000_000],
+    'pruning': [10_000, 100_000, 1_000_000],
+    'incremental': [10_000, 100_000, 1_000_000],
+}
+VOCAB_SIZE = 20_000
+DOC_LENGTH = 40
+TOP_K = 5
+NUM_QUERIES = 50
+NUM_BASELINE_QUERIES = 10  # rank_bm25 is slow at 1M docs
+SCORE_TOLERANCE = 1e-6
+NEW_FILE_CHUNKS = 20       # chunks in one newly ingested policy file
+SOURCE_FILES = ["employee_handbook.txt", "hr_faq.txt", "it_policies.txt", "gdpr_faq.txt", "gdpr_summary.txt"]
+
+
+def make_corpus(num_docs, seed=0):
+    """Generate documents, ids and metadata with Zipf-distributed terms"""
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"term{i}" for i in range(VOCAB_SIZE)])
+    term_ids = np.minimum(rng.zipf(1.2, size=(num_docs, DOC_LENGTH)) - 1, VOCAB_SIZE - 1)
+    documents = [" ".join(vocab[row]) for row in term_ids]
+    doc_ids = [f"doc_{i}" for i in range(num_docs)]
+    metadatas = [{'source_file': SOURCE_FILES[i % len(SOURCE_FILES)]} for i in range(num_docs)]
+    return documents, doc_ids, metadatas
+
+
+def make_queries(seed=1):
+    """Mix of common and rare terms"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(NUM_QUERIES):
+        common = rng.integers(0, 50, size=2)
+        rare = rng.integers(50, 2_000, size=2)
+        queries.append(" ".join(f"term{i}" for i in np.concatenate([common, rare])))
+    return queries
+
+
+def legacy_source_lookup(hits, documents, metadatas):
+    """
+    Previous RetrievalAgent.bm25_search source resolution
+
+    Copies the whole collection (standing in for collection.get(), which
+    is cheaper here than the real SQLite round trip), keys it on the
+    first 50 characters and substring-scans for every hit.
+    """
+    all_documents = list(documents)
+    all_metadatas = [dict(m) for m in metadatas]
+    doc_to_source = {}
+    for i, metadata in enumerate(all_metadatas):
+        doc_to_source[all_documents[i][:50]] = metadata.get('source_file', 'unknown')
+
+    sources = []
+    for idx in hits:
+        source = 'unknown'
+        for key, val in doc_to_source.items():
+            if key in documents[idx]:
+                source = val
+                break
+        sources.append(source)
+    return sources
+
+
+def positional_source_lookup(index, hits):
+    """Current resolution through the index's positional metadata table"""
+    return [index.get_document(idx)['source'] for idx in hits]
+
+
+def bench_source_lookup(sizes):
+    """Per-query cost of resolving BM25 hits to their source"""
+    from hybrid_search import HybridSearch
+
+    print("Source resolution per query (ms)")
+    print(f"{'Docs':>10}{'legacy scan':>16}{'positional':>16}")
+    for num_docs in sizes:
+        documents, doc_ids, metadatas = make_corpus(num_docs)
+        index = HybridSearch(documents, doc_ids=doc_ids, metadatas=metadatas)
+
+        rng = np.random.default_rng(2)
+        hit_lists = [rng.integers(0, num_docs, size=TOP_K) for _ in range(5)]
+
+        start_time = time.perf_counter()
+        for hits in hit_lists:
+            legacy_source_lookup(hits, documents, metadatas)
+        legacy_ms = (time.perf_counter() - start_time) * 1000 / len(hit_lists)
+
+        start_time = time.perf_counter()
+        for _ in range(NUM_QUERIES):
+            for hits in hit_lists:
+                positional_source_lookup(index, hits)
+        positional_ms = (time.perf_counter() - start_time) * 1000 / (NUM_QUERIES * len(hit_lists))
+
+        print(f"{num_docs:>10}{legacy_ms:>16.3f}{positional_ms:>16.4f}")
+    print()
+
+
+def bench_engine(sizes):
+    """Inverted-index BM25Index vs dense rank_bm25.BM25Okapi scoring"""
+    from rank_bm25 import BM25Okapi
+    from hybrid_search import BM25Index, tokenize
+
+    queries = [tokenize(q) for q in make_queries()]
+
+    print("Top-k query latency (ms) and score parity")
+    print(f"{'Docs':>10}{'BM25Okapi':>14}{'BM25Index':>14}{'Speedup':>10}{'Max |diff|':>14}")
+    for num_docs in sizes:
+        documents, _, _ = make_corpus(num_docs)
+        tokenized_docs = [tokenize(doc) for doc in documents]
+        baseline = BM25Okapi(tokenized_docs)
+        index = BM25Index(tokenized_docs)
+        del tokenized_docs
+
+        start_time = time.perf_counter()
+        for query in queries[:NUM_BASELINE_QUERIES]:
+            scores = baseline.get_scores(query)
+            np.argsort(scores)[::-1][:TOP_K]
+        baseline_ms = (time.perf_counter() - start_time) * 1000 / NUM_BASELINE_QUERIES
+
+        start_time = time.perf_counter()
+        for query in queries:
+            index.top_k(query, TOP_K)
+        index_ms = (time.perf_counter() - start_time) * 1000 / len(queries)
+
+        max_diff = max(
+            np.abs(baseline.get_scores(q) - index.get_scores(q)).max()
+            for q in queries[:NUM_BASELINE_QUERIES]
+        )
+        status = "✓" if max_diff <= SCORE_TOLERANCE else "✗"
+
+        print(
+            f"{num_docs:>10}{baseline_ms:>14.2f}{index_ms:>14.2f}"
+            f"{baseline_ms / index_ms:>9.1f}x{max_diff:>12.1e} {status}"
+        )
+    print()
+
+
+def bench_pruning(sizes):
+    """Block-max pruned top-k vs exhaustive scoring over the inverted index"""
+    from hybrid_search import BM25Index, tokenize
+
+    queries = [tokenize(q) for q in make_queries()]
+
+    print("Postings visited per query and latency (ms)")
+    print(f"{'Docs':>10}{'Postings':>12}{'Visited':>12}{'Saved':>8}"
+          f"{'Exhaustive':>12}{'Pruned':>10}{'Same top-k':>12}")
+    for num_docs in sizes:
+        documents, _, _ = make_corpus(num_docs)
+        index = BM25Index([tokenize(doc) for doc in documents])
+        index.top_k_pruned(queries[0], TOP_K)  # compute block bounds outside the timing
+
+        start_time = time.perf_counter()
+        exhaustive = [index.top_k(q, TOP_K) for q in queries]
+        exhaustive_ms = (time.perf_counter() - start_time) * 1000 / len(queries)
+
+        before = index.postings_stats()['block_max']
+        start_time = time.perf_counter()
+        pruned = [index.top_k_pruned(q, TOP_K) for q in queries]
+        pruned_ms = (time.perf_counter() - start_time) * 1000 / len(queries)
+        after = index.postings_stats()['block_max']
+
+        total = (after['postings_total'] - before['postings_total']) / len(queries)
+        visited = (after['postings_visited'] - before['postings_visited']) / len(queries)
+        identical = all(
+            np.array_equal(e[0], p[0]) and np.array_equal(e[1], p[1])
+            for e, p in zip(exhaustive, pruned)
+        )
+
+        print(
+            f"{num_docs:>10}{total:>12.0f}{visited:>12.0f}{1 - visited / total:>7.0%}"
+            f"{exhaustive_ms:>12.2f}{pruned_ms:>10.2f}{'✓' if identical else '✗':>12}"
+        )
+    print()
+
+
+def bench_incremental(sizes):
+    """Ingesting one new file incrementally vs rebuilding the whole index"""
+    from hybrid_search import HybridSearch
+
+    queries = make_queries()
+
+    print(f"Cost of adding one file ({NEW_FILE_CHUNKS} chunks) and deleting it again")
+    print(f"{'Docs':>10}{'Rebuild (s)':>14}{'Add (ms)':>10}{'Delete (ms)':>13}"
+          f"{'Query (ms)':>12}{'Merge (s)':>11}{'Same top-k':>12}")
+    for num_docs in sizes:
+        documents, doc_ids, metadatas = make_corpus(num_docs + NEW_FILE_CHUNKS)
+        base = slice(0, num_docs)
+        new = slice(num_docs, num_docs + NEW_FILE_CHUNKS)
+
+        index = HybridSearch(documents[base], doc_ids=doc_ids[base], metadatas=metadatas[base])
+        index._ensure_positions()  # one-off id map, paid on the first write
+
+        start_time = time.perf_counter()
+        index.add_documents(doc_ids[new], documents[new], metadatas[new])
+        add_ms = (time.perf_counter() - start_time) * 1000
+
+        start_time = time.perf_counter()
+        incremental = [index.bm25_search(q, TOP_K) for q in queries]
+        query_ms = (time.perf_counter() - start_time) * 1000 / len(queries)
+
+        start_time = time.perf_counter()
+        rebuilt = HybridSearch(documents, doc_ids=doc_ids, metadatas=metadatas)
+        rebuild_s = time.perf_counter() - start_time
+        expected = [rebuilt.bm25_search(q, TOP_K) for q in queries]
+        identical = all(
+            [r['doc_id'] for r in got] == [r['doc_id'] for r in want]
+            and np.allclose([r['score'] for r in got], [r['score'] for r in want], atol=SCORE_TOLERANCE)
+            for got, want in zip(incremental, expected)
+        )
+        del rebuilt
+
+        start_time = time.perf_counter()
+        index.delete_documents(doc_ids[new])
+        index.bm25_search(queries[0], TOP_K)  # includes the IDF refresh
+        delete_ms = (time.perf_counter() - start_time) * 1000
+
+        index.delete_documents(doc_ids[:num_docs // 100])
+        start_time = time.perf_counter()
+        index.merge()
+        merge_s = time.perf_counter() - start_time
+
+        print(
+            f"{num_docs:>10}{rebuild_s:>14.2f}{add_ms:>10.1f}{delete_ms:>13.1f}"
+            f"{query_ms:>12.2f}{merge_s:>11.2f}{'✓' if identical else '✗':>12}"
+        )
+    print()
+
+
+BENCHMARKS = {
+    'lookup': bench_source_lookup,
+    'engine': bench_engine,
+    'pruning': bench_pruning,
+    'incremental': bench_incremental,
+}
+
+
+def main():
+    name = sys.argv[1] if len(sys.argv) > 1 else 'engine'
+    sizes = [int(arg) for arg in sys.argv[2:]] or DEFAULT_SIZES[name]
+
+    print("=" * 70)
+    print("📚 BM25 BENCHMARK")
+    print("=" * 70 + "\n")
+
+    BENCHMARKS[name](sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Context Packing Benchmark
+Prompt tokens and answer coverage: packed and compressed context vs the fixed 400-character cut
+
+Each question in benchmarks/data/context_questions.json lists the
+documents retrieved for it (the answering document is never first) and
+the phrases an answer needs. Coverage is the share of those phrases that
+make it into the synthesis prompt.
+
+Compressed rows embed sentences with the shared MiniLM encoder and are
+skipped when sentence-transformers is not installed.
+
+Usage:
+    python benchmarks/bench_context_packing.py [budgets...]
+"""
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from context_compressor import ContextCompressor
+from context_packer import ContextPacker, make_token_counter
+from synthesis_agent import SynthesisAgent
+
+DOCUMENTS_PATH = os.path.join(ROOT_DIR, "data", "processed", "processed_documents.json")
+QUESTIONS_PATH = os.path.join(ROOT_DIR, "benchmarks", "data", "context_questions.json")
+DEFAULT_BUDGETS = [150, 300, 400, 600]
+LEGACY_CHARS = 400
+
+
+def legacy_format(documents):
+    """format_documents_for_synthesis before context packing"""
+    formatted = "## RETRIEVED DOCUMENTS:\n\n"
+    for i, doc in enumerate(documents, 1):
+        formatted += f"[Document {i}] Source: {doc.get('source', 'unknown')}\n"
+        formatted += f"Content: {doc['content'][:LEGACY_CHARS]}...\n\n"
+    return formatted
+
+
+def select_context_with(agent, packer, compressor):
+    """format_documents_for_synthesis with the given packer and compressor"""
+    def format_context(query, documents):
+        agent.packer, agent.compressor = packer, compressor
+        return agent.format_documents_for_synthesis(documents, query)
+    return format_context
+
+
+def main():
+    budgets = [int(arg) for arg in sys.argv[1:]] or DEFAULT_BUDGETS
+
+    with open(DOCUMENTS_PATH, 'r', encoding='utf-8') as f:
+        documents_by_source = {doc['source_file']: dict(doc, source=doc['source_file']) for doc in json.load(f)}
+    with open(QUESTIONS_PATH, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+
+    print("=" * 70)
+    print("📦 CONTEXT PACKING BENCHMARK")
+    print("=" * 70 + "\n")
+
+    count_tokens = make_token_counter()
+    agent = SynthesisAgent(groq_api_key=os.getenv("GROQ_API_KEY") or "unset")
+    formatters = {f"legacy {LEGACY_CHARS} chars": lambda query, documents: legacy_format(documents)}
+    for budget in budgets:
+        packer = ContextPacker(budget=budget, token_counter=count_tokens)
+        formatters[f"packed {budget}"] = select_context_with(agent, packer, None)
+
+    compressors = {}
+    try:
+        import sentence_transformers  # noqa: F401
+    except ImportError:
+        print("⚠️  sentence-transformers not installed, skipping compressed context\n")
+    else:
+        for budget in budgets:
+            packer = ContextPacker(budget=budget, token_counter=count_tokens)
+            compressors[budget] = ContextCompressor(token_counter=count_tokens)
+            formatters[f"compressed {budget}"] = select_context_with(agent, packer, compressors[budget])
+
+    print(f"{len(questions)} questions\n")
+    print(f"{'Context':>20}{'tokens':>9}{'coverage':>10}{'answered':>10}")
+    for name, format_context in formatters.items():
+        tokens = coverage = answered = 0
+        for question in questions:
+            documents = [documents_by_source[source] for source in question['sources']]
+            context = format_context(question['query'], documents)
+            found = [term in context for term in question['answer_terms']]
+            tokens += count_tokens(context)
+            coverage += sum(found) / len(found)
+            answered += all(found)
+        print(f"{name:>20}{tokens / len(questions):>9.0f}{coverage / len(questions):>10.2f}"
+              f"{answered / len(questions):>10.2f}")
+    print()
+
+    if compressors:
+        print(f"{'Budget':>8}{'compression':>13}{'prompt tokens saved':>21}")
+        for budget, compressor in compressors.items():
+            stats = compressor.stats()
+            print(f"{budget:>8}{stats['compression_ratio']:>13.0%}{stats['mean_prompt_tokens_saved']:>21.0f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
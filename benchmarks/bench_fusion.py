@@ -0,0 +1,169 @@
+"""
+Fusion Benchmark
+Cost of fusing vector + BM25 rankings and recall@k on a labeled query set
+
+The labeled set (benchmarks/data/labeled_queries.json) marks the source
+files that answer each query; a query's recall@k is the fraction of those
+files that appear among the top-k fused results.
+
+Usage:
+    python benchmarks/bench_fusion.py cost [sizes...]
+    python benchmarks/bench_fusion.py recall
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from fusion import FUSION_STRATEGIES, fuse
+
+DOCUMENTS_PATH = os.path.join(ROOT_DIR, "data", "processed", "processed_documents.json")
+QUERIES_PATH = os.path.join(ROOT_DIR, "benchmarks", "data", "labeled_queries.json")
+DEFAULT_SIZES = [10, 50, 100, 1_000]
+NUM_REPEATS = 200
+CANDIDATES = 20       # results taken from each retriever before fusion
+RECALL_AT = (1, 3, 5)
+
+
+def legacy_fusion(vector_results, bm25_results, top_k):
+    """
+    Previous HybridSearch.hybrid_search combination
+
+    Joins on each result's 'index' (the vector rank, but the corpus
+    position for BM25) and mixes raw scores as 0.6 * vector + 0.4 * bm25 / 100.
+    """
+    combined = {}
+    for result in vector_results:
+        combined[result.get('index', 0)] = {'vector': result['score'], 'bm25': 0, 'result': result}
+    for result in bm25_results:
+        entry = combined.setdefault(result['index'], {'vector': 0, 'bm25': 0, 'result': result})
+        entry['bm25'] = result['score']
+    ranked = sorted(
+        combined.values(),
+        key=lambda entry: 0.6 * entry['vector'] + 0.4 * entry['bm25'] / 100,
+        reverse=True
+    )
+    return [entry['result'] for entry in ranked[:top_k]]
+
+
+def make_candidates(size, overlap=0.5, seed=0):
+    """Two synthetic ranked lists of `size` results sharing `overlap` of their ids"""
+    rng = np.random.default_rng(seed)
+    shared = int(size * overlap)
+    vector_ids = [f"doc_{i}" for i in rng.permutation(size)]
+    bm25_ids = vector_ids[:shared] + [f"doc_{size + i}" for i in range(size - shared)]
+    bm25_ids = [bm25_ids[i] for i in rng.permutation(size)]
+    vector_scores = np.sort(rng.uniform(0.2, 0.9, size))[::-1]
+    bm25_scores = np.sort(rng.gamma(2.0, 5.0, size))[::-1]
+    vector_results = [
+        {'index': i, 'doc_id': doc_id, 'content': doc_id, 'score': float(score), 'method': 'vector_search'}
+        for i, (doc_id, score) in enumerate(zip(vector_ids, vector_scores))
+    ]
+    bm25_results = [
+        {'index': int(doc_id[4:]), 'doc_id': doc_id, 'content': doc_id, 'score': float(score), 'method': 'bm25_search'}
+        for doc_id, score in zip(bm25_ids, bm25_scores)
+    ]
+    return vector_results, bm25_results
+
+
+def bench_cost(sizes):
+    """Fusion latency per query for growing candidate lists"""
+    print("Fusion latency per query (µs), candidates per retriever")
+    print(f"{'Size':>8}{'legacy':>10}" + "".join(f"{name:>10}" for name in FUSION_STRATEGIES))
+    for size in sizes:
+        vector_results, bm25_results = make_candidates(size)
+        timings = []
+
+        start_time = time.perf_counter()
+        for _ in range(NUM_REPEATS):
+            legacy_fusion(vector_results, bm25_results, 5)
+        timings.append(time.perf_counter() - start_time)
+
+        for strategy in FUSION_STRATEGIES:
+            start_time = time.perf_counter()
+            for _ in range(NUM_REPEATS):
+                fuse([vector_results, bm25_results], strategy=strategy, top_k=5)
+            timings.append(time.perf_counter() - start_time)
+
+        print(f"{size:>8}" + "".join(f"{t * 1e6 / NUM_REPEATS:>10.0f}" for t in timings))
+    print()
+
+
+def recall_at_k(results, relevant_sources, k):
+    found = {result['source'] for result in results[:k]}
+    return len(found & set(relevant_sources)) / len(relevant_sources)
+
+
+def bench_recall():
+    """recall@k of each retriever alone and of every fusion strategy"""
+    from hybrid_search import HybridSearch
+    from model_registry import get_encoder
+
+    with open(DOCUMENTS_PATH, 'r', encoding='utf-8') as f:
+        documents = json.load(f)
+    with open(QUERIES_PATH, 'r', encoding='utf-8') as f:
+        labeled_queries = json.load(f)
+
+    doc_ids = [doc['doc_id'] for doc in documents]
+    texts = [doc['content'] for doc in documents]
+    sources = [doc['source_file'] for doc in documents]
+    index = HybridSearch(texts, doc_ids=doc_ids, metadatas=[{'source_file': s} for s in sources])
+
+    # Exact cosine search stands in for ChromaDB's HNSW index
+    encoder = get_encoder()
+    embeddings = encoder.encode(texts, normalize_embeddings=True, show_progress_bar=False)
+    query_embeddings = encoder.encode(
+        [q['query'] for q in labeled_queries], normalize_embeddings=True, show_progress_bar=False
+    )
+
+    rankings = {name: [] for name in ("vector", "bm25", "legacy") + FUSION_STRATEGIES}
+    for labeled, query_embedding in zip(labeled_queries, query_embeddings):
+        similarities = embeddings @ query_embedding
+        top = np.argsort(-similarities)[:CANDIDATES]
+        vector_results = [
+            {'index': rank, 'doc_id': doc_ids[i], 'content': texts[i], 'source': sources[i],
+             'score': float(similarities[i]), 'method': 'vector_search'}
+            for rank, i in enumerate(top)
+        ]
+        bm25_results = index.bm25_search(labeled['query'], CANDIDATES)
+
+        rankings['vector'].append(vector_results)
+        rankings['bm25'].append(bm25_results)
+        rankings['legacy'].append(legacy_fusion(vector_results, bm25_results, CANDIDATES))
+        for strategy in FUSION_STRATEGIES:
+            rankings[strategy].append(fuse([vector_results, bm25_results], strategy=strategy))
+
+    print(f"recall@k over {len(labeled_queries)} labeled queries ({CANDIDATES} candidates per retriever)")
+    print(f"{'Ranking':>10}" + "".join(f"{f'R@{k}':>8}" for k in RECALL_AT))
+    for name, ranked_lists in rankings.items():
+        recalls = [
+            np.mean([recall_at_k(results, labeled['relevant_sources'], k)
+                     for results, labeled in zip(ranked_lists, labeled_queries)])
+            for k in RECALL_AT
+        ]
+        print(f"{name:>10}" + "".join(f"{r:>8.3f}" for r in recalls))
+    print()
+
+
+def main():
+    name = sys.argv[1] if len(sys.argv) > 1 else 'cost'
+
+    print("=" * 70)
+    print("🔀 FUSION BENCHMARK")
+    print("=" * 70 + "\n")
+
+    if name == 'cost':
+        bench_cost([int(arg) for arg in sys.argv[2:]] or DEFAULT_SIZES)
+    elif name == 'recall':
+        bench_recall()
+    else:
+        raise SystemExit(f"Unknown benchmark '{name}', expected 'cost' or 'recall'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+NLI Hallucination Check Benchmark
+Claims per second and detection accuracy: batched evidence windows vs one call per claim
+
+Each labeled claim in benchmarks/data/nli_claims.json lists the source
+files retrieved with it and whether those sources support it. A claim
+counts as detected when the check flags it as unsupported.
+
+The previous check paired every claim with all sources joined into one
+string (truncated to the model's 512 tokens) and called predict once per
+claim; it is reproduced here as 'legacy'.
+
+Usage:
+    python benchmarks/bench_nli.py
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from validation_agent import NLI_ENTAILMENT_THRESHOLD, NLI_MODEL, evidence_windows, nli_support_scores
+
+DOCUMENTS_PATH = os.path.join(ROOT_DIR, "data", "processed", "processed_documents.json")
+CLAIMS_PATH = os.path.join(ROOT_DIR, "benchmarks", "data", "nli_claims.json")
+NUM_REPEATS = 3
+
+
+def legacy_support_scores(model, claims, documents):
+    """Previous check: one predict call per claim against the joined sources"""
+    source_text = " ".join(doc['content'] for doc in documents)
+    return np.array([float(model.predict([[source_text, claim]])[0]) for claim in claims])
+
+
+def detection_metrics(flagged, supported):
+    """Accuracy plus precision/recall of flagging unsupported claims"""
+    flagged = np.asarray(flagged)
+    unsupported = ~np.asarray(supported)
+    true_positives = int((flagged & unsupported).sum())
+    precision = true_positives / flagged.sum() if flagged.sum() else 0.0
+    recall = true_positives / unsupported.sum() if unsupported.sum() else 0.0
+    return {
+        'accuracy': float((flagged == unsupported).mean()),
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    }
+
+
+def main():
+    from sentence_transformers import CrossEncoder
+
+    with open(DOCUMENTS_PATH, 'r', encoding='utf-8') as f:
+        documents_by_source = {doc['source_file']: doc for doc in json.load(f)}
+    with open(CLAIMS_PATH, 'r', encoding='utf-8') as f:
+        labeled_claims = json.load(f)
+
+    print("=" * 70)
+    print("🔍 NLI HALLUCINATION CHECK BENCHMARK")
+    print("=" * 70 + "\n")
+
+    model = CrossEncoder(NLI_MODEL)
+    supported = np.array([item['supported'] for item in labeled_claims])
+
+    # Claims sharing the same retrieved sources are checked together, as in one answer
+    groups = {}
+    for i, item in enumerate(labeled_claims):
+        groups.setdefault(tuple(item['sources']), []).append(i)
+
+    print(f"{len(labeled_claims)} claims ({supported.sum()} supported) in {len(groups)} answers")
+    for sources in groups:
+        documents = [documents_by_source[source] for source in sources]
+        words = sum(len(doc['content'].split()) for doc in documents)
+        print(f"  {', '.join(sources)}: {words} words, {len(evidence_windows(documents))} windows")
+    print()
+
+    implementations = {'legacy': legacy_support_scores, 'batched': nli_support_scores}
+    print(f"{'Check':>10}{'claims/s':>10}{'accuracy':>10}{'precision':>11}{'recall':>8}{'f1':>7}")
+    for name, support_scores in implementations.items():
+        scores = np.zeros(len(labeled_claims))
+        start_time = time.perf_counter()
+        for _ in range(NUM_REPEATS):
+            for sources, indices in groups.items():
+                documents = [documents_by_source[source] for source in sources]
+                claims = [labeled_claims[i]['claim'] for i in indices]
+                scores[indices] = support_scores(model, claims, documents)
+        elapsed = (time.perf_counter() - start_time) / NUM_REPEATS
+
+        metrics = detection_metrics(scores < NLI_ENTAILMENT_THRESHOLD, supported)
+        print(
+            f"{name:>10}{len(labeled_claims) / elapsed:>10.1f}{metrics['accuracy']:>10.2f}"
+            f"{metrics['precision']:>11.2f}{metrics['recall']:>8.2f}{metrics['f1']:>7.2f}"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    main()
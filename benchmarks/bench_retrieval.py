@@ -0,0 +1,62 @@
+"""
+Retrieval Benchmark
+Sequential vs concurrent source fan-out in RetrievalAgent
+
+Runs the labeled queries through RetrievalAgent.search_sources (no LLM
+calls) in both modes and reports p50/p99 per source and overall.
+Needs the ChromaDB collection (BENCH_DB_PATH) and GROQ_API_KEY set
+so the agent can be constructed.
+
+Usage:
+    python benchmarks/bench_retrieval.py [rounds]
+"""
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+QUERIES_PATH = os.path.join(ROOT_DIR, "benchmarks", "data", "labeled_queries.json")
+DB_PATH = os.getenv("BENCH_DB_PATH", "data/vectordb")
+TOP_K = 5
+DEFAULT_ROUNDS = 5
+
+
+def main():
+    import chromadb
+    from retrieval_agent import RetrievalAgent
+
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROUNDS
+    with open(QUERIES_PATH, 'r', encoding='utf-8') as f:
+        queries = [q['query'] for q in json.load(f)]
+
+    collection = chromadb.PersistentClient(path=DB_PATH).get_collection(name="documents")
+
+    print("=" * 70)
+    print("🔎 RETRIEVAL FAN-OUT BENCHMARK")
+    print("=" * 70 + "\n")
+
+    report = {}
+    for concurrent in (False, True):
+        agent = RetrievalAgent(collection, groq_api_key=os.getenv("GROQ_API_KEY"), concurrent=concurrent)
+        agent.search_sources("warm up", TOP_K)  # load the encoder and BM25 index outside the timing
+        agent.latency = type(agent.latency)()
+        for _ in range(rounds):
+            for query in queries:
+                agent.search_sources(query, TOP_K)
+        report['concurrent' if concurrent else 'sequential'] = agent.latency_stats()
+
+    print(f"{len(queries) * rounds} queries per mode (ms)")
+    print(f"{'Mode':>12}{'Operation':>16}{'p50':>10}{'p99':>10}")
+    for mode, stats in report.items():
+        for name in ('vector_search', 'bm25_search', 'retrieval'):
+            if name in stats:
+                print(f"{mode:>12}{name:>16}{stats[name]['p50_ms']:>10.2f}{stats[name]['p99_ms']:>10.2f}")
+        timeouts = sum(s['count'] for n, s in stats.items() if n.endswith('_timeouts'))
+        print(f"{mode:>12}{'timeouts':>16}{timeouts:>10}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Semantic Cache Benchmark
+Lookup cost and hit rate vs false-hit rate on a labeled paraphrase set
+
+Each pair in benchmarks/data/paraphrase_pairs.json has a query that was
+answered earlier ('cached'), a new 'query', and whether the cached answer
+is correct for it ('same_answer'). Hit rate is measured on pairs that
+should share an answer; false-hit rate on pairs that should not.
+
+Usage:
+    python benchmarks/bench_semantic_cache.py cost [sizes...]
+    python benchmarks/bench_semantic_cache.py pairs [thresholds...]
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from semantic_cache import SemanticCache, guard_terms
+
+PAIRS_PATH = os.path.join(ROOT_DIR, "benchmarks", "data", "paraphrase_pairs.json")
+DEFAULT_SIZES = [100, 1_000, 10_000]
+DEFAULT_THRESHOLDS = [0.75, 0.80, 0.85, 0.90, 0.95]
+DIMENSION = 384       # all-MiniLM-L6-v2
+NUM_LOOKUPS = 200
+
+
+class _RandomEncoder:
+    """Stands in for the embedding model so only the index is timed"""
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+
+    def encode(self, texts):
+        return self.rng.standard_normal((len(texts), DIMENSION)).astype(np.float32)
+
+
+def bench_cost(sizes):
+    """Lookup and insert latency for a full cache of each size"""
+    print(f"Lookup / insert latency (µs) with {DIMENSION}-d embeddings")
+    print(f"{'Entries':>10}{'lookup':>10}{'insert':>10}{'MB':>8}")
+    for size in sizes:
+        encoder = _RandomEncoder()
+        cache = SemanticCache(encoder, max_entries=size)
+        state = {'final_answer': 'answer', 'metadata': {}}
+        for i in range(size):
+            cache.store(f"query {i}", state)
+        embeddings = [cache.embed("probe") for _ in range(NUM_LOOKUPS)]
+
+        start_time = time.perf_counter()
+        for embedding in embeddings:
+            cache.lookup("probe", query_embedding=embedding)
+        lookup_time = (time.perf_counter() - start_time) / NUM_LOOKUPS
+
+        start_time = time.perf_counter()
+        for i, embedding in enumerate(embeddings):
+            cache.store(f"new query {i}", state, query_embedding=embedding)  # evicts
+        insert_time = (time.perf_counter() - start_time) / NUM_LOOKUPS
+
+        print(f"{size:>10}{lookup_time * 1e6:>10.0f}{insert_time * 1e6:>10.0f}"
+              f"{cache._embeddings.nbytes / 1e6:>8.1f}")
+    print()
+
+
+def bench_pairs(thresholds):
+    """Hit rate and false-hit rate per threshold, with and without the precision guard"""
+    with open(PAIRS_PATH, 'r', encoding='utf-8') as f:
+        pairs = json.load(f)
+
+    cache = SemanticCache()
+    similarities = np.array([
+        float(cache.embed(pair['cached']) @ cache.embed(pair['query'])) for pair in pairs
+    ])
+    guarded = np.array([guard_terms(pair['cached']) == guard_terms(pair['query']) for pair in pairs])
+    same = np.array([pair['same_answer'] for pair in pairs])
+
+    print(f"{same.sum()} paraphrase pairs, {(~same).sum()} near-miss pairs")
+    print(f"{'Threshold':>10}{'hit rate':>10}{'false hit':>11}{'guarded hit':>13}{'guarded false':>15}")
+    for threshold in thresholds:
+        hits = similarities >= threshold
+        guarded_hits = hits & guarded
+        print(
+            f"{threshold:>10.2f}{hits[same].mean():>10.2f}{hits[~same].mean():>11.2f}"
+            f"{guarded_hits[same].mean():>13.2f}{guarded_hits[~same].mean():>15.2f}"
+        )
+    print()
+
+    print("Near-miss pairs scoring above the lowest threshold:")
+    for pair, similarity, passes in zip(pairs, similarities, guarded):
+        if not pair['same_answer'] and similarity >= min(thresholds):
+            print(f"  {similarity:.3f} {'(guarded)' if not passes else '':>9}  "
+                  f"{pair['cached']!r} -> {pair['query']!r}")
+    print()
+
+
+def main():
+    name = sys.argv[1] if len(sys.argv) > 1 else 'cost'
+
+    print("=" * 70)
+    print("🧭 SEMANTIC CACHE BENCHMARK")
+    print("=" * 70 + "\n")
+
+    if name == 'cost':
+        bench_cost([int(arg) for arg in sys.argv[2:]] or DEFAULT_SIZES)
+    elif name == 'pairs':
+        bench_pairs([float(arg) for arg in sys.argv[2:]] or DEFAULT_THRESHOLDS)
+    else:
+        raise SystemExit(f"Unknown benchmark '{name}', expected 'cost' or 'pairs'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Startup Benchmark
+Measures cold-start time and resident memory of component initialization
+
+Each scenario runs in a fresh subprocess so RSS numbers are not polluted
+by models loaded in earlier scenarios.
+
+Usage:
+    python benchmarks/bench_startup.py
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from perf_stats import current_rss_mb
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+NUM_COMPONENTS = 3  # RAGSystem, RetrievalAgent, VectorDatabase
+DB_PATH = os.getenv("BENCH_DB_PATH", "data/vectordb")
+
+
+def _get_collection():
+    import chromadb
+    client = chromadb.PersistentClient(path=DB_PATH)
+    return client.get_collection(name="documents")
+
+
+def scenario_embedding_legacy():
+    """One SentenceTransformer per component (previous behaviour)"""
+    from sentence_transformers import SentenceTransformer
+    models = [SentenceTransformer(MODEL_NAME) for _ in range(NUM_COMPONENTS)]
+    for model in models:
+        model.encode(["warm up"])
+
+
+def scenario_embedding_registry():
+    """All components share one model through the registry"""
+    from model_registry import get_encoder
+    encoders = [get_encoder(MODEL_NAME) for _ in range(NUM_COMPONENTS)]
+    for encoder in encoders:
+        encoder.encode(["warm up"])
+
+
+def scenario_bm25_legacy():
+    """RAGSystem and RetrievalAgent each build their own BM25 index (previous behaviour)"""
+    from hybrid_search import HybridSearch
+    collection = _get_collection()
+    indexes = []
+    for _ in range(2):
+        documents = collection.get()['documents']
+        indexes.append(HybridSearch(documents))
+
+
+def scenario_bm25_shared():
+    """Both components share the process-wide sparse index"""
+    from sparse_index import get_sparse_index
+    collection = _get_collection()
+    indexes = [get_sparse_index(collection) for _ in range(2)]
+
+
+def scenario_bm25_persistent():
+    """Shared sparse index memory-mapped from its on-disk snapshot (built on first run)"""
+    from sparse_index import get_sparse_index, default_index_dir
+    collection = _get_collection()
+    get_sparse_index(collection, index_dir=default_index_dir(DB_PATH))
+
+
+def scenario_validation_eager():
+    """ValidationAgent plus its NLI cross-encoder loaded in __init__ (previous behaviour)"""
+    from sentence_transformers import CrossEncoder
+    from validation_agent import NLI_MODEL, ValidationAgent
+    ValidationAgent(groq_api_key="bench")
+    CrossEncoder(NLI_MODEL)
+
+
+def scenario_validation_lazy():
+    """ValidationAgent with the cross-encoder left unloaded until an NLI check runs"""
+    from validation_agent import ValidationAgent
+    ValidationAgent(groq_api_key="bench")
+
+
+def scenario_validation_prewarm():
+    """Lazy ValidationAgent with the NLI check enabled, pre-warmed as the API does after startup"""
+    from validation_agent import ValidationAgent
+    ValidationAgent(groq_api_key="bench", checks=("citations", "nli")).prewarm()
+
+
+SCENARIOS = {
+    "embedding_legacy": scenario_embedding_legacy,
+    "embedding_registry": scenario_embedding_registry,
+    "bm25_legacy": scenario_bm25_legacy,
+    "bm25_shared": scenario_bm25_shared,
+    "bm25_persistent_cold": scenario_bm25_persistent,
+    "bm25_persistent_warm": scenario_bm25_persistent,
+    "validation_eager": scenario_validation_eager,
+    "validation_lazy": scenario_validation_lazy,
+    "validation_prewarm": scenario_validation_prewarm,
+}
+
+
+def run_scenario(name):
+    """Run one scenario in this process and print a JSON result line"""
+    rss_before = current_rss_mb()
+    start_time = time.time()
+    SCENARIOS[name]()
+    result = {
+        'scenario': name,
+        'startup_time': time.time() - start_time,
+        'rss_before_mb': rss_before,
+        'rss_after_mb': current_rss_mb()
+    }
+    print(json.dumps(result))
+
+
+def main():
+    print("=" * 70)
+    print("⏱️  STARTUP BENCHMARK")
+    print("=" * 70 + "\n")
+
+    print(f"{'Scenario':<28}{'Startup (s)':>14}{'RSS before':>14}{'RSS after':>14}")
+    for name in SCENARIOS:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--scenario", name],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{name:<28}{result['startup_time']:>14.2f}"
+            f"{result['rss_before_mb']:>11.0f} MB{result['rss_after_mb']:>11.0f} MB"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--scenario":
+        run_scenario(sys.argv[2])
+    else:
+        main()
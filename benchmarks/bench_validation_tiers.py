@@ -0,0 +1,99 @@
+"""
+Tiered Validation Benchmark
+Share of claims each tier settles, accuracy, and latency vs NLI on every claim
+
+Uses the labeled claims in benchmarks/data/nli_claims.json (see
+bench_nli.py). Claims that share sources are validated together, as the
+claims of one answer would be.
+
+The LLM tier needs GROQ_API_KEY; without it, claims that get past NLI are
+reported as forwarded and left out of the accuracy.
+
+Usage:
+    python benchmarks/bench_validation_tiers.py
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from validation_agent import NLI_ENTAILMENT_THRESHOLD, VALIDATION_TIERS, ValidationAgent, nli_support_scores
+
+DOCUMENTS_PATH = os.path.join(ROOT_DIR, "data", "processed", "processed_documents.json")
+CLAIMS_PATH = os.path.join(ROOT_DIR, "benchmarks", "data", "nli_claims.json")
+
+
+def main():
+    with open(DOCUMENTS_PATH, 'r', encoding='utf-8') as f:
+        documents_by_source = {doc['source_file']: dict(doc, source=doc['source_file']) for doc in json.load(f)}
+    with open(CLAIMS_PATH, 'r', encoding='utf-8') as f:
+        labeled_claims = json.load(f)
+
+    print("=" * 70)
+    print("🪜 TIERED VALIDATION BENCHMARK")
+    print("=" * 70 + "\n")
+
+    api_key = os.getenv("GROQ_API_KEY")
+    agent = ValidationAgent(groq_api_key=api_key or "unset", checks=("tiered",))
+    agent.prewarm()  # model loading is not part of validation latency
+
+    groups = {}
+    for i, item in enumerate(labeled_claims):
+        groups.setdefault(tuple(item['sources']), []).append(i)
+
+    nli_supported = np.zeros(len(labeled_claims), dtype=bool)
+    tiered_supported = np.zeros(len(labeled_claims), dtype=bool)
+    tiers = np.empty(len(labeled_claims), dtype=object)
+    nli_time = tiered_time = 0.0
+
+    for sources, indices in groups.items():
+        documents = [documents_by_source[source] for source in sources]
+        claims = [labeled_claims[i]['claim'] for i in indices]
+
+        start_time = time.perf_counter()
+        scores = nli_support_scores(agent.nli_model, claims, documents)
+        nli_time += time.perf_counter() - start_time
+        nli_supported[indices] = scores >= NLI_ENTAILMENT_THRESHOLD
+
+        start_time = time.perf_counter()
+        records = agent._resolve_claims(claims, documents)
+        unresolved = [record for record in records if record['tier'] is None]
+        if unresolved and api_key:
+            llm_start = time.perf_counter()
+            verdict = agent.llm_claims_validation(unresolved)
+            agent._settle_with_llm(unresolved, verdict, llm_start)
+        tiered_time += time.perf_counter() - start_time
+
+        for i, record in zip(indices, records):
+            tiers[i] = record['tier'] or "forwarded"
+            tiered_supported[i] = bool(record['supported'])
+
+    supported = np.array([item['supported'] for item in labeled_claims])
+    print(f"{len(labeled_claims)} claims ({supported.sum()} supported) in {len(groups)} answers\n")
+
+    print(f"{'Tier':>12}{'settled':>10}{'accuracy':>10}")
+    for tier in VALIDATION_TIERS + ("unresolved", "forwarded"):
+        settled = tiers == tier
+        if settled.any():
+            accuracy = (tiered_supported[settled] == supported[settled]).mean()
+            print(f"{tier:>12}{settled.mean():>10.0%}{accuracy:>10.2f}")
+    print()
+
+    settled = tiers != "forwarded"
+    print(f"{'Check':>12}{'ms/claim':>10}{'accuracy':>10}")
+    print(f"{'nli (all)':>12}{nli_time / len(labeled_claims) * 1000:>10.1f}"
+          f"{(nli_supported == supported).mean():>10.2f}")
+    print(f"{'tiered':>12}{tiered_time / len(labeled_claims) * 1000:>10.1f}"
+          f"{(tiered_supported[settled] == supported[settled]).mean():>10.2f}")
+    if not api_key:
+        print(f"\n{(~settled).sum()} claims would go to the LLM tier (set GROQ_API_KEY to run it)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
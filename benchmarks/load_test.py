@@ -0,0 +1,126 @@
+"""
+API Load Test
+Throughput and latency of POST /query as concurrent clients increase
+
+While the query load runs, a separate client polls /health so the
+report also shows whether the event loop stays responsive.
+Standard library only; point it at a running API.
+
+Usage:
+    python benchmarks/load_test.py [concurrency...]
+
+Environment:
+    LOAD_TEST_URL       API base URL (default http://localhost:8000)
+    LOAD_TEST_REQUESTS  Queries per client per level (default 5)
+"""
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+QUERIES_PATH = os.path.join(ROOT_DIR, "benchmarks", "data", "labeled_queries.json")
+BASE_URL = os.getenv("LOAD_TEST_URL", "http://localhost:8000").rstrip("/")
+REQUESTS_PER_CLIENT = int(os.getenv("LOAD_TEST_REQUESTS", "5"))
+DEFAULT_CONCURRENCY = [1, 2, 4, 8, 16]
+HEALTH_INTERVAL = 0.1
+TIMEOUT = 300
+
+
+def post_query(query):
+    """Send one query; returns (latency seconds, HTTP status)"""
+    body = json.dumps({'query': query, 'top_k': 5}).encode('utf-8')
+    request = urllib.request.Request(
+        f"{BASE_URL}/query", data=body, headers={'Content-Type': 'application/json'}
+    )
+    start_time = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    return time.perf_counter() - start_time, status
+
+
+def poll_health(stop, latencies):
+    """Measure /health round trips until stopped"""
+    while not stop.is_set():
+        start_time = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f"{BASE_URL}/health", timeout=TIMEOUT) as response:
+                response.read()
+            latencies.append(time.perf_counter() - start_time)
+        except (urllib.error.URLError, OSError):
+            pass
+        stop.wait(HEALTH_INTERVAL)
+
+
+def run_level(concurrency, queries):
+    """Run `concurrency` clients, each sending REQUESTS_PER_CLIENT queries back to back"""
+    results = []
+    results_lock = threading.Lock()
+
+    def client(offset):
+        for i in range(REQUESTS_PER_CLIENT):
+            outcome = post_query(queries[(offset + i) % len(queries)])
+            with results_lock:
+                results.append(outcome)
+
+    stop = threading.Event()
+    health_latencies = []
+    health_thread = threading.Thread(target=poll_health, args=(stop, health_latencies), daemon=True)
+    health_thread.start()
+
+    start_time = time.perf_counter()
+    clients = [threading.Thread(target=client, args=(c * REQUESTS_PER_CLIENT,)) for c in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+
+    stop.set()
+    health_thread.join()
+
+    latencies = np.array([latency for latency, status in results if status == 200]) * 1000
+    health = np.array(health_latencies) * 1000
+    return {
+        'ok': len(latencies),
+        'errors': len(results) - len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else float('nan'),
+        'health_p99_ms': float(np.percentile(health, 99)) if len(health) else float('nan'),
+    }
+
+
+def main():
+    levels = [int(arg) for arg in sys.argv[1:]] or DEFAULT_CONCURRENCY
+    with open(QUERIES_PATH, 'r', encoding='utf-8') as f:
+        queries = [q['query'] for q in json.load(f)]
+
+    print("=" * 70)
+    print(f"🔥 LOAD TEST: {BASE_URL}")
+    print("=" * 70 + "\n")
+
+    print(f"{'Clients':>8}{'OK':>6}{'Errors':>8}{'Req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'/health p99':>13}")
+    for concurrency in levels:
+        stats = run_level(concurrency, queries)
+        print(
+            f"{concurrency:>8}{stats['ok']:>6}{stats['errors']:>8}{stats['throughput']:>9.2f}"
+            f"{stats['p50_ms']:>10.0f}{stats['p99_ms']:>10.0f}{stats['health_p99_ms']:>13.1f}"
+        )
+    print()
+    print("Throughput should grow with clients up to PIPELINE_WORKERS; /health p99 should stay flat.")
+
+
+if __name__ == "__main__":
+    main()
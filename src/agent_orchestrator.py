@@ -2,22 +2,73 @@
 Agent Orchestrator
 Connects all agents using LangGraph workflow
 """
+import asyncio
+import functools
+import operator
 import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, START, END
-from typing import TypedDict, List, Dict
+from langgraph.types import StreamWriter
+from typing import Annotated, TypedDict, List, Dict
+from answer_cache import get_answer_cache
+from semantic_cache import get_semantic_cache
+from query_agent import query_terms
+from query_classifier import RETRIEVAL_STRATEGIES, retrieval_strategy
+from validation_agent import VALIDATION_CHECKS_AVAILABLE
+from validation_jobs import VALIDATION_MODE, SYNC_VALIDATION_TYPES, ValidationJobs, pending_result
 
 load_dotenv()
 
+# Speculative retrieval: search on the raw query while it is being reformulated
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "on").lower() not in ("0", "off", "false")
+# The speculative results are kept when the reformulation is this close to the original
+SPECULATION_MIN_TERM_OVERLAP = 0.8
+SPECULATION_MIN_SIMILARITY = 0.9
+# Speculative results must be deep enough for whichever plan classification picks
+SPECULATION_TOP_K = max(retrieval_strategy(query_type, 5)['top_k'] for query_type in RETRIEVAL_STRATEGIES)
+
+
+def merge_dicts(left, right):
+    """Reducer for dict fields written by parallel branches"""
+    return {**left, **right}
+
+
 class AgentState(TypedDict):
     """State passed between agents"""
+    request_id: str
     original_query: str
     reformulated_query: str
+    retrieval_plan: Dict
+    source_results: Annotated[Dict, merge_dicts]      # source name -> ranked results
+    skipped_sources: Annotated[Dict, merge_dicts]     # source name -> why it was left out
     retrieved_documents: List[Dict]
     synthesized_answer: str
+    synthesis_error: str                              # set when synthesis failed (answer partial or missing)
+    validation_checks: Annotated[Dict, merge_dicts]   # check name -> result
     validation_result: Dict
     final_answer: str
-    metadata: Dict
+    metadata: Annotated[Dict, merge_dicts]
+    started_at: float
+    trace: Annotated[List[Dict], operator.add]        # one entry per node run
+
+
+def summarize_trace(trace):
+    """
+    Wall time of a run vs the summed time of its nodes
+
+    The summed node time is what the old linear chain's critical path
+    would be; the difference is work that overlapped in parallel branches.
+    """
+    if not trace:
+        return {'wall_time': 0.0, 'node_time': 0.0, 'overlap': 0.0}
+    wall_time = max(entry['end'] for entry in trace) - min(entry['start'] for entry in trace)
+    node_time = sum(entry['end'] - entry['start'] for entry in trace)
+    return {'wall_time': wall_time, 'node_time': node_time, 'overlap': max(node_time - wall_time, 0.0)}
 
 
 class AgentOrchestrator:
@@ -26,55 +77,308 @@ class AgentOrchestrator:
         print("🔗 Initializing Agent Orchestrator...\n")
         
         self.rag = rag_system
+        self.cache = get_answer_cache()  # None when ANSWER_CACHE_BACKEND=none
+        self.semantic_cache = get_semantic_cache()  # None unless SEMANTIC_CACHE=on
+        
+        # Separate from the retrieval agent's pool, whose tasks it would wait on; one per pipeline worker
+        self.speculation_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("PIPELINE_WORKERS", "8")), thread_name_prefix="speculative-retrieval"
+        )
+        self._speculation = {'attempts': 0, 'reused': 0, 'rerun': 0, 'failed': 0, 'time_saved': 0.0}
+        self._speculation_lock = threading.Lock()
+        
+        # Deferred validation (None in sync mode: every answer is validated first)
+        self.validation_jobs = ValidationJobs(rag_system.validation_agent) if VALIDATION_MODE == "async" else None
+        
         self.workflow = self._build_workflow()
+        self.async_workflow = self._build_workflow(asynchronous=True)
         
         print("✅ Agent Orchestrator ready!\n")
     
-    def _build_workflow(self):
-        """Build LangGraph workflow"""
+    def _build_workflow(self, asynchronous=False):
+        """
+        Build LangGraph workflow
+        
+        Independent steps run as parallel branches whose updates are merged
+        by the reducers on AgentState:
+        
+            classification ‖ query_understanding → retrieval
+            → vector_search ‖ bm25_search → fusion → synthesis
+            → citations_check ‖ nli_check ‖ llm_check ‖ tiered_check → validation → finalize
+        
+        retrieval fans out only to the sources in the retrieval plan (or
+        straight to fusion when speculative results were kept), and
+        synthesis only to the validation checks that are enabled, or
+        straight to finalize when validation is deferred to the background.
+        
+        asynchronous=True wires the async nodes, for use with ainvoke()
+        """
         workflow = StateGraph(AgentState)
         
         # Define nodes
-        workflow.add_node("query_understanding", self._query_understanding_node)
-        workflow.add_node("retrieval", self._retrieval_node)
-        workflow.add_node("synthesis", self._synthesis_node)
-        workflow.add_node("validation", self._validation_node)
-        workflow.add_node("finalize", self._finalize_node)
+        if asynchronous:
+            nodes = {
+                "classification": self._aclassification_node,
+                "query_understanding": self._aquery_understanding_node,
+                "vector_search": self._make_search_node("vector", asynchronous=True),
+                "bm25_search": self._make_search_node("bm25", asynchronous=True),
+                "synthesis": self._asynthesis_node,
+            }
+        else:
+            nodes = {
+                "classification": self._classification_node,
+                "query_understanding": self._query_understanding_node,
+                "vector_search": self._make_search_node("vector"),
+                "bm25_search": self._make_search_node("bm25"),
+                "synthesis": self._synthesis_node,
+            }
+        # One node per available check; only the configured ones are routed to
+        check_nodes = [f"{check}_check" for check in VALIDATION_CHECKS_AVAILABLE]
+        for check, name in zip(VALIDATION_CHECKS_AVAILABLE, check_nodes):
+            nodes[name] = self._make_check_node(check, asynchronous=asynchronous)
+        nodes.update({
+            "retrieval": self._retrieval_node,
+            "fusion": self._fusion_node,
+            "validation": self._validation_node,
+            "finalize": self._finalize_node,
+        })
+        for name, node in nodes.items():
+            workflow.add_node(name, self._traced(name, node))
         
         # Define edges
+        workflow.add_edge(START, "classification")
         workflow.add_edge(START, "query_understanding")
-        workflow.add_edge("query_understanding", "retrieval")
-        workflow.add_edge("retrieval", "synthesis")
-        workflow.add_edge("synthesis", "validation")
+        workflow.add_edge(["classification", "query_understanding"], "retrieval")
+        workflow.add_conditional_edges(
+            "retrieval", self._route_retrieval, ["vector_search", "bm25_search", "fusion"]
+        )
+        workflow.add_edge("vector_search", "fusion")
+        workflow.add_edge("bm25_search", "fusion")
+        workflow.add_edge("fusion", "synthesis")
+        workflow.add_conditional_edges(
+            "synthesis", self._route_validation,
+            check_nodes + ["validation", "finalize"]
+        )
+        for check in check_nodes:
+            workflow.add_edge(check, "validation")
         workflow.add_edge("validation", "finalize")
         workflow.add_edge("finalize", END)
         
         return workflow.compile()
     
-    def _query_understanding_node(self, state: AgentState) -> AgentState:
+    @staticmethod
+    def _traced(name, node):
+        """Wrap a node so its update carries a (start, end) trace entry"""
+        def entry(state, start_time):
+            return [{
+                'node': name,
+                'start': start_time - state["started_at"],
+                'end': time.perf_counter() - state["started_at"]
+            }]
+        
+        if asyncio.iscoroutinefunction(node):
+            @functools.wraps(node)
+            async def traced(state, **kwargs):
+                start_time = time.perf_counter()
+                update = await node(state, **kwargs) or {}
+                return dict(update, trace=entry(state, start_time))
+        else:
+            @functools.wraps(node)
+            def traced(state, **kwargs):
+                start_time = time.perf_counter()
+                update = node(state, **kwargs) or {}
+                return dict(update, trace=entry(state, start_time))
+        return traced
+    
+    def _classification_node(self, state: AgentState) -> Dict:
+        """Query classification (runs alongside query understanding)"""
+        return {"retrieval_plan": self.rag.retrieval_agent.plan_retrieval(state["original_query"], top_k=5)}
+    
+    async def _aclassification_node(self, state: AgentState) -> Dict:
+        """Query classification (async; background LLM classification runs on the event loop)"""
+        plan = await self.rag.retrieval_agent.aplan_retrieval(state["original_query"], 5)
+        return {"retrieval_plan": plan}
+    
+    def _query_understanding_node(self, state: AgentState) -> Dict:
         """Query Understanding Agent Node"""
         print("\n" + "=" * 70)
         print("🧠 AGENT 1: QUERY UNDERSTANDING")
         print("=" * 70)
         
         original_query = state["original_query"]
-        reformulated_query = self.rag.query_agent.reformulate_query(original_query)
-        
-        state["reformulated_query"] = reformulated_query
-        state["metadata"]["query_understanding_time"] = 0
+        start_time = time.perf_counter()
+        speculative = None
+        if SPECULATIVE_RETRIEVAL:
+            speculative = self.speculation_executor.submit(self._speculative_search, original_query)
+        
+        try:
+            reformulated_query = self.rag.query_agent.reformulate_query(original_query)
+        except BaseException:
+            if speculative is not None:
+                speculative.cancel()
+            raise
+        
+        update = {
+            "reformulated_query": reformulated_query,
+            "metadata": {"query_understanding_time": time.perf_counter() - start_time}
+        }
         
-        return state
+        if speculative is not None:
+            # Decide before waiting: a rerun must not block on the speculative search
+            decision = self._speculation_decision(original_query, reformulated_query)
+            if not decision['reuse']:
+                speculative.cancel()  # still queued; a running search is just ignored
+                self._apply_speculation(update, decision, start_time)
+                return update
+            try:
+                speculation = speculative.result()
+            except Exception as e:
+                self._record_speculation('failed')
+                print(f"⚠️  Speculative retrieval failed: {e}")
+            else:
+                self._apply_speculation(update, decision, start_time, speculation)
+        
+        return update
+    
+    def _speculative_search(self, query):
+        """
+        Search every source for the original query
+        
+        Classification runs alongside, so the plan is not known yet: the
+        results are deep enough for any plan, and fusion applies the
+        actual plan if they are kept.
+        
+        Returns:
+            (source results, skipped sources, retrieval time)
+        """
+        start_time = time.perf_counter()
+        source_results, skipped = self.rag.retrieval_agent.search_sources(query, SPECULATION_TOP_K)
+        return source_results, skipped, time.perf_counter() - start_time
+    
+    async def _aspeculative_search(self, query):
+        start_time = time.perf_counter()
+        source_results, skipped = await self.rag.retrieval_agent.asearch_sources(query, SPECULATION_TOP_K)
+        return source_results, skipped, time.perf_counter() - start_time
+    
+    def _speculation_decision(self, original_query, reformulated_query):
+        """
+        Whether retrieval on the original query can stand in for the reformulation
+        
+        Term overlap (Jaccard) settles most cases; embedding similarity
+        decides the rest, e.g. reformulations that only rephrase.
+        """
+        original_terms = set(query_terms(original_query))
+        reformulated_terms = set(query_terms(reformulated_query))
+        union = original_terms | reformulated_terms
+        overlap = len(original_terms & reformulated_terms) / len(union) if union else 1.0
+        if overlap >= SPECULATION_MIN_TERM_OVERLAP:
+            return {'reuse': True, 'term_overlap': overlap}
+        
+        embeddings = np.asarray(
+            self.rag.retrieval_agent.embedding_model.encode([original_query, reformulated_query]),
+            dtype=np.float32
+        )
+        norms = np.linalg.norm(embeddings, axis=1)
+        similarity = float(embeddings[0] @ embeddings[1] / max(norms[0] * norms[1], 1e-12))
+        return {'reuse': similarity >= SPECULATION_MIN_SIMILARITY, 'term_overlap': overlap, 'similarity': similarity}
     
-    def _retrieval_node(self, state: AgentState) -> AgentState:
-        """Multi-Source Retrieval Agent Node"""
+    def _apply_speculation(self, update, decision, start_time, speculation=None):
+        """Keep the speculative results (when given) or discard them, and account for the time saved"""
+        reformulation_time = update["metadata"]["query_understanding_time"]
+        elapsed = time.perf_counter() - start_time
+        if decision['reuse']:
+            source_results, skipped, retrieval_time = speculation
+            # Sequentially, retrieval would only have started after reformulation
+            time_saved = reformulation_time + retrieval_time - elapsed
+            update["source_results"] = source_results
+            update["skipped_sources"] = skipped
+            self._record_speculation('reused', time_saved)
+            print(f"♻️  Reusing speculative retrieval ({time_saved:.2f}s saved)")
+        else:
+            # Only the decision itself is lost
+            time_saved = reformulation_time - elapsed
+            self._record_speculation('rerun', time_saved)
+            print("🔁 Reformulation changed the query; retrieval will rerun")
+        update["metadata"]["speculation"] = dict(decision, time_saved=time_saved)
+    
+    def _record_speculation(self, outcome, time_saved=0.0):
+        with self._speculation_lock:
+            self._speculation['attempts'] += 1
+            self._speculation[outcome] += 1
+            self._speculation['time_saved'] += time_saved
+    
+    def speculation_stats(self):
+        """How often speculative retrieval was reused and the wall-clock time it saved"""
+        with self._speculation_lock:
+            stats = dict(self._speculation)
+        stats['reuse_rate'] = stats['reused'] / stats['attempts'] if stats['attempts'] else 0.0
+        stats['mean_time_saved'] = stats['time_saved'] / stats['attempts'] if stats['attempts'] else 0.0
+        return stats
+    
+    @staticmethod
+    def _speculation_reused(state):
+        return state["metadata"].get("speculation", {}).get("reuse", False)
+    
+    def _retrieval_node(self, state: AgentState) -> Dict:
+        """Multi-Source Retrieval Agent Node (joins classification and reformulation)"""
         print("\n" + "=" * 70)
         print("🔍 AGENT 2: MULTI-SOURCE RETRIEVAL")
         print("=" * 70)
         
-        reformulated_query = state["reformulated_query"]
-        retrieved_results = self.rag.retrieval_agent.retrieve(reformulated_query, top_k=5)
-        
-        # Convert to document format
+        if self._speculation_reused(state):
+            print(f"♻️  Fusing speculative results for {state['retrieval_plan']['sources']}")
+        else:
+            print(f"🔎 Searching {state['retrieval_plan']['sources']} for: '{state['reformulated_query']}'")
+        return {}
+    
+    def _route_retrieval(self, state: AgentState):
+        """Fan out to the planned sources, or skip ahead when speculation already searched them"""
+        if self._speculation_reused(state):
+            return "fusion"
+        return [f"{source}_search" for source in state["retrieval_plan"]["sources"]]
+    
+    def _make_search_node(self, source, asynchronous=False):
+        """Node searching one retrieval source under its deadline"""
+        def update(results, skipped):
+            return {"source_results": {source: results}, "skipped_sources": {source: skipped} if skipped else {}}
+        
+        def search_node(state: AgentState) -> Dict:
+            return update(*self.rag.retrieval_agent.search_source(
+                source, state["reformulated_query"], state["retrieval_plan"]["top_k"]
+            ))
+        
+        async def asearch_node(state: AgentState) -> Dict:
+            return update(*await self.rag.retrieval_agent.asearch_source(
+                source, state["reformulated_query"], state["retrieval_plan"]["top_k"]
+            ))
+        
+        return asearch_node if asynchronous else search_node
+    
+    def _fusion_node(self, state: AgentState) -> Dict:
+        """Fuse the source rankings into the retrieved documents"""
+        retrieval_agent = self.rag.retrieval_agent
+        searches = [entry for entry in state["trace"] if entry['node'].endswith("_search")]
+        if searches:
+            retrieval_agent.latency.record(
+                'retrieval', max(entry['end'] for entry in searches) - min(entry['start'] for entry in searches)
+            )
+        
+        plan = state["retrieval_plan"]
+        # Speculative results are deeper than the plan asks for; rankings are cut to its top_k
+        source_results = {name: results[:plan['top_k']] for name, results in state["source_results"].items()}
+        results = retrieval_agent.fuse_results(source_results, plan)
+        documents = self._to_documents(results)
+        print(f"✅ Retrieved {len(documents)} unique documents")
+        metadata = {"num_documents_retrieved": len(documents)}
+        if state["skipped_sources"]:
+            # The answer is built on partial (or no) retrieval; say so in the response
+            print(f"⚠️  Skipped sources: {state['skipped_sources']}")
+            metadata["skipped_sources"] = dict(state["skipped_sources"])
+        return {"retrieved_documents": documents, "metadata": metadata}
+    
+    @staticmethod
+    def _to_documents(retrieved_results):
+        """Convert retrieval results to document format"""
         documents = []
         for result in retrieved_results:
             documents.append({
@@ -82,55 +386,256 @@ class AgentOrchestrator:
                 'source': result.get('source', 'unknown'),
                 'score': result['score']
             })
-        
-        state["retrieved_documents"] = documents
-        state["metadata"]["num_documents_retrieved"] = len(documents)
-        
-        return state
+        return documents
     
-    def _synthesis_node(self, state: AgentState) -> AgentState:
+    def _synthesis_node(self, state: AgentState) -> Dict:
         """Synthesis Agent Node"""
         print("\n" + "=" * 70)
         print("🧬 AGENT 3: SYNTHESIS")
         print("=" * 70)
         
-        original_query = state["original_query"]
-        documents = state["retrieved_documents"]
+        try:
+            synthesized_answer = self.rag.synthesis_agent.synthesize(
+                state["original_query"],
+                state["retrieved_documents"]
+            )
+        except Exception as e:
+            return {"synthesized_answer": f"Error generating answer: {e}", "synthesis_error": str(e)}
         
-        synthesized_answer = self.rag.synthesis_agent.synthesize(
-            original_query, 
-            documents
-        )
+        return {"synthesized_answer": synthesized_answer}
+    
+    async def _asynthesis_node(self, state: AgentState, writer: StreamWriter) -> Dict:
+        """
+        Synthesis Agent Node (async)
         
-        state["synthesized_answer"] = synthesized_answer
+        Streams the answer; each delta is also sent to the graph's custom
+        stream, which astream() forwards as token events.
+        """
+        print("\n" + "=" * 70)
+        print("🧬 AGENT 3: SYNTHESIS")
+        print("=" * 70)
         
-        return state
+        parts = []
+        try:
+            async for delta in self.rag.synthesis_agent.astream_synthesize(
+                state["original_query"], state["retrieved_documents"]
+            ):
+                parts.append(delta)
+                writer({'text': delta})
+        except Exception as e:
+            # Part of the answer may already be streamed; the flag, not the text, marks the failure
+            message = f"Error generating answer: {e}"
+            writer({'text': message})
+            return {"synthesized_answer": "".join(parts) + message, "synthesis_error": str(e)}
+        
+        return {"synthesized_answer": "".join(parts)}
+    
+    def _defer_validation(self, state):
+        """Whether this answer can be validated after it is returned"""
+        if self.validation_jobs is None or not state["retrieved_documents"]:
+            return False
+        return state["retrieval_plan"].get("type") not in SYNC_VALIDATION_TYPES
     
-    def _validation_node(self, state: AgentState) -> AgentState:
-        """Validation Agent Node"""
+    def _route_validation(self, state: AgentState):
+        """Fan out to the enabled validation checks, or skip them when validation is deferred or synthesis failed"""
+        if state["synthesis_error"] or self._defer_validation(state):
+            return "finalize"
+        return [f"{check}_check" for check in self.rag.validation_agent.checks] or "validation"
+    
+    def _make_check_node(self, check, asynchronous=False):
+        """Node running one validation check"""
+        def check_node(state: AgentState) -> Dict:
+            result = self.rag.validation_agent.run_check(
+                check, state["synthesized_answer"], state["retrieved_documents"]
+            )
+            return {"validation_checks": {check: result}}
+        
+        async def acheck_node(state: AgentState) -> Dict:
+            result = await self.rag.validation_agent.arun_check(
+                check, state["synthesized_answer"], state["retrieved_documents"]
+            )
+            return {"validation_checks": {check: result}}
+        
+        return acheck_node if asynchronous else check_node
+    
+    def _validation_node(self, state: AgentState) -> Dict:
+        """Validation Agent Node (merges the check branches)"""
         print("\n" + "=" * 70)
         print("✅ AGENT 4: VALIDATION")
         print("=" * 70)
         
-        answer = state["synthesized_answer"]
-        documents = state["retrieved_documents"]
-        
-        validation_result = self.rag.validation_agent.validate(answer, documents)
+        validation_agent = self.rag.validation_agent
+        validation_result = validation_agent.combine_checks(state["retrieved_documents"], state["validation_checks"])
+        validation_agent._print_result(validation_result)
         
-        state["validation_result"] = validation_result
-        
-        return state
+        return {"validation_result": dict(validation_result, status="done", request_id=state["request_id"])}
     
-    def _finalize_node(self, state: AgentState) -> AgentState:
+    def _finalize_node(self, state: AgentState) -> Dict:
         """Finalize and format response"""
         print("\n" + "=" * 70)
         print("📋 FINALIZATION")
         print("=" * 70 + "\n")
         
-        state["final_answer"] = state["synthesized_answer"]
+        update = {
+            "final_answer": state["synthesized_answer"],
+            "metadata": {"timing": summarize_trace(state["trace"])}
+        }
+        if state["synthesis_error"]:
+            update["metadata"]["synthesis_error"] = state["synthesis_error"]
+            update["validation_result"] = {
+                'status': 'error', 'request_id': state["request_id"], 'is_valid': False, 'confidence': 0,
+                'error': f"Synthesis failed: {state['synthesis_error']}"
+            }
+        elif not state["validation_result"]:
+            print(f"⏳ Validation deferred (request {state['request_id']})")
+            update["validation_result"] = pending_result(state["request_id"])
+        return update
+    
+    # ----- Async nodes (same steps, awaiting the agents' async methods) -----
+    
+    async def _aquery_understanding_node(self, state: AgentState) -> Dict:
+        """Query Understanding Agent Node (async)"""
+        print("\n" + "=" * 70)
+        print("🧠 AGENT 1: QUERY UNDERSTANDING")
+        print("=" * 70)
+        
+        original_query = state["original_query"]
+        start_time = time.perf_counter()
+        speculative = None
+        if SPECULATIVE_RETRIEVAL:
+            speculative = asyncio.ensure_future(self._aspeculative_search(original_query))
+        
+        try:
+            reformulated_query = await self.rag.query_agent.areformulate_query(original_query)
+        except BaseException:
+            if speculative is not None:
+                speculative.cancel()
+            raise
+        
+        update = {
+            "reformulated_query": reformulated_query,
+            "metadata": {"query_understanding_time": time.perf_counter() - start_time}
+        }
         
+        if speculative is not None:
+            try:
+                decision = await asyncio.to_thread(self._speculation_decision, original_query, reformulated_query)
+            except BaseException:
+                speculative.cancel()
+                raise
+            if not decision['reuse']:
+                speculative.cancel()
+                self._apply_speculation(update, decision, start_time)
+                return update
+            try:
+                speculation = await speculative
+            except Exception as e:
+                self._record_speculation('failed')
+                print(f"⚠️  Speculative retrieval failed: {e}")
+            else:
+                self._apply_speculation(update, decision, start_time, speculation)
+        
+        return update
+    
+    @staticmethod
+    def _initial_state(query):
+        return {
+            "request_id": uuid.uuid4().hex,
+            "original_query": query,
+            "reformulated_query": "",
+            "retrieval_plan": {},
+            "source_results": {},
+            "skipped_sources": {},
+            "retrieved_documents": [],
+            "synthesized_answer": "",
+            "synthesis_error": "",
+            "validation_checks": {},
+            "validation_result": {},
+            "final_answer": "",
+            "metadata": {},
+            "started_at": time.perf_counter(),
+            "trace": []
+        }
+    
+    def _cached_state(self, query):
+        """
+        Final state of an identical or paraphrased earlier query, if cached
+        
+        Returns:
+            (state or None, query embedding to store the fresh result under)
+        """
+        if self.cache is not None:
+            state = self.cache.get(query)
+            if state is not None:
+                print("⚡ Answer cache hit")
+                state["metadata"]["cache"] = "hit"
+                return self._reissue(state), None
+        
+        if self.semantic_cache is None:
+            return None, None
+        query_embedding = self.semantic_cache.embed(query)
+        cached = self.semantic_cache.lookup(query, query_embedding=query_embedding)
+        if cached is None:
+            return None, query_embedding
+        state, match = cached
+        print(f"⚡ Semantic cache hit: \"{match['query']}\" (similarity {match['similarity']:.3f})")
+        state["original_query"] = query
+        state["metadata"]["cache"] = "semantic"
+        state["metadata"]["semantic_match"] = match
+        return self._reissue(state), None
+    
+    def _reissue(self, state):
+        """
+        Give a cached state its own request id carrying the cached verdict
+        
+        The original run's id stops resolving at /validation/{request_id}
+        once its record expires, so every hit gets a fresh one, recorded as
+        done when validation runs in the background.
+        """
+        request_id = uuid.uuid4().hex
+        state["metadata"]["cached_request_id"] = state["request_id"]
+        state["request_id"] = request_id
+        if self.validation_jobs is not None:
+            state["validation_result"] = self.validation_jobs.record(request_id, state["validation_result"])
+        else:
+            state["validation_result"] = dict(state["validation_result"], request_id=request_id)
         return state
     
+    def _cache_state(self, query, state, pipeline_time, query_embedding=None):
+        """Remember a successful run (failed syntheses and runs missing a source are not cached)"""
+        if not state["retrieved_documents"] or state["metadata"].get("skipped_sources"):
+            return
+        if state.get("synthesis_error"):
+            return
+        state["metadata"]["cache"] = "miss"
+        if self.cache is not None:
+            self.cache.set(query, state, pipeline_time)
+        if self.semantic_cache is not None:
+            self.semantic_cache.store(query, state, query_embedding=query_embedding)
+    
+    def _complete(self, query, state, pipeline_time, query_embedding=None):
+        """
+        Cache a finished run, or queue its deferred validation
+        
+        Answers are cached only once validated, so cache hits never carry
+        a pending verdict.
+        """
+        if state["validation_result"].get("status") != "pending":
+            self._cache_state(query, state, pipeline_time, query_embedding)
+            return
+        
+        def on_validated(result):
+            validated = dict(state, validation_result=result, metadata=dict(state["metadata"]))
+            self._cache_state(query, validated, pipeline_time, query_embedding)
+        
+        self.validation_jobs.submit(
+            state["request_id"], state["synthesized_answer"], state["retrieved_documents"], on_done=on_validated
+        )
+    
+    def validation_status(self, request_id):
+        """Record of a deferred validation (None if unknown or validation is synchronous)"""
+        return self.validation_jobs.status(request_id) if self.validation_jobs is not None else None
+    
     def run(self, query: str) -> Dict:
         """Run complete agent orchestration workflow"""
         print("\n" + "=" * 80)
@@ -138,25 +643,108 @@ class AgentOrchestrator:
         print("=" * 80)
         print(f"\nINPUT QUERY: {query}\n")
         
+        final_state, query_embedding = self._cached_state(query)
+        if final_state is not None:
+            self._display_results(final_state)
+            return final_state
+        
         # Initialize state
-        initial_state = {
-            "original_query": query,
-            "reformulated_query": "",
-            "retrieved_documents": [],
-            "synthesized_answer": "",
-            "validation_result": {},
-            "final_answer": "",
-            "metadata": {}
-        }
+        initial_state = self._initial_state(query)
         
         # Run workflow
+        start_time = time.perf_counter()
         final_state = self.workflow.invoke(initial_state)
+        self._complete(query, final_state, time.perf_counter() - start_time, query_embedding)
         
         # Format and display results
         self._display_results(final_state)
         
         return final_state
     
+    async def arun(self, query: str) -> Dict:
+        """Run the workflow with async nodes; LLM calls share one AsyncGroq client"""
+        print("\n" + "=" * 80)
+        print("🚀 MULTI-AGENT ORCHESTRATION WORKFLOW")
+        print("=" * 80)
+        print(f"\nINPUT QUERY: {query}\n")
+        
+        # Cache lookups may embed the query; keep that off the event loop
+        final_state, query_embedding = await asyncio.to_thread(self._cached_state, query)
+        if final_state is None:
+            start_time = time.perf_counter()
+            final_state = await self.async_workflow.ainvoke(self._initial_state(query))
+            self._complete(query, final_state, time.perf_counter() - start_time, query_embedding)
+        
+        self._display_results(final_state)
+        
+        return final_state
+    
+    async def astream(self, query: str):
+        """
+        Run the async workflow, yielding (event, data) pairs as each stage finishes
+        
+        Events: reformulated, retrieved, sources, token (one per synthesis
+        delta), validation, done.
+        """
+        start_time = time.perf_counter()
+        
+        # A cache hit replays the stored run as one burst of events
+        state, query_embedding = await asyncio.to_thread(self._cached_state, query)
+        if state is not None:
+            documents = state["retrieved_documents"]
+            yield "reformulated", {'query': query, 'reformulated_query': state["reformulated_query"]}
+            yield "retrieved", {'num_documents': len(documents)}
+            yield "sources", {'sources': [{'source': doc['source'], 'relevance': doc['score']} for doc in documents]}
+            yield "token", {'text': state["synthesized_answer"]}
+            yield "validation", state["validation_result"]
+            elapsed = time.perf_counter() - start_time
+            yield "done", {
+                'answer': state["final_answer"],
+                'ttft': elapsed,
+                'total_time': elapsed,
+                'cached': True,
+                'cache': state["metadata"]["cache"]
+            }
+            return
+        
+        ttft = None
+        state = self._initial_state(query)
+        stream = self.async_workflow.astream(state, stream_mode=["updates", "custom", "values"])
+        async for mode, chunk in stream:
+            if mode == "values":
+                state = chunk
+            elif mode == "custom":
+                if ttft is None:
+                    ttft = time.perf_counter() - start_time
+                yield "token", chunk
+            else:
+                for update in chunk.values():
+                    update = update or {}
+                    if "reformulated_query" in update:
+                        yield "reformulated", {'query': query, 'reformulated_query': update["reformulated_query"]}
+                    if "retrieved_documents" in update:
+                        documents = update["retrieved_documents"]
+                        yield "retrieved", {
+                            'num_documents': len(documents),
+                            'skipped_sources': update.get("metadata", {}).get("skipped_sources", {})
+                        }
+                        yield "sources", {
+                            'sources': [{'source': doc['source'], 'relevance': doc['score']} for doc in documents]
+                        }
+                    if "validation_result" in update:
+                        yield "validation", update["validation_result"]
+        
+        total_time = time.perf_counter() - start_time
+        self._complete(query, state, total_time, query_embedding)
+        yield "done", {
+            'answer': state["final_answer"],
+            'ttft': ttft,
+            'total_time': total_time,
+            'cached': False,
+            'cache': 'miss',
+            'request_id': state["request_id"]
+        }
+    
     def _display_results(self, state: AgentState):
         """Display final results"""
         print("\n" + "=" * 80)
@@ -176,36 +764,48 @@ class AgentOrchestrator:
         
         validation = state['validation_result']
         print("VALIDATION:")
-        print(f"  Status: {'✅ VALID' if validation['is_valid'] else '⚠️ NEEDS REVIEW'}")
-        print(f"  Confidence: {validation['confidence']}%\n")
+        if validation.get('status') == 'pending':
+            print(f"  Status: ⏳ PENDING (request {validation['request_id']})\n")
+        else:
+            print(f"  Status: {'✅ VALID' if validation['is_valid'] else '⚠️ NEEDS REVIEW'}")
+            print(f"  Confidence: {validation['confidence']}%\n")
         
         print("SOURCES:")
         for i, doc in enumerate(state['retrieved_documents'], 1):
             print(f"  {i}. {doc['source']} (relevance: {doc['score']:.2%})")
         
+        trace = state.get('trace') or []
+        if trace:
+            timing = summarize_trace(trace)
+            print("\nTIMING:")
+            for entry in sorted(trace, key=lambda entry: entry['start']):
+                print(f"  {entry['node']:<20} {entry['start']:6.2f}s → {entry['end']:6.2f}s")
+            print(f"  Wall time {timing['wall_time']:.2f}s vs {timing['node_time']:.2f}s of node time "
+                  f"({timing['overlap']:.2f}s ran in parallel)")
+        
         print("\n" + "=" * 80 + "\n")
 
 
 # Test the orchestrator
 if __name__ == "__main__":
     from rag_system import RAGSystem
-    
+
     api_key = os.getenv("GROQ_API_KEY")
-    
+
     # Initialize RAG system
     print("Initializing RAG System...")
     rag = RAGSystem(groq_api_key=api_key)
-    
+
     # Initialize orchestrator
     orchestrator = AgentOrchestrator(rag)
-    
+
     # Test queries
     test_queries = [
         "How do I create a FastAPI endpoint?",
         "What is the leave policy?",
         "Tell me about remote work"
     ]
-    
+
     for query in test_queries:
         result = orchestrator.run(query)
         print("\n" + "=" * 80 + "\n")
@@ -0,0 +1,115 @@
+"""
+Answer Cache
+Exact-match cache of full pipeline results in front of the orchestrator
+"""
+import copy
+import hashlib
+import os
+import re
+import threading
+import time
+
+from cache_backends import make_backend
+
+# memory, redis or none; redis by default when REDIS_URL is set, since only a
+# shared version counter sees documents ingested by another process
+ANSWER_CACHE_BACKEND = os.getenv("ANSWER_CACHE_BACKEND", "redis" if os.getenv("REDIS_URL") else "memory")
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+INDEX_VERSION_KEY = "index_version"
+
+
+def normalize_query(query):
+    """Case, whitespace and trailing punctuation do not change the answer"""
+    return re.sub(r"\s+", " ", query.lower()).strip().rstrip("?!. ")
+
+
+class AnswerCache:
+    def __init__(self, backend, ttl=ANSWER_CACHE_TTL):
+        """
+        Cache final pipeline states keyed on (normalized query, index version)
+
+        The index version is a counter kept in the backend itself, so with
+        Redis every worker sees the same version. Re-ingesting documents
+        bumps it (invalidate()), which orphans every older entry at once;
+        the TTL then reclaims them.
+
+        With the in-process memory backend the version is per process:
+        documents ingested by another process (such as the ingestion script
+        while the API is running) do not invalidate this process's answers,
+        which keep being served until they expire or the process restarts.
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self._hits = 0
+        self._misses = 0
+        self._time_saved = 0.0
+        self._lock = threading.Lock()
+
+    def index_version(self):
+        return self.backend.get_counter(INDEX_VERSION_KEY)
+
+    def _key(self, query):
+        digest = hashlib.sha1(normalize_query(query).encode('utf-8')).hexdigest()
+        return f"answer:v{self.index_version()}:{digest}"
+
+    def get(self, query):
+        """Cached final state for a query, or None"""
+        start_time = time.perf_counter()
+        try:
+            entry = self.backend.get(self._key(query))
+        except Exception as e:
+            print(f"⚠️  Answer cache read failed: {e}")
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._time_saved += max(entry['pipeline_time'] - (time.perf_counter() - start_time), 0.0)
+        return copy.deepcopy(entry['state'])  # callers may annotate the state
+
+    def set(self, query, state, pipeline_time):
+        """Store a final state along with how long the pipeline took to produce it"""
+        try:
+            entry = {'state': copy.deepcopy(state), 'pipeline_time': pipeline_time}
+            self.backend.set(self._key(query), entry, ttl=self.ttl)
+        except Exception as e:
+            print(f"⚠️  Answer cache write failed: {e}")
+
+    def invalidate(self):
+        """Drop every cached answer (call after documents are re-ingested)"""
+        version = self.backend.incr(INDEX_VERSION_KEY)
+        print(f"🧹 Answer cache invalidated (index version {version})")
+        return version
+
+    def stats(self):
+        """Hit ratio and pipeline time saved by cache hits"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            stats = {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+                'time_saved': self._time_saved
+            }
+        stats.update(self.backend.stats())
+        stats['index_version'] = self.index_version()
+        return stats
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Process-wide answer cache configured from the environment (None if disabled)"""
+    global _answer_cache
+    if ANSWER_CACHE_BACKEND == "none":
+        return None
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            backend = make_backend(ANSWER_CACHE_BACKEND, prefix="kb", max_entries=ANSWER_CACHE_SIZE)
+            _answer_cache = AnswerCache(backend)
+        return _answer_cache
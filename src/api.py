@@ -3,14 +3,22 @@ FastAPI REST API Service
 Exposes the multi-agent knowledge system
 """
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
 import time
 from dotenv import load_dotenv
 import os
 
 from .rag_system import RAGSystem
 from agent_orchestrator import AgentOrchestrator
+from perf_stats import LatencyTracker
+from answer_cache import get_answer_cache
+from semantic_cache import get_semantic_cache
+from validation_agent import VALIDATION_PREWARM
 
 load_dotenv()
 
@@ -25,6 +33,15 @@ app = FastAPI(
 api_key = os.getenv("GROQ_API_KEY")
 rag_system = RAGSystem(groq_api_key=api_key)
 
+# "async": run the pipeline on the event loop with AsyncGroq (blocking
+# encoding/ChromaDB/BM25 steps are offloaded to threads inside the agents).
+# "threads": run the blocking pipeline on a bounded worker pool.
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "async")
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "8"))
+# running + queued, beyond this → 503
+PIPELINE_MAX_PENDING = int(os.getenv("PIPELINE_MAX_PENDING", "512" if PIPELINE_MODE == "async" else "64"))
+pipeline_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+
 # Request/Response Models
 class QueryRequest(BaseModel):
     query: str
@@ -36,15 +53,24 @@ class SourceDocument(BaseModel):
 
 class ValidationInfo(BaseModel):
     status: str
-    confidence: int
+    confidence: Optional[int] = None  # None while validation is pending
 
 class QueryResponse(BaseModel):
+    request_id: str
     query: str
     reformulated_query: str
     answer: str
     validation: ValidationInfo
     sources: List[SourceDocument]
     processing_time: float
+    skipped_sources: Dict[str, str] = {}  # retrieval sources left out, e.g. after missing their deadline
+
+class ValidationStatusResponse(BaseModel):
+    request_id: str
+    status: str  # pending, done or error
+    is_valid: Optional[bool] = None
+    confidence: Optional[int] = None
+    result: Dict = {}
 
 class HealthResponse(BaseModel):
     status: str
@@ -56,14 +82,48 @@ class MetricsResponse(BaseModel):
     total_queries: int
     avg_latency: float
     avg_confidence: float
+    pipeline_mode: str = PIPELINE_MODE
+    pipeline_workers: int = PIPELINE_WORKERS
+    in_flight: int = 0
+    rejected_queries: int = 0
+    retrieval_latency: Dict[str, Dict[str, float]] = {}
+    llm: Dict = {}
+    streaming: Dict[str, Dict[str, float]] = {}
+    answer_cache: Dict = {}
+    semantic_cache: Dict = {}
+    reformulation: Dict = {}
+    speculation: Dict = {}
+    validation: Dict = {}
+    context_packing: Dict = {}
+    context_compression: Dict = {}
 
 # Global metrics
 metrics = {
     "total_queries": 0,
     "latencies": [],
-    "confidences": []
+    "confidences": [],
+    "in_flight": 0,
+    "rejected_queries": 0
 }
 
+answer_cache = get_answer_cache()
+semantic_cache = get_semantic_cache()
+
+# Time to first token and total time of /query/stream, tracked separately
+stream_latency = LatencyTracker()
+
+@app.on_event("startup")
+async def schedule_prewarm():
+    """Load validation models in the background once the server is accepting requests"""
+    if VALIDATION_PREWARM:
+        asyncio.get_running_loop().run_in_executor(None, rag_system.prewarm)
+
+@app.on_event("shutdown")
+def shutdown_pipeline():
+    """Stop accepting pipeline work and let running queries and validations finish"""
+    pipeline_executor.shutdown(wait=True)
+    rag_system.shutdown()
+
 # Health check endpoint
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -90,14 +150,24 @@ async def query(request: QueryRequest):
     Returns:
         QueryResponse with answer, sources, and validation
     """
+    # Shed load instead of queueing without bound
+    if metrics["in_flight"] >= PIPELINE_MAX_PENDING:
+        metrics["rejected_queries"] += 1
+        raise HTTPException(status_code=503, detail="Server busy, retry later")
+    
+    metrics["in_flight"] += 1
     try:
         start_time = time.time()
         
         # Store top_k in rag_system temporarily
         original_top_k = 5
         
-        # Run orchestrator
-        result = rag_system.answer_question(request.query)
+        # Run orchestrator without blocking the event loop
+        if PIPELINE_MODE == "async":
+            result = await rag_system.aanswer_question(request.query)
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(pipeline_executor, rag_system.answer_question, request.query)
         
         # Extract data
         processing_time = time.time() - start_time
@@ -110,25 +180,31 @@ async def query(request: QueryRequest):
                 relevance=doc["score"]
             ))
         
-        # Format validation
+        # Format validation (deferred validations are fetched from /validation/{request_id})
         validation_info = result.get("validation_result", {})
-        validation = ValidationInfo(
-            status="✅ VALID" if validation_info.get("is_valid") else "⚠️ NEEDS REVIEW",
-            confidence=validation_info.get("confidence", 0)
-        )
+        if validation_info.get("status") == "pending":
+            validation = ValidationInfo(status="⏳ PENDING")
+        else:
+            validation = ValidationInfo(
+                status="✅ VALID" if validation_info.get("is_valid") else "⚠️ NEEDS REVIEW",
+                confidence=validation_info.get("confidence", 0)
+            )
         
         # Update metrics
         metrics["total_queries"] += 1
         metrics["latencies"].append(processing_time)
-        metrics["confidences"].append(validation.confidence)
+        if validation.confidence is not None:
+            metrics["confidences"].append(validation.confidence)
         
         # Build response
         response = QueryResponse(
+            request_id=result.get("request_id", ""),
             query=result.get("original_query", ""),
             reformulated_query=result.get("reformulated_query", ""),
             answer=result.get("final_answer", ""),
             validation=validation,
             sources=sources,
+            skipped_sources=result.get("metadata", {}).get("skipped_sources", {}),
             processing_time=processing_time
         )
         
@@ -136,6 +212,77 @@ async def query(request: QueryRequest):
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    finally:
+        metrics["in_flight"] -= 1
+
+def _sse(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Streaming query endpoint
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """
+    Process a query and stream the result as Server-Sent Events
+    
+    Events: reformulated, retrieved, sources, token (answer text as it is
+    generated), validation, done (with ttft and total_time in seconds),
+    or error.
+    """
+    if metrics["in_flight"] >= PIPELINE_MAX_PENDING:
+        metrics["rejected_queries"] += 1
+        raise HTTPException(status_code=503, detail="Server busy, retry later")
+    
+    async def events():
+        metrics["in_flight"] += 1
+        start_time = time.perf_counter()
+        first_token = True
+        try:
+            async for event, data in rag_system.astream_answer(request.query):
+                if event == "token" and first_token:
+                    first_token = False
+                    stream_latency.record("ttft", time.perf_counter() - start_time)
+                if event == "validation" and data.get("confidence") is not None:
+                    metrics["confidences"].append(data["confidence"])
+                if event == "done":
+                    total_time = time.perf_counter() - start_time
+                    stream_latency.record("total", total_time)
+                    metrics["total_queries"] += 1
+                    metrics["latencies"].append(total_time)
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {'detail': str(e)})
+        finally:
+            metrics["in_flight"] -= 1
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Deferred validation status
+@app.get("/validation/{request_id}", response_model=ValidationStatusResponse)
+async def validation_status(request_id: str):
+    """
+    Validation verdict for an answer returned before it was validated
+    
+    Poll until status is "done" (or "error"); records expire after
+    VALIDATION_RESULT_TTL seconds.
+    """
+    record = rag_system.validation_status(request_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired request id")
+    
+    result = record.get("result", {})
+    return ValidationStatusResponse(
+        request_id=request_id,
+        status=record["status"],
+        is_valid=result.get("is_valid"),
+        confidence=result.get("confidence"),
+        result=result
+    )
 
 # Metrics endpoint
 @app.get("/metrics", response_model=MetricsResponse)
@@ -147,7 +294,21 @@ async def get_metrics():
     return MetricsResponse(
         total_queries=metrics["total_queries"],
         avg_latency=avg_latency,
-        avg_confidence=avg_confidence
+        avg_confidence=avg_confidence,
+        in_flight=metrics["in_flight"],
+        rejected_queries=metrics["rejected_queries"],
+        retrieval_latency=rag_system.retrieval_agent.latency_stats(),
+        llm=rag_system.llm.stats(),
+        streaming=stream_latency.summary(),
+        answer_cache=answer_cache.stats() if answer_cache is not None else {},
+        semantic_cache=semantic_cache.stats() if semantic_cache is not None else {},
+        reformulation=rag_system.query_agent.stats(),
+        speculation=rag_system.speculation_stats(),
+        validation=rag_system.validation_stats(),
+        context_packing=rag_system.synthesis_agent.packer.stats(),
+        context_compression=(
+            rag_system.synthesis_agent.compressor.stats() if rag_system.synthesis_agent.compressor else {}
+        )
     )
 
 # Root endpoint
@@ -160,6 +321,8 @@ async def root():
         "endpoints": {
             "health": "/health",
             "query": "/query (POST)",
+            "query_stream": "/query/stream (POST, Server-Sent Events)",
+            "validation": "/validation/{request_id}",
             "metrics": "/metrics",
             "docs": "/docs"
         }
@@ -0,0 +1,128 @@
+"""
+Cache Backends
+In-process LRU and Redis key-value stores with TTLs, shared by the caches
+"""
+from collections import OrderedDict
+import json
+import os
+import threading
+import time
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class LRUCacheBackend:
+    def __init__(self, max_entries=1024, default_ttl=None):
+        """
+        Thread-safe in-process LRU store
+
+        Args:
+            max_entries: Least recently used entries are evicted beyond this
+            default_ttl: Seconds before an entry expires (None = never)
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.default_ttl
+        with self._lock:
+            self._entries[key] = (time.time() + ttl if ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'entries': len(self._entries), 'max_entries': self.max_entries}
+
+
+class RedisCacheBackend:
+    def __init__(self, url=REDIS_URL, prefix="kb", default_ttl=None):
+        """
+        Redis store shared by every worker and replica
+
+        Values are stored as JSON under "<prefix>:<key>"; expiry uses Redis TTLs.
+        """
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key):
+        raw = self.client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.default_ttl
+        self.client.set(self._key(key), json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def get_counter(self, key):
+        raw = self.client.get(self._key(key))
+        return int(raw) if raw is not None else 0
+
+    def incr(self, key):
+        return int(self.client.incr(self._key(key)))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self._key("*"), count=1000):
+            self.client.delete(key)
+
+    def stats(self):
+        return {'backend': 'redis', 'prefix': self.prefix}
+
+
+def make_backend(kind, prefix, max_entries=1024, default_ttl=None):
+    """
+    Build a backend by name ("memory" or "redis")
+
+    Falls back to the in-process LRU if Redis is not installed or unreachable.
+    """
+    if kind == "redis":
+        try:
+            backend = RedisCacheBackend(REDIS_URL, prefix=prefix, default_ttl=default_ttl)
+            backend.client.ping()
+            return backend
+        except Exception as e:
+            print(f"⚠️  Redis cache unavailable ({e}), using in-process cache")
+    elif kind != "memory":
+        raise ValueError(f"Unknown cache backend '{kind}', expected 'memory' or 'redis'")
+    return LRUCacheBackend(max_entries=max_entries, default_ttl=default_ttl)
@@ -0,0 +1,141 @@
+"""
+Context Compressor
+Extractive compression of retrieved documents to the sentences that answer the query
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+from context_packer import make_token_counter, split_sentences
+from perf_stats import LatencyTracker
+
+CONTEXT_COMPRESSION_ENABLED = os.getenv("CONTEXT_COMPRESSION", "on").lower() not in ("0", "off", "false", "none")
+# Sentences kept by similarity to the query, across all retrieved documents
+COMPRESSION_TOP_SENTENCES = int(os.getenv("COMPRESSION_TOP_SENTENCES", "6"))
+# Neighbours kept on each side of a selected sentence (headings, antecedents, list continuations)
+COMPRESSION_WINDOW = int(os.getenv("COMPRESSION_WINDOW", "1"))
+
+
+class ContextCompressor:
+    def __init__(self, encoder=None, top_sentences=COMPRESSION_TOP_SENTENCES, window=COMPRESSION_WINDOW,
+                 token_counter=None):
+        """
+        Keep only the query-relevant sentences of retrieved documents
+
+        The query and every sentence are embedded in one encode call with
+        the shared MiniLM encoder; the top sentences by cosine similarity
+        are kept with a window of neighbours from the same document.
+
+        Args:
+            encoder: Embedding model with an encode() method (default: shared MiniLM)
+            top_sentences: Sentences selected by similarity
+            window: Neighbouring sentences kept on each side of a selected one
+            token_counter: Callable returning the token count of a text (default from CONTEXT_TOKENIZER)
+        """
+        self._encoder = encoder
+        self.top_sentences = top_sentences
+        self.window = window
+        self._token_counter = token_counter
+
+        self.latency = LatencyTracker()
+        self._totals = {'requests': 0, 'original_tokens': 0, 'compressed_tokens': 0, 'prompt_tokens_saved': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            from model_registry import get_encoder
+            self._encoder = get_encoder()
+        return self._encoder
+
+    @property
+    def token_counter(self):
+        if self._token_counter is None:
+            self._token_counter = make_token_counter()
+        return self._token_counter
+
+    def compress(self, query, documents, budget=None):
+        """
+        Compress documents for a query
+
+        Args:
+            query: Question the context is for
+            documents: Retrieved documents
+            budget: Prompt token budget applied after compression, used to
+                estimate the prompt tokens saved (without it: document tokens saved)
+
+        Returns:
+            (documents with only the kept sentences as content, stats)
+        """
+        start_time = time.perf_counter()
+        sentences = [(doc_index, sentence) for doc_index, doc in enumerate(documents)
+                     for sentence in split_sentences(doc['content'])]
+        if not sentences:
+            return documents, None
+
+        embeddings = np.asarray(self.encoder.encode([query] + [sentence for _, sentence in sentences]),
+                                dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms > 0, norms, 1)
+        similarities = embeddings[1:] @ embeddings[0]
+
+        kept = set()
+        for index in np.argsort(-similarities, kind="stable")[:self.top_sentences]:
+            doc_index = sentences[index][0]
+            for neighbour in range(index - self.window, index + self.window + 1):
+                if 0 <= neighbour < len(sentences) and sentences[neighbour][0] == doc_index:
+                    kept.add(neighbour)
+
+        compressed = []
+        for doc_index, doc in enumerate(documents):
+            indices = sorted(i for i in kept if sentences[i][0] == doc_index)
+            if not indices:
+                continue
+            parts = [sentences[indices[0]][1]]
+            for previous, index in zip(indices, indices[1:]):
+                parts.append(sentences[index][1] if index == previous + 1 else "... " + sentences[index][1])
+            compressed.append(dict(doc, content=" ".join(parts)))
+
+        original_tokens = sum(self.token_counter(sentence) for _, sentence in sentences)
+        compressed_tokens = sum(self.token_counter(sentences[i][1]) for i in kept)
+        cap = budget if budget is not None else original_tokens
+        stats = {
+            'sentences': len(sentences),
+            'kept_sentences': len(kept),
+            'original_tokens': original_tokens,
+            'compressed_tokens': compressed_tokens,
+            'compression_ratio': compressed_tokens / original_tokens if original_tokens else 1.0,
+            # The packer caps the prompt at the budget with or without compression
+            'prompt_tokens_saved': min(original_tokens, cap) - min(compressed_tokens, cap),
+            'time_ms': (time.perf_counter() - start_time) * 1000
+        }
+        self._record(stats)
+        return compressed, stats
+
+    def _record(self, stats):
+        self.latency.record('compress', stats['time_ms'] / 1000)
+        with self._lock:
+            self._totals['requests'] += 1
+            for key in ('original_tokens', 'compressed_tokens', 'prompt_tokens_saved'):
+                self._totals[key] += stats[key]
+        print(
+            f"🗜️  Context compressed: {stats['original_tokens']} → {stats['compressed_tokens']} tokens "
+            f"({stats['compression_ratio']:.0%}), {stats['kept_sentences']}/{stats['sentences']} sentences, "
+            f"{stats['prompt_tokens_saved']} prompt tokens saved ({stats['time_ms']:.1f} ms)"
+        )
+
+    def stats(self):
+        """Overall compression ratio, mean prompt tokens saved per request and compression time"""
+        with self._lock:
+            totals = dict(self._totals)
+        requests = totals['requests']
+        return {
+            'requests': requests,
+            'compression_ratio': (
+                totals['compressed_tokens'] / totals['original_tokens'] if totals['original_tokens'] else 1.0
+            ),
+            'mean_prompt_tokens_saved': totals['prompt_tokens_saved'] / requests if requests else 0.0,
+            'latency': self.latency.summary()
+        }
@@ -0,0 +1,234 @@
+"""
+Context Packer
+Fits the most relevant, non-redundant passages of retrieved documents into a prompt token budget
+"""
+import os
+import re
+import threading
+import time
+
+from perf_stats import LatencyTracker
+from query_agent import query_terms
+
+# Tokens of document text per prompt (headers and the question are extra)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "300"))
+# "encoder": tokenizer of the shared MiniLM model (already loaded for retrieval)
+# "approx": words plus punctuation marks, no model needed
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "encoder")
+# Sentences are grouped into passages of about this many tokens
+PASSAGE_TOKENS = 48
+# Word-trigram Jaccard similarity above which the lower-ranked passage is dropped
+DUPLICATE_THRESHOLD = 0.6
+# Relevance bonus of a passage from the top-ranked document (halves for the 2nd, ...)
+RANK_PRIOR = 0.25
+
+
+def split_sentences(text):
+    """
+    Sentences of a source text
+
+    Line breaks, markdown headings and FAQ questions also start one; an
+    FAQ answer stays with its question.
+    """
+    sentences = (
+        sentence.strip()
+        for sentence in re.split(r'(?<=[.!?])\s+(?!A:\s)|\n+|\s+(?=#{1,6}\s|Q:\s)', text)
+    )
+    return [sentence for sentence in sentences if len(sentence) > 10]
+
+
+def stem(term):
+    """Crude suffix stripping, so that "transferred" matches "transfers" and "policies" matches "policy" """
+    if term.endswith(("ss", "us", "is")):
+        return term  # process, status, analysis: not plurals
+    for suffix, replacement in (("ies", "y"), ("ing", ""), ("ed", ""), ("sses", "ss"), ("shes", "sh"),
+                                ("ches", "ch"), ("xes", "x"), ("zes", "z"), ("s", "")):
+        # "es" is only a plural ending after a sibilant (processes, but measures -> measure)
+        if term.endswith(suffix) and len(term) - len(suffix) + len(replacement) >= 4:
+            term = term[:len(term) - len(suffix)] + replacement
+            if suffix in ("ing", "ed") and term[-1] == term[-2] and term[-1] not in "aeiouls":
+                term = term[:-1]  # transferr(ed) -> transfer
+            return term
+    return term
+
+
+def _stems(text):
+    return {stem(term) for term in query_terms(text)}
+
+
+def approximate_token_count(text):
+    """Words plus punctuation marks, close to what subword tokenizers produce for English"""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def make_token_counter(kind=CONTEXT_TOKENIZER):
+    """
+    Token counting function for a tokenizer kind
+
+    Falls back to the approximate count when sentence-transformers is not installed.
+    """
+    if kind == "approx":
+        return approximate_token_count
+    if kind != "encoder":
+        raise ValueError(f"Unknown tokenizer '{kind}', expected 'encoder' or 'approx'")
+    try:
+        from model_registry import get_encoder
+        tokenizer = get_encoder().model.tokenizer
+    except ImportError as e:
+        print(f"⚠️  Local tokenizer unavailable ({e}), approximating token counts")
+        return approximate_token_count
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False, verbose=False))
+
+
+def _shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    return set(zip(words, words[1:], words[2:])) or set(words)
+
+
+class ContextPacker:
+    def __init__(self, budget=CONTEXT_TOKEN_BUDGET, token_counter=None, passage_tokens=PASSAGE_TOKENS,
+                 duplicate_threshold=DUPLICATE_THRESHOLD):
+        """
+        Pack retrieved documents into a token budget
+
+        Documents are cut into sentence passages, ranked by how many of the
+        query's terms they contain (plus a bonus for higher-ranked
+        documents), near-duplicates are dropped, and passages are added
+        greedily until the budget is full. Selected passages are put back
+        in document order so each source still reads top to bottom.
+
+        Args:
+            budget: Tokens of document text to pack
+            token_counter: Callable returning the token count of a text (default from CONTEXT_TOKENIZER)
+            passage_tokens: Target passage size
+            duplicate_threshold: Trigram Jaccard similarity that marks a near-duplicate
+        """
+        self.budget = budget
+        self._token_counter = token_counter
+        self.passage_tokens = passage_tokens
+        self.duplicate_threshold = duplicate_threshold
+
+        self.latency = LatencyTracker()
+        self._totals = {'requests': 0, 'candidate_tokens': 0, 'packed_tokens': 0, 'duplicates': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def token_counter(self):
+        if self._token_counter is None:
+            self._token_counter = make_token_counter()
+        return self._token_counter
+
+    def passages(self, documents):
+        """Sentence passages of each document: dicts with doc, position, text and tokens"""
+        passages = []
+        for doc_index, doc in enumerate(documents):
+            current, current_tokens = [], 0
+            for sentence in split_sentences(doc['content']):
+                tokens = self.token_counter(sentence)
+                if current and current_tokens + tokens > self.passage_tokens:
+                    passages.append(self._passage(doc_index, len(passages), current, current_tokens))
+                    current, current_tokens = [], 0
+                if tokens > 2 * self.passage_tokens:
+                    # Run-on text without sentence breaks: cut into word windows
+                    words = sentence.split()
+                    step = max(len(words) * self.passage_tokens // tokens, 1)
+                    for start in range(0, len(words), step):
+                        text = " ".join(words[start:start + step])
+                        passages.append(self._passage(doc_index, len(passages), [text], self.token_counter(text)))
+                    continue
+                current.append(sentence)
+                current_tokens += tokens
+            if current:
+                passages.append(self._passage(doc_index, len(passages), current, current_tokens))
+        return passages
+
+    @staticmethod
+    def _passage(doc_index, position, sentences, tokens):
+        return {'doc': doc_index, 'position': position, 'text': " ".join(sentences), 'tokens': tokens}
+
+    def pack(self, query, documents):
+        """
+        Select passages for a prompt
+
+        Args:
+            query: Question the context is for (None keeps document order)
+            documents: Retrieved documents, best first
+
+        Returns:
+            (packed documents with only the selected passages as content, stats)
+        """
+        start_time = time.perf_counter()
+        passages = self.passages(documents)
+
+        terms = _stems(query) if query else set()
+        for passage in passages:
+            coverage = len(terms & _stems(passage['text'])) / len(terms) if terms else 0.0
+            passage['score'] = coverage + RANK_PRIOR / (passage['doc'] + 1)
+
+        # Best first; earlier passages win ties (introductions, headings)
+        ranked = sorted(passages, key=lambda passage: (-passage['score'], passage['position']))
+        selected, selected_shingles = [], []
+        used_tokens = duplicates = 0
+        for passage in ranked:
+            if used_tokens + passage['tokens'] > self.budget:
+                continue  # a smaller passage further down may still fit
+            shingles = _shingles(passage['text'])
+            if any(len(shingles & other) / len(shingles | other) >= self.duplicate_threshold
+                   for other in selected_shingles):
+                duplicates += 1
+                continue
+            selected.append(passage)
+            selected_shingles.append(shingles)
+            used_tokens += passage['tokens']
+
+        packed = []
+        for doc_index, doc in enumerate(documents):
+            chosen = sorted((p for p in selected if p['doc'] == doc_index), key=lambda p: p['position'])
+            if not chosen:
+                continue
+            parts = [chosen[0]['text']]
+            for previous, passage in zip(chosen, chosen[1:]):
+                parts.append(passage['text'] if passage['position'] == previous['position'] + 1
+                             else "... " + passage['text'])
+            packed.append(dict(doc, content=" ".join(parts)))
+
+        stats = {
+            'budget': self.budget,
+            'candidate_tokens': sum(passage['tokens'] for passage in passages),
+            'packed_tokens': used_tokens,
+            'passages': len(passages),
+            'packed_passages': len(selected),
+            'duplicates': duplicates,
+            'documents': len(documents),
+            'packed_documents': len(packed),
+            'time_ms': (time.perf_counter() - start_time) * 1000
+        }
+        self._record(stats)
+        return packed, stats
+
+    def _record(self, stats):
+        self.latency.record('pack', stats['time_ms'] / 1000)
+        with self._lock:
+            self._totals['requests'] += 1
+            for key in ('candidate_tokens', 'packed_tokens', 'duplicates'):
+                self._totals[key] += stats[key]
+        print(
+            f"📦 Context packed: {stats['packed_tokens']}/{stats['budget']} tokens, "
+            f"{stats['packed_passages']}/{stats['passages']} passages from "
+            f"{stats['packed_documents']}/{stats['documents']} documents "
+            f"({stats['duplicates']} near-duplicates dropped, {stats['time_ms']:.1f} ms)"
+        )
+
+    def stats(self):
+        """Mean packed vs candidate tokens per request, duplicates dropped and packing time"""
+        with self._lock:
+            totals = dict(self._totals)
+        requests = totals['requests']
+        return {
+            'requests': requests,
+            'budget': self.budget,
+            'mean_packed_tokens': totals['packed_tokens'] / requests if requests else 0.0,
+            'mean_candidate_tokens': totals['candidate_tokens'] / requests if requests else 0.0,
+            'duplicates': totals['duplicates'],
+            'latency': self.latency.summary()
+        }
@@ -0,0 +1,167 @@
+"""
+Result Fusion
+Combines ranked lists from several retrievers, joined on stable document ids
+"""
+import numpy as np
+
+FUSION_STRATEGIES = ("rrf", "minmax", "zscore", "dbsf")
+RRF_K = 60  # rank offset from Cormack et al.; dampens the weight of the very first ranks
+
+
+def _document_key(result):
+    """Stable join key: the collection document id, falling back to the text"""
+    return result.get('doc_id') or result['content']
+
+
+def candidate_matrix(result_lists):
+    """
+    Align several result lists on document ids
+
+    Returns:
+        keys: Document key per candidate column
+        first_seen: (list index, position) of each candidate's first occurrence
+        scores: (num_lists, num_candidates) raw scores, NaN where a list missed the doc
+        ranks: Same shape, 1-based ranks, NaN where missing
+    """
+    columns = {}
+    keys, first_seen = [], []
+    rows, cols, raw_scores, raw_ranks = [], [], [], []
+    for list_index, results in enumerate(result_lists):
+        for position, result in enumerate(results):
+            key = _document_key(result)
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = len(keys)
+                keys.append(key)
+                first_seen.append((list_index, position))
+            rows.append(list_index)
+            cols.append(column)
+            raw_scores.append(result['score'])
+            raw_ranks.append(position + 1)
+
+    shape = (len(result_lists), len(keys))
+    scores = np.full(shape, np.nan)
+    ranks = np.full(shape, np.nan)
+    # Duplicates within one list keep their best (first) entry
+    for source, target in ((raw_scores, scores), (raw_ranks, ranks)):
+        target[rows[::-1], cols[::-1]] = source[::-1]
+    return keys, first_seen, scores, ranks
+
+
+def rrf_scores(ranks, weights, k=RRF_K):
+    """Reciprocal Rank Fusion: sum of w / (k + rank) over the lists that found the doc"""
+    contributions = np.where(np.isnan(ranks), 0.0, 1.0 / (k + np.nan_to_num(ranks)))
+    return weights @ contributions
+
+
+def minmax_normalize(scores):
+    """Scale each list to [0, 1]; missing docs score 0"""
+    low = np.nanmin(scores, axis=1, keepdims=True)
+    high = np.nanmax(scores, axis=1, keepdims=True)
+    spread = np.where(high > low, high - low, 1.0)
+    normalized = np.where(high > low, (scores - low) / spread, 1.0)
+    return np.nan_to_num(normalized, nan=0.0)
+
+
+def zscore_normalize(scores):
+    """
+    Standardize each list to zero mean and unit variance
+
+    Missing docs get the list's lowest z-score rather than 0, otherwise
+    not being retrieved would beat a below-average hit.
+    """
+    mean = np.nanmean(scores, axis=1, keepdims=True)
+    std = np.nanstd(scores, axis=1, keepdims=True)
+    normalized = (scores - mean) / np.where(std > 0, std, 1.0)
+    floor = np.nanmin(normalized, axis=1, keepdims=True)
+    return np.where(np.isnan(normalized), floor, normalized)
+
+
+def dbsf_normalize(scores):
+    """
+    Distribution-Based Score Fusion
+
+    Scales each list by its mean +/- 3 standard deviations and clips to
+    [0, 1], so a single outlier does not squash the rest of the list the
+    way min-max does. Missing docs score 0.
+    """
+    mean = np.nanmean(scores, axis=1, keepdims=True)
+    std = np.nanstd(scores, axis=1, keepdims=True)
+    low = mean - 3 * std
+    spread = np.where(std > 0, 6 * std, 1.0)
+    normalized = np.where(std > 0, (scores - low) / spread, 1.0)
+    return np.nan_to_num(np.clip(normalized, 0.0, 1.0), nan=0.0)
+
+
+NORMALIZERS = {
+    'minmax': minmax_normalize,
+    'zscore': zscore_normalize,
+    'dbsf': dbsf_normalize,
+}
+
+
+def fuse(result_lists, strategy="rrf", weights=None, top_k=None, names=None, rrf_k=RRF_K):
+    """
+    Fuse ranked result lists into a single ranking
+
+    Args:
+        result_lists: Lists of result dicts with 'content', 'score' and
+            ideally 'doc_id' (used to join the lists)
+        strategy: One of FUSION_STRATEGIES
+        weights: Per-list weights (default: equal)
+        top_k: Number of results to return (default: all candidates)
+        names: Per-list labels for the per-source score breakdown
+            (default: each list's 'method')
+        rrf_k: Rank offset for RRF
+
+    Returns:
+        Result dicts (copied from each doc's first occurrence) with 'score'
+        set to the fused score, plus 'source_scores' and 'source_ranks'
+    """
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy '{strategy}', expected one of {FUSION_STRATEGIES}")
+
+    result_lists = list(result_lists)
+    if names is None:
+        names = [results[0].get('method', f"list_{i}") if results else f"list_{i}"
+                 for i, results in enumerate(result_lists)]
+    weights = np.ones(len(result_lists)) if weights is None else np.asarray(weights, dtype=float)
+    if len(weights) != len(result_lists):
+        raise ValueError(f"Got {len(weights)} weights for {len(result_lists)} result lists")
+
+    # A retriever that found nothing contributes nothing
+    present = [i for i, results in enumerate(result_lists) if results]
+    result_lists = [result_lists[i] for i in present]
+    names = [names[i] for i in present]
+    weights = weights[present]
+
+    keys, first_seen, scores, ranks = candidate_matrix(result_lists)
+    if not keys:
+        return []
+
+    if strategy == "rrf":
+        fused = rrf_scores(ranks, weights, k=rrf_k)
+    else:
+        fused = weights @ NORMALIZERS[strategy](scores)
+        if strategy != "zscore":
+            fused = fused / weights.sum()  # keep bounded strategies in [0, 1]
+
+    # Highest fused score first; ties broken by best rank in any list
+    best_rank = np.nanmin(ranks, axis=0)
+    order = np.lexsort((best_rank, -fused))
+    if top_k is not None:
+        order = order[:top_k]
+
+    fused_results = []
+    for column in order:
+        list_index, position = first_seen[column]
+        result = dict(result_lists[list_index][position])
+        result['score'] = float(fused[column])
+        result['source_scores'] = {
+            name: float(scores[i, column]) for i, name in enumerate(names) if not np.isnan(scores[i, column])
+        }
+        result['source_ranks'] = {
+            name: int(ranks[i, column]) for i, name in enumerate(names) if not np.isnan(ranks[i, column])
+        }
+        fused_results.append(result)
+    return fused_results
@@ -1,102 +1,929 @@
 """
 Hybrid Search: Combines Vector Search + BM25 Sparse Retrieval
 """
-from rank_bm25 import BM25Okapi
+from collections import Counter
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
 import numpy as np
 
+from fusion import fuse
+
+SEARCH_MODES = ("exhaustive", "block_max")
+BLOCK_SIZE = 64          # postings per block for block-max upper bounds
+PRUNING_SLACK = 1e-9     # relative slack so float rounding never prunes a true top-k doc
+
+# Incremental updates: merge the delta segment into the main one past these sizes
+DELTA_MERGE_DOCS = 1000
+TOMBSTONE_MERGE_RATIO = 0.2
+
+# Stripped from both ends of a token, so "leave?" and "(leave" index as "leave"
+TOKEN_PUNCTUATION = ".,;:!?()[]{}\"'"
+
+# On-disk index format; bump when the layout below or tokenize() changes
+INDEX_FORMAT_VERSION = 2
+_BM25_ARRAYS = (
+    "indptr", "postings_docs", "postings_tf", "doc_len", "idf", "doc_norm",
+    "block_ptr", "block_max", "term_max"
+)
+
+
+def tokenize(text):
+    """Tokenizer shared by indexing, querying and the query specificity check"""
+    tokens = (token.strip(TOKEN_PUNCTUATION) for token in text.lower().split())
+    return [token for token in tokens if token]
+
+
+def okapi_idf(doc_freq, num_docs, epsilon):
+    """IDF with BM25Okapi's floor for very common terms"""
+    if len(doc_freq) == 0:
+        return np.zeros(0)
+    idf = np.log(num_docs - doc_freq + 0.5) - np.log(doc_freq + 0.5)
+    eps = epsilon * idf.mean()
+    idf[idf < 0] = eps
+    return idf
+
+
+def select_top_k(docs, scores, top_k):
+    """Partial selection, then sort only the winners (ties broken by position)"""
+    if len(scores) > top_k:
+        # Keep every document tied with the k-th score so tie-breaking is deterministic
+        kth_score = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+        candidates = np.nonzero(scores >= kth_score)[0]
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((docs[candidates], -scores[candidates]))[:top_k]
+    best = candidates[order]
+    return docs[best].astype(np.int64), scores[best]
+
+
+class BM25Index:
+    def __init__(self, tokenized_docs, k1=1.5, b=0.75, epsilon=0.25):
+        """
+        Inverted-index BM25 (Okapi), score-compatible with rank_bm25.BM25Okapi
+        
+        Postings are stored in CSR layout: the postings of term t live in
+        postings_docs/postings_tf[indptr[t]:indptr[t + 1]], sorted by doc.
+        
+        tokenized_docs: list of token lists
+        """
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        
+        # Collect (term, doc, tf) triples
+        vocab = {}
+        term_ids, doc_ids, tfs = [], [], []
+        doc_len = np.zeros(len(tokenized_docs), dtype=np.int32)
+        for doc_idx, tokens in enumerate(tokenized_docs):
+            doc_len[doc_idx] = len(tokens)
+            for token, tf in Counter(tokens).items():
+                term_ids.append(vocab.setdefault(token, len(vocab)))
+                doc_ids.append(doc_idx)
+                tfs.append(tf)
+        
+        self._set_postings(
+            vocab,
+            np.asarray(term_ids, dtype=np.int32),
+            np.asarray(doc_ids, dtype=np.int32),
+            np.asarray(tfs, dtype=np.int32),
+            doc_len
+        )
+    
+    @classmethod
+    def from_postings(cls, vocab, term_ids, doc_ids, tfs, doc_len, k1=1.5, b=0.75, epsilon=0.25):
+        """
+        Build an index directly from (term, doc, tf) triples
+        
+        Triples must be ordered by doc within each term once stably sorted
+        by term, e.g. grouped by document in increasing doc order.
+        """
+        index = cls.__new__(cls)
+        index.k1, index.b, index.epsilon = k1, b, epsilon
+        index._set_postings(vocab, term_ids, doc_ids, tfs, doc_len)
+        return index
+    
+    def _set_postings(self, vocab, term_ids, doc_ids, tfs, doc_len):
+        """Lay out postings in CSR order and compute collection statistics"""
+        self.vocab = vocab
+        order = np.argsort(term_ids, kind="stable")  # keeps docs sorted within a term
+        
+        self.postings_docs = doc_ids[order]
+        self.postings_tf = tfs[order]
+        doc_freq = np.bincount(term_ids, minlength=len(vocab))
+        self.indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=self.indptr[1:])
+        self.doc_len = doc_len
+        
+        self.num_docs = len(doc_len)
+        self.live = None  # optional mask of non-deleted documents
+        avgdl = float(doc_len.sum()) / self.num_docs if self.num_docs else 0.0
+        self.set_stats(okapi_idf(doc_freq, self.num_docs, self.epsilon), avgdl)
+        
+        self._init_stats()
+    
+    def set_stats(self, idf, avgdl):
+        """
+        Install IDF values and average document length
+        
+        Used at build time and when collection-wide statistics change
+        (documents added or deleted in another segment).
+        """
+        self.idf = idf
+        self.avgdl = avgdl
+        
+        # Per-document length normalisation, precomputed once
+        self.doc_norm = (
+            self.k1 * (1 - self.b + self.b * self.doc_len / avgdl) if avgdl
+            else np.full(self.num_docs, self.k1)
+        )
+        
+        # Block-max upper bounds, computed on first pruned query
+        self.block_ptr = None
+        self.block_max = None
+        self.term_max = None
+    
+    def _init_stats(self):
+        self._stats_lock = threading.Lock()
+        self._postings_stats = {mode: {'queries': 0, 'postings_visited': 0, 'postings_total': 0}
+                                for mode in SEARCH_MODES}
+    
+    def save(self, path):
+        """Write vocabulary, parameters and arrays (including block bounds) to a directory"""
+        self._ensure_bounds()
+        os.makedirs(path, exist_ok=True)
+        for name in _BM25_ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        
+        terms = [None] * len(self.vocab)
+        for term, term_id in self.vocab.items():
+            terms[term_id] = term
+        with open(os.path.join(path, "bm25.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                'k1': self.k1,
+                'b': self.b,
+                'epsilon': self.epsilon,
+                'num_docs': self.num_docs,
+                'avgdl': self.avgdl,
+                'vocab': terms
+            }, f)
+    
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load an index written by save()
+        
+        With mmap=True the arrays are memory-mapped read-only, so processes
+        loading the same files share their physical pages.
+        """
+        with open(os.path.join(path, "bm25.json"), 'r', encoding='utf-8') as f:
+            params = json.load(f)
+        
+        index = cls.__new__(cls)
+        index.k1, index.b, index.epsilon = params['k1'], params['b'], params['epsilon']
+        index.num_docs, index.avgdl = params['num_docs'], params['avgdl']
+        index.vocab = {term: term_id for term_id, term in enumerate(params['vocab'])}
+        for name in _BM25_ARRAYS:
+            setattr(index, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None))
+        index.live = None
+        index._init_stats()
+        return index
+    
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index arrays"""
+        return (
+            self.postings_docs.nbytes + self.postings_tf.nbytes + self.indptr.nbytes
+            + self.doc_len.nbytes + self.doc_norm.nbytes + self.idf.nbytes
+        )
+    
+    def _query_terms(self, query_tokens):
+        """Map query tokens to (term id, query count); unknown tokens score 0"""
+        counts = Counter(self.vocab[t] for t in query_tokens if t in self.vocab)
+        return list(counts.items())
+    
+    def _impacts(self, term_id, query_count, docs, tf):
+        """BM25 contribution of one term to the given documents"""
+        return query_count * self.idf[term_id] * tf * (self.k1 + 1) / (tf + self.doc_norm[docs])
+    
+    def _term_scores(self, term_id, query_count):
+        """Documents containing a term and their BM25 contribution"""
+        start, end = self.indptr[term_id], self.indptr[term_id + 1]
+        docs = self.postings_docs[start:end]
+        tf = self.postings_tf[start:end]
+        if self.live is not None:
+            keep = self.live[docs]
+            docs, tf = docs[keep], tf[keep]
+        return docs, self._impacts(term_id, query_count, docs, tf)
+    
+    def _record(self, mode, query_terms, visited):
+        """Accumulate postings-visited counters for a query"""
+        total = sum(int(self.indptr[t + 1] - self.indptr[t]) for t, _ in query_terms)
+        with self._stats_lock:
+            stats = self._postings_stats[mode]
+            stats['queries'] += 1
+            stats['postings_visited'] += visited
+            stats['postings_total'] += total
+    
+    def postings_stats(self):
+        """Postings visited vs. postings in the query terms' lists, per search mode"""
+        with self._stats_lock:
+            return {mode: dict(stats) for mode, stats in self._postings_stats.items()}
+    
+    def get_scores(self, query_tokens):
+        """Dense score vector over all documents (same as BM25Okapi.get_scores)"""
+        scores = np.zeros(self.num_docs)
+        for term_id, query_count in self._query_terms(query_tokens):
+            docs, term_scores = self._term_scores(term_id, query_count)
+            scores[docs] += term_scores
+        return scores
+    
+    def top_k(self, query_tokens, top_k=5):
+        """
+        Best-scoring documents, touching only postings of the query terms
+        
+        Returns:
+            (doc positions, scores), best first; documents without any
+            query term are never returned
+        """
+        return self._exhaustive_top_k(self._query_terms(query_tokens), top_k, "exhaustive")
+    
+    def _exhaustive_top_k(self, query_terms, top_k, mode):
+        """Score every posting of the query terms"""
+        parts = [self._term_scores(t, c) for t, c in query_terms]
+        if not parts or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        
+        if len(parts) == 1:
+            docs, scores = parts[0]
+        else:
+            docs, inverse = np.unique(np.concatenate([p[0] for p in parts]), return_inverse=True)
+            scores = np.bincount(inverse.ravel(), weights=np.concatenate([p[1] for p in parts]))
+        
+        self._record(mode, query_terms, sum(len(p[0]) for p in parts))
+        return select_top_k(docs, scores, top_k)
+    
+    def _ensure_bounds(self):
+        """Compute per-block and per-term maximum impacts"""
+        if self.block_max is not None:
+            return
+        doc_freq = np.diff(self.indptr)
+        num_blocks = (doc_freq + BLOCK_SIZE - 1) // BLOCK_SIZE
+        block_ptr = np.zeros(len(doc_freq) + 1, dtype=np.int64)
+        np.cumsum(num_blocks, out=block_ptr[1:])
+        
+        # Offset of every block's first posting
+        block_rank = np.arange(block_ptr[-1]) - np.repeat(block_ptr[:-1], num_blocks)
+        block_starts = np.repeat(self.indptr[:-1], num_blocks) + block_rank * BLOCK_SIZE
+        
+        term_of_posting = np.repeat(np.arange(len(doc_freq)), doc_freq)
+        tf = self.postings_tf
+        impacts = (self.idf[term_of_posting] * tf * (self.k1 + 1)
+                   / (tf + self.doc_norm[self.postings_docs]))
+        
+        block_max = np.maximum.reduceat(impacts, block_starts) if len(impacts) else np.zeros(0)
+        term_max = np.maximum.reduceat(block_max, block_ptr[:-1]) if len(block_max) else np.zeros(0)
+        self.block_ptr, self.term_max, self.block_max = block_ptr, term_max, block_max
+    
+    def _block_postings(self, term_id, blocks):
+        """Posting offsets covered by the given blocks of a term"""
+        start, end = self.indptr[term_id], self.indptr[term_id + 1]
+        offsets = (start + blocks[:, None] * BLOCK_SIZE + np.arange(BLOCK_SIZE)[None, :]).ravel()
+        return offsets[offsets < end]
+    
+    def top_k_pruned(self, query_tokens, top_k=5):
+        """
+        Safe early-termination top-k (Block-Max MaxScore)
+        
+        Returns exactly the same (positions, scores) as top_k() but skips
+        postings that provably cannot reach the top k:
+        1. The highest-bound terms are scored until k documents are seen;
+           the k-th best partial score is a lower bound (threshold) on the
+           final k-th score.
+        2. Of the remaining terms, the low-bound ones whose upper bounds sum
+           below the threshold are "non-essential": a document containing
+           only them cannot qualify, so their postings are never scanned.
+        3. Blocks of essential terms whose block max plus the other
+           remaining terms' upper bounds falls below the threshold are
+           skipped.
+        4. Surviving candidates are scored exactly by binary-searching
+           every query term's postings.
+        """
+        query_terms = self._query_terms(query_tokens)
+        if not query_terms or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        # Bounds assume non-negative contributions; tiny corpora can have negative IDF
+        if len(query_terms) == 1 or (self.idf[[t for t, _ in query_terms]] <= 0).any():
+            return self._exhaustive_top_k(query_terms, top_k, "block_max")
+        
+        self._ensure_bounds()
+        upper = {t: c * self.term_max[t] for t, c in query_terms}
+        by_upper = sorted(query_terms, key=lambda tc: upper[tc[0]], reverse=True)
+        
+        # 1. Score the strongest terms until k documents have been seen
+        scanned_parts = []
+        for t, c in by_upper:
+            scanned_parts.append(self._term_scores(t, c))
+            partial_docs, inverse = np.unique(np.concatenate([p[0] for p in scanned_parts]),
+                                              return_inverse=True)
+            if len(partial_docs) >= top_k:
+                break
+        remaining = by_upper[len(scanned_parts):]
+        if not remaining:
+            return self._exhaustive_top_k(query_terms, top_k, "block_max")
+        
+        visited = len(inverse)
+        partial_scores = np.bincount(inverse.ravel(), weights=np.concatenate([p[1] for p in scanned_parts]))
+        threshold = np.partition(partial_scores, -top_k)[-top_k] * (1 - PRUNING_SLACK)
+        
+        # 2. Essential terms: drop the longest low-bound prefix that sums below threshold
+        prefix = 0.0
+        num_non_essential = 0
+        for t, _ in reversed(remaining):
+            prefix += upper[t]
+            if prefix >= threshold:
+                break
+            num_non_essential += 1
+        essential = remaining[:len(remaining) - num_non_essential]
+        
+        # 3. Candidates: scanned documents that can still qualify, plus
+        #    documents from essential blocks that are not provably out
+        remaining_upper = sum(upper[t] for t, _ in remaining)
+        candidate_parts = [partial_docs[partial_scores + remaining_upper >= threshold]]
+        kept_blocks = {}
+        for t, c in essential:
+            bounds = c * self.block_max[self.block_ptr[t]:self.block_ptr[t + 1]] + remaining_upper - upper[t]
+            kept_blocks[t] = bounds >= threshold
+            offsets = self._block_postings(t, np.nonzero(kept_blocks[t])[0])
+            visited += len(offsets)
+            candidate_parts.append(self.postings_docs[offsets])
+        candidate_mask = np.zeros(self.num_docs, dtype=bool)
+        for part in candidate_parts:
+            candidate_mask[part] = True
+        if self.live is not None:
+            candidate_mask &= self.live
+        candidates = np.flatnonzero(candidate_mask)
+        
+        # 4. Exact scores for candidates, summed in the same term order as top_k()
+        scanned_terms = {t for t, _ in by_upper[:len(scanned_parts)]}
+        scores = np.zeros(len(candidates))
+        for t, c in query_terms:
+            start, end = self.indptr[t], self.indptr[t + 1]
+            docs = self.postings_docs[start:end]
+            pos = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+            hit = docs[pos] == candidates
+            if t in kept_blocks:
+                # Postings inside scanned blocks were already counted
+                visited += int((~kept_blocks[t][pos[hit] // BLOCK_SIZE]).sum())
+            elif t not in scanned_terms:
+                visited += int(hit.sum())
+            scores[hit] += self._impacts(t, c, candidates[hit], self.postings_tf[start + pos[hit]])
+        
+        self._record("block_max", query_terms, visited)
+        return select_top_k(candidates, scores, top_k)
+    
+    def search(self, query_tokens, top_k=5, mode="exhaustive"):
+        """Top-k search with the given mode ('exhaustive' or 'block_max')"""
+        if mode == "block_max":
+            return self.top_k_pruned(query_tokens, top_k)
+        if mode == "exhaustive":
+            return self.top_k(query_tokens, top_k)
+        raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+
+
+class StringTable:
+    def __init__(self, blob, offsets, parse_json=False):
+        """
+        Read-only list of strings stored as one UTF-8 blob plus offsets
+        
+        Item i is blob[offsets[i]:offsets[i + 1]]; with parse_json each
+        item is a JSON document decoded on access.
+        """
+        self.blob = blob
+        self.offsets = offsets
+        self.parse_json = parse_json
+    
+    @staticmethod
+    def save(values, path, name, as_json=False):
+        """Write a list of strings (or JSON-serialisable values) as <name>.blob.npy/<name>.offsets.npy"""
+        encoded = [(json.dumps(v) if as_json else v).encode('utf-8') for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        np.save(os.path.join(path, f"{name}.blob.npy"), blob)
+        np.save(os.path.join(path, f"{name}.offsets.npy"), offsets)
+    
+    @classmethod
+    def load(cls, path, name, parse_json=False, mmap=True):
+        mmap_mode = 'r' if mmap else None
+        blob = np.load(os.path.join(path, f"{name}.blob.npy"), mmap_mode=mmap_mode)
+        offsets = np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode=mmap_mode)
+        return cls(blob, offsets, parse_json)
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, index):
+        value = bytes(self.blob[self.offsets[index]:self.offsets[index + 1]]).decode('utf-8')
+        return json.loads(value) if self.parse_json else value
+    
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class ReadWriteLock:
+    """
+    Many concurrent readers or one writer
+    
+    The writer side is re-entrant (a write may trigger a merge) and may
+    also read; waiting writers hold back new readers so a steady query
+    load cannot starve updates.
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+        self._waiting_writers = 0
+    
+    @contextmanager
+    def read(self):
+        if self._writer == threading.get_ident():
+            yield  # the writer already excludes everyone else
+            return
+        with self._cond:
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+    
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._depth += 1
+            else:
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._waiting_writers -= 1
+                self._writer, self._depth = me, 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
 class HybridSearch:
-    def __init__(self, documents):
+    def __init__(self, documents, doc_ids=None, metadatas=None, search_mode="exhaustive"):
         """
         Initialize BM25 index
         documents: list of document texts
+        doc_ids: optional list of document ids (e.g. ChromaDB ids), same order
+        metadatas: optional list of metadata dicts, same order
+        search_mode: default top-k mode, 'exhaustive' or 'block_max' (same results)
         """
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{search_mode}', expected one of {SEARCH_MODES}")
+        self.search_mode = search_mode
         print("📚 Building BM25 index...")
         
-        # Tokenize documents
-        self.tokenized_docs = [doc.lower().split() for doc in documents]
+        # Tokenize documents (tokens are only needed while building)
+        tokenized_docs = [tokenize(doc) for doc in documents]
         self.documents = documents
         
-        # Create BM25 index
-        self.bm25 = BM25Okapi(self.tokenized_docs)
+        # Positional lookup tables: BM25 position -> id / metadata
+        self.doc_ids = list(doc_ids) if doc_ids is not None else [str(i) for i in range(len(documents))]
+        self.metadatas = list(metadatas) if metadatas is not None else [{} for _ in documents]
+        
+        # Create BM25 inverted index
+        self.bm25 = BM25Index(tokenized_docs)
+        self._lock = ReadWriteLock()
+        self._init_segments()
         print(f"✅ BM25 index created for {len(documents)} documents\n")
     
-    def bm25_search(self, query, top_k=5):
-        """Search using BM25 (keyword matching)"""
-        tokenized_query = query.lower().split()
-        scores = self.bm25.get_scores(tokenized_query)
+    def _init_segments(self):
+        """
+        State for incremental updates (LSM style)
         
-        # Get top-k indices
-        top_indices = np.argsort(scores)[::-1][:top_k]
+        The main segment (self.bm25 + positional tables) is immutable apart
+        from a tombstone mask. New and updated documents go to a small
+        in-memory delta segment; both are scored with collection-wide
+        statistics and merged once the delta or tombstones grow too large.
         
-        results = []
-        for idx in top_indices:
-            results.append({
-                'index': idx,
-                'score': scores[idx],
-                'content': self.documents[idx]
-            })
+        Writes (including merges, which swap the main segment and its
+        positional tables) hold self._lock for writing; searches hold it
+        for reading, so a query never mixes positions from one segment
+        with the tables of another.
+        """
+        self._positions = None            # doc_id -> position, built on first mutation
+        self._main_live = None            # tombstone mask over main positions
+        self._num_tombstones = 0
+        self._delta_docs = []             # dicts, or None once deleted
+        self._delta_postings = {}         # term -> [delta slot, ...]
+        self._num_delta_live = 0
+        self._df_adjust = Counter()       # term -> df change relative to the main segment
+        self._total_len = int(np.asarray(self.bm25.doc_len).sum())
+        self._delta_idf = {}              # idf of terms missing from the main vocabulary
+        self._stats_dirty = False
+        self.version = 0                  # bumped on every add/update/delete/merge
+    
+    def __len__(self):
+        """Number of live documents"""
+        return len(self.doc_ids) - self._num_tombstones + self._num_delta_live
+    
+    def save(self, path, fingerprint=None):
+        """
+        Serialize the index to a directory
+        
+        Pending delta documents and tombstones are merged first.
+        fingerprint: optional corpus identifier stored in the manifest so
+        loaders can tell whether the files match their collection
+        """
+        with self._lock.write():
+            if self.has_pending_changes():
+                self.merge()
+            os.makedirs(path, exist_ok=True)
+            self.bm25.save(path)
+            StringTable.save(self.documents, path, "documents")
+            StringTable.save(self.doc_ids, path, "doc_ids")
+            StringTable.save(self.metadatas, path, "metadatas", as_json=True)
+            
+            # Manifest last: its presence marks a complete index
+            with open(os.path.join(path, "manifest.json"), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'format_version': INDEX_FORMAT_VERSION,
+                    'num_documents': len(self.doc_ids),
+                    'fingerprint': fingerprint
+                }, f)
+        print(f"💾 BM25 index saved to {path}")
+    
+    @staticmethod
+    def read_manifest(path):
+        """Manifest of a saved index, or None if missing or from another format version"""
+        try:
+            with open(os.path.join(path, "manifest.json"), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('format_version') != INDEX_FORMAT_VERSION:
+            return None
+        return manifest
+    
+    @classmethod
+    def load(cls, path, search_mode="exhaustive", mmap=True):
+        """Load an index written by save(), memory-mapping its arrays"""
+        if cls.read_manifest(path) is None:
+            raise ValueError(f"No BM25 index with format version {INDEX_FORMAT_VERSION} at {path}")
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{search_mode}', expected one of {SEARCH_MODES}")
+        
+        index = cls.__new__(cls)
+        index.search_mode = search_mode
+        index.bm25 = BM25Index.load(path, mmap=mmap)
+        index.documents = StringTable.load(path, "documents", mmap=mmap)
+        index.doc_ids = StringTable.load(path, "doc_ids", mmap=mmap)
+        index.metadatas = StringTable.load(path, "metadatas", parse_json=True, mmap=mmap)
+        index._lock = ReadWriteLock()
+        index._init_segments()
+        print(f"📂 BM25 index loaded from {path} ({len(index.doc_ids)} documents)\n")
+        return index
+    
+    def get_document(self, index):
+        """Resolve a BM25 position to its id, text and metadata in O(1)"""
+        num_main = len(self.doc_ids)
+        if index >= num_main:
+            delta_doc = self._delta_docs[index - num_main]
+            doc_id, content, metadata = delta_doc['doc_id'], delta_doc['content'], delta_doc['metadata']
+        else:
+            doc_id, content, metadata = self.doc_ids[index], self.documents[index], self.metadatas[index]
+        metadata = metadata or {}
+        return {
+            'index': int(index),
+            'doc_id': doc_id,
+            'content': content,
+            'source': metadata.get('source_file', 'unknown'),
+            'metadata': metadata
+        }
+    
+    # ----- Incremental updates -----
+    
+    def _ensure_positions(self):
+        """Build the doc_id -> position map (only needed once documents change)"""
+        if self._positions is None:
+            self._positions = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+            self._main_live = np.ones(len(self.doc_ids), dtype=bool)
+    
+    def _remove(self, doc_id):
+        """Tombstone or drop one document; returns False if unknown"""
+        position = self._positions.pop(doc_id, None)
+        if position is None:
+            return False
+        
+        num_main = len(self.doc_ids)
+        if position < num_main:
+            self._main_live[position] = False
+            self.bm25.live = self._main_live
+            self._num_tombstones += 1
+            counts = Counter(tokenize(self.documents[position]))
+        else:
+            slot = position - num_main
+            delta_doc = self._delta_docs[slot]
+            self._delta_docs[slot] = None
+            self._num_delta_live -= 1
+            counts = delta_doc['counts']
+            for term in counts:
+                self._delta_postings[term].remove(slot)
+        
+        self._df_adjust.subtract(counts.keys())
+        self._total_len -= sum(counts.values())
+        return True
+    
+    def _stored_metadata(self, doc_id):
+        """Metadata currently indexed for a document ({} if unknown)"""
+        position = self._positions.get(doc_id)
+        if position is None:
+            return {}
+        num_main = len(self.doc_ids)
+        if position < num_main:
+            return self.metadatas[position] or {}
+        return self._delta_docs[position - num_main]['metadata']
+    
+    def _append(self, doc_id, content, metadata):
+        """Add one document to the delta segment"""
+        counts = Counter(tokenize(content))
+        slot = len(self._delta_docs)
+        self._delta_docs.append({
+            'doc_id': doc_id,
+            'content': content,
+            'metadata': metadata or {},
+            'counts': counts,
+            'length': sum(counts.values())
+        })
+        for term in counts:
+            self._delta_postings.setdefault(term, []).append(slot)
+        self._df_adjust.update(counts.keys())
+        self._total_len += sum(counts.values())
+        self._num_delta_live += 1
+        self._positions[doc_id] = len(self.doc_ids) + slot
+    
+    def _after_write(self):
+        self._stats_dirty = True
+        self.version += 1
+        if (self._num_delta_live >= DELTA_MERGE_DOCS
+                or self._num_tombstones > TOMBSTONE_MERGE_RATIO * max(len(self.doc_ids), 1)):
+            self.merge()
+    
+    def add_documents(self, doc_ids, documents, metadatas=None):
+        """
+        Index new documents without rebuilding
+        
+        Raises:
+            ValueError: if a document id is already indexed
+        """
+        metadatas = metadatas or [{} for _ in documents]
+        with self._lock.write():
+            self._ensure_positions()
+            duplicates = [doc_id for doc_id in doc_ids if doc_id in self._positions]
+            if duplicates:
+                raise ValueError(f"Documents already indexed: {duplicates[:5]}")
+            for doc_id, content, metadata in zip(doc_ids, documents, metadatas):
+                self._append(doc_id, content, metadata)
+            self._after_write()
+    
+    def update_documents(self, doc_ids, documents, metadatas=None):
+        """
+        Replace the text/metadata of indexed documents
+        
+        Without metadatas each document keeps its stored metadata.
+        
+        Raises:
+            KeyError: if a document id is not indexed
+        """
+        with self._lock.write():
+            self._ensure_positions()
+            missing = [doc_id for doc_id in doc_ids if doc_id not in self._positions]
+            if missing:
+                raise KeyError(f"Documents not indexed: {missing[:5]}")
+            if metadatas is None:
+                metadatas = [self._stored_metadata(doc_id) for doc_id in doc_ids]
+            for doc_id, content, metadata in zip(doc_ids, documents, metadatas):
+                self._remove(doc_id)
+                self._append(doc_id, content, metadata)
+            self._after_write()
+    
+    def upsert_documents(self, doc_ids, documents, metadatas=None):
+        """Add new documents and replace the ones already indexed (keeping their metadata if none is given)"""
+        with self._lock.write():
+            self._ensure_positions()
+            if metadatas is None:
+                metadatas = [self._stored_metadata(doc_id) for doc_id in doc_ids]
+            for doc_id, content, metadata in zip(doc_ids, documents, metadatas):
+                self._remove(doc_id)
+                self._append(doc_id, content, metadata)
+            self._after_write()
+    
+    def delete_documents(self, doc_ids):
+        """Remove documents by id; unknown ids are ignored. Returns the number removed"""
+        with self._lock.write():
+            self._ensure_positions()
+            removed = sum(self._remove(doc_id) for doc_id in doc_ids)
+            if removed:
+                self._after_write()
+            return removed
+    
+    def has_pending_changes(self):
+        """Whether there are delta documents or tombstones not yet merged"""
+        return bool(self._delta_docs) or self._num_tombstones > 0
+    
+    def _refresh_stats(self):
+        """Recompute IDF and average length over main + delta after changes"""
+        if not self._stats_dirty:
+            return
+        with self._lock.write():
+            if not self._stats_dirty:
+                return
+            vocab = self.bm25.vocab
+            main_df = np.diff(self.bm25.indptr).astype(np.int64)
+            extra_terms, extra_df = [], []
+            for term, change in self._df_adjust.items():
+                term_id = vocab.get(term)
+                if term_id is not None:
+                    main_df[term_id] += change
+                elif change > 0:
+                    extra_terms.append(term)
+                    extra_df.append(change)
+            
+            all_df = np.concatenate([main_df, np.asarray(extra_df, dtype=np.int64)])
+            present = all_df > 0
+            num_docs = len(self)
+            idf = np.zeros(len(all_df))
+            idf[present] = okapi_idf(all_df[present], num_docs, self.bm25.epsilon)
+            
+            avgdl = self._total_len / num_docs if num_docs else 0.0
+            self.bm25.set_stats(idf[:len(main_df)], avgdl)
+            self._delta_idf = dict(zip(extra_terms, idf[len(main_df):]))
+            self._stats_dirty = False
+    
+    def has_term(self, term):
+        """Whether any live document contains the term"""
+        with self._lock.read():
+            term_id = self.bm25.vocab.get(term)
+            doc_freq = int(self.bm25.indptr[term_id + 1] - self.bm25.indptr[term_id]) if term_id is not None else 0
+            return doc_freq + self._df_adjust.get(term, 0) > 0
+    
+    def _term_idf(self, term):
+        term_id = self.bm25.vocab.get(term)
+        return self.bm25.idf[term_id] if term_id is not None else self._delta_idf.get(term, 0.0)
+    
+    def _score_delta(self, query_tokens):
+        """Score the (small) delta segment; returns positions and scores"""
+        bm25 = self.bm25
+        scores = {}
+        for term, query_count in Counter(query_tokens).items():
+            slots = self._delta_postings.get(term)
+            if not slots:
+                continue
+            idf = self._term_idf(term)
+            for slot in slots:
+                delta_doc = self._delta_docs[slot]
+                tf = delta_doc['counts'][term]
+                norm = bm25.k1 * (1 - bm25.b + bm25.b * delta_doc['length'] / bm25.avgdl)
+                scores[slot] = scores.get(slot, 0.0) + query_count * idf * tf * (bm25.k1 + 1) / (tf + norm)
+        
+        num_main = len(self.doc_ids)
+        positions = np.fromiter((num_main + slot for slot in scores), dtype=np.int64, count=len(scores))
+        return positions, np.fromiter(scores.values(), dtype=float, count=len(scores))
+    
+    def merge(self):
+        """
+        Fold the delta segment and tombstones into a new main segment
+        
+        Works on the existing postings arrays, so no document is
+        re-tokenized except the (small) delta ones already in memory.
+        """
+        with self._lock.write():
+            if not self.has_pending_changes():
+                return
+            start_time = time.time()
+            bm25 = self.bm25
+            num_main = len(self.doc_ids)
+            live = self._main_live if self._main_live is not None else np.ones(num_main, dtype=bool)
+            
+            # Live main postings, renumbered
+            new_position = np.cumsum(live) - 1
+            posting_terms = np.repeat(np.arange(len(bm25.vocab), dtype=np.int32), np.diff(bm25.indptr))
+            keep = live[bm25.postings_docs]
+            term_parts = [posting_terms[keep]]
+            doc_parts = [new_position[bm25.postings_docs[keep]].astype(np.int32)]
+            tf_parts = [np.asarray(bm25.postings_tf)[keep]]
+            len_parts = [np.asarray(bm25.doc_len)[live]]
+            
+            # Live delta documents appended after them
+            vocab = dict(bm25.vocab)
+            live_delta = [d for d in self._delta_docs if d is not None]
+            num_live_main = int(live.sum())
+            delta_terms, delta_docs, delta_tfs = [], [], []
+            for i, delta_doc in enumerate(live_delta):
+                for term, tf in delta_doc['counts'].items():
+                    delta_terms.append(vocab.setdefault(term, len(vocab)))
+                    delta_docs.append(num_live_main + i)
+                    delta_tfs.append(tf)
+            term_parts.append(np.asarray(delta_terms, dtype=np.int32))
+            doc_parts.append(np.asarray(delta_docs, dtype=np.int32))
+            tf_parts.append(np.asarray(delta_tfs, dtype=np.int32))
+            len_parts.append(np.asarray([d['length'] for d in live_delta], dtype=np.int32))
+            
+            # Drop terms whose documents were all deleted
+            term_ids = np.concatenate(term_parts)
+            doc_freq = np.bincount(term_ids, minlength=len(vocab))
+            remap = np.cumsum(doc_freq > 0) - 1
+            compact_vocab = {term: int(remap[t]) for term, t in vocab.items() if doc_freq[t] > 0}
+            
+            self.bm25 = BM25Index.from_postings(
+                compact_vocab, remap[term_ids].astype(np.int32),
+                np.concatenate(doc_parts), np.concatenate(tf_parts), np.concatenate(len_parts),
+                k1=bm25.k1, b=bm25.b, epsilon=bm25.epsilon
+            )
+            
+            live_positions = np.flatnonzero(live)
+            self.documents = [self.documents[i] for i in live_positions] + [d['content'] for d in live_delta]
+            self.doc_ids = [self.doc_ids[i] for i in live_positions] + [d['doc_id'] for d in live_delta]
+            self.metadatas = [self.metadatas[i] for i in live_positions] + [d['metadata'] for d in live_delta]
+            
+            version = self.version
+            self._init_segments()
+            self.version = version + 1
+            print(f"🗜️  Merged BM25 segments in {time.time() - start_time:.2f}s ({len(self.doc_ids)} documents)")
+    
+    def bm25_search(self, query, top_k=5, mode=None):
+        """Search using BM25 (keyword matching)"""
+        self._refresh_stats()
+        query_tokens = tokenize(query)
+        # Positions are only meaningful for the segments they were scored
+        # against, so resolve them before a merge or delete can intervene
+        with self._lock.read():
+            positions, scores = self.bm25.search(query_tokens, top_k, mode or self.search_mode)
+            
+            if self._num_delta_live:
+                delta_positions, delta_scores = self._score_delta(query_tokens)
+                positions, scores = select_top_k(
+                    np.concatenate([positions, delta_positions]),
+                    np.concatenate([scores, delta_scores]),
+                    top_k
+                )
+            
+            results = []
+            for idx, score in zip(positions, scores):
+                result = self.get_document(idx)
+                result['score'] = float(score)
+                results.append(result)
         
         return results
     
-    def hybrid_search(self, query, vector_results, top_k=5):
+    def hybrid_search(self, query, vector_results, top_k=5, strategy="rrf", weights=None):
         """
         Combine vector search + BM25 results
-        Uses Reciprocal Rank Fusion (RRF)
+        
+        The two ranked lists are joined on document ids and fused with
+        one of fusion.FUSION_STRATEGIES (Reciprocal Rank Fusion by default).
         """
         print(f"🔀 Performing hybrid search for: '{query}'\n")
         
         # Get BM25 results
         bm25_results = self.bm25_search(query, top_k)
         
-        # Normalize and combine scores (simple average)
-        combined_scores = {}
-        
-        # Add vector scores
-        for vec_result in vector_results:
-            doc_id = vec_result.get('index', 0)
-            combined_scores[doc_id] = {
-                'vector_score': vec_result['score'],
-                'bm25_score': 0,
-                'content': vec_result['content']
-            }
-        
-        # Add BM25 scores
-        for bm25_result in bm25_results:
-            doc_id = bm25_result['index']
-            if doc_id not in combined_scores:
-                combined_scores[doc_id] = {
-                    'vector_score': 0,
-                    'bm25_score': 0,
-                    'content': bm25_result['content']
-                }
-            combined_scores[doc_id]['bm25_score'] = bm25_result['score']
-        
-        # Calculate combined score (weighted average)
-        for doc_id in combined_scores:
-            vector_score = combined_scores[doc_id]['vector_score']
-            bm25_score = combined_scores[doc_id]['bm25_score'] / 100  # Normalize
-            
-            # Weighted combination
-            combined_scores[doc_id]['combined_score'] = (
-                0.6 * vector_score +  # 60% weight to vector
-                0.4 * bm25_score      # 40% weight to BM25
-            )
-        
-        # Sort by combined score
-        sorted_results = sorted(
-            combined_scores.items(),
-            key=lambda x: x[1]['combined_score'],
-            reverse=True
-        )[:top_k]
+        fused = fuse(
+            [vector_results, bm25_results],
+            strategy=strategy,
+            weights=weights,
+            top_k=top_k,
+            names=['vector', 'bm25']
+        )
         
         results = []
-        for doc_id, scores_info in sorted_results:
+        for result in fused:
             results.append({
-                'index': doc_id,
-                'content': scores_info['content'],
-                'vector_score': scores_info['vector_score'],
-                'bm25_score': scores_info['bm25_score'],
-                'combined_score': scores_info['combined_score']
+                'doc_id': result.get('doc_id'),
+                'content': result['content'],
+                'source': result.get('source', 'unknown'),
+                'vector_score': result['source_scores'].get('vector', 0),
+                'bm25_score': result['source_scores'].get('bm25', 0),
+                'combined_score': result['score']
             })
         
         print(f"✅ Hybrid search returned {len(results)} results\n")
@@ -0,0 +1,257 @@
+"""
+LLM Gateway
+Single process-wide entry point for every LLM call made by the agents
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+import weakref
+
+import httpx
+from groq import AsyncGroq, Groq
+
+from perf_stats import LatencyTracker
+
+# Connection pool shared by all agents; one worker can hold hundreds of
+# in-flight LLM calls on a handful of keep-alive sockets
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+# One timeout policy for every agent
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# Concurrent requests allowed per model (LLM_MODEL_LIMITS="model=n,..." overrides per model)
+LLM_MODEL_CONCURRENCY = int(os.getenv("LLM_MODEL_CONCURRENCY", "32"))
+# HTTP/2 multiplexing needs the optional h2 package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def _parse_model_limits(spec):
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, limit = item.partition("=")
+        limits[model.strip()] = int(limit)
+    return limits
+
+
+MODEL_LIMITS = _parse_model_limits(os.getenv("LLM_MODEL_LIMITS", ""))
+
+
+class _ConnectionStats:
+    """Counts requests vs newly opened connections from httpcore trace events"""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self._lock = threading.Lock()
+
+    def _count(self, event_name):
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
+
+    def on_request(self, request):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = lambda event_name, info: self._count(event_name)
+
+    async def aon_request(self, request):
+        with self._lock:
+            self.requests += 1
+
+        async def trace(event_name, info):
+            self._count(event_name)
+        request.extensions["trace"] = trace
+
+    def summary(self):
+        with self._lock:
+            requests, new_connections = self.requests, self.new_connections
+        return {
+            'requests': requests,
+            'new_connections': new_connections,
+            'reuse_rate': 1 - new_connections / requests if requests else 0.0
+        }
+
+
+class LLMGateway:
+    def __init__(self, api_key=None):
+        """
+        Shared LLM clients, limits and metrics for one API key
+
+        Sync calls go through one pooled httpx.Client; async calls through
+        one pooled httpx.AsyncClient per event loop. Both enforce the
+        per-model concurrency limit and record latency and token usage.
+        """
+        self.api_key = api_key
+        self.latency = LatencyTracker()
+        self.connections = _ConnectionStats()
+        self._tokens = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        # Async clients and semaphores are bound to the loop that created them
+        self._async = weakref.WeakKeyDictionary()
+
+        self._client = Groq(
+            api_key=api_key,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                limits=self._limits(),
+                timeout=self._timeout(),
+                event_hooks={'request': [self.connections.on_request]}
+            )
+        )
+
+    @staticmethod
+    def _limits():
+        return httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        )
+
+    @staticmethod
+    def _timeout():
+        return httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+    @staticmethod
+    def model_limit(model):
+        return MODEL_LIMITS.get(model, LLM_MODEL_CONCURRENCY)
+
+    def _semaphore(self, model):
+        with self._lock:
+            semaphore = self._semaphores.get(model)
+            if semaphore is None:
+                semaphore = self._semaphores[model] = threading.BoundedSemaphore(self.model_limit(model))
+            return semaphore
+
+    def _async_state(self):
+        """AsyncGroq client and per-model semaphores for the running loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._async.get(loop)
+            if state is None:
+                client = AsyncGroq(
+                    api_key=self.api_key,
+                    max_retries=LLM_MAX_RETRIES,
+                    http_client=httpx.AsyncClient(
+                        http2=HTTP2_AVAILABLE,
+                        limits=self._limits(),
+                        timeout=self._timeout(),
+                        event_hooks={'request': [self.connections.aon_request]}
+                    )
+                )
+                state = self._async[loop] = {'client': client, 'semaphores': {}}
+            return state
+
+    def _record(self, model, seconds, ok, usage=None):
+        self.latency.record(model, seconds)
+        with self._lock:
+            if not ok:
+                self._errors[model] = self._errors.get(model, 0) + 1
+            if usage is not None:
+                tokens = self._tokens.setdefault(model, {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0})
+                for field in tokens:
+                    tokens[field] += getattr(usage, field, 0) or 0
+
+    def _async_semaphore(self, state, model):
+        semaphore = state['semaphores'].get(model)
+        if semaphore is None:
+            semaphore = state['semaphores'][model] = asyncio.Semaphore(self.model_limit(model))
+        return semaphore
+
+    def chat(self, model, messages, **kwargs):
+        """Chat completion (same arguments as groq chat.completions.create)"""
+        with self._semaphore(model):
+            start_time = time.perf_counter()
+            response = None
+            try:
+                response = self._client.chat.completions.create(model=model, messages=messages, **kwargs)
+                return response
+            finally:
+                self._record(model, time.perf_counter() - start_time, response is not None,
+                             getattr(response, 'usage', None))
+
+    async def achat(self, model, messages, **kwargs):
+        """Async chat completion on the shared AsyncGroq client"""
+        state = self._async_state()
+        async with self._async_semaphore(state, model):
+            start_time = time.perf_counter()
+            response = None
+            try:
+                response = await state['client'].chat.completions.create(model=model, messages=messages, **kwargs)
+                return response
+            finally:
+                self._record(model, time.perf_counter() - start_time, response is not None,
+                             getattr(response, 'usage', None))
+
+    async def astream_chat(self, model, messages, **kwargs):
+        """
+        Stream a chat completion, yielding content deltas as they arrive
+
+        Time to first token is recorded as "<model>/ttft" next to the
+        model's total latency.
+        """
+        state = self._async_state()
+        async with self._async_semaphore(state, model):
+            start_time = time.perf_counter()
+            first_token = True
+            usage = None
+            ok = False
+            try:
+                stream = await state['client'].chat.completions.create(
+                    model=model, messages=messages, stream=True, **kwargs
+                )
+                async for chunk in stream:
+                    # Groq reports usage on the final chunk
+                    x_groq = getattr(chunk, 'x_groq', None)
+                    if x_groq is not None and getattr(x_groq, 'usage', None) is not None:
+                        usage = x_groq.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if first_token:
+                            first_token = False
+                            self.latency.record(f"{model}/ttft", time.perf_counter() - start_time)
+                        yield delta
+                ok = True
+            finally:
+                self._record(model, time.perf_counter() - start_time, ok, usage)
+
+    def stats(self):
+        """Per-model latency, token counts and errors plus connection reuse"""
+        latency = self.latency.summary()
+        with self._lock:
+            tokens = {model: dict(counts) for model, counts in self._tokens.items()}
+            errors = dict(self._errors)
+        ttft = {name[:-len("/ttft")]: latency.pop(name) for name in list(latency) if name.endswith("/ttft")}
+        models = {}
+        for model in set(latency) | set(tokens) | set(errors):
+            models[model] = dict(latency.get(model, {}), errors=errors.get(model, 0), limit=self.model_limit(model))
+            models[model].update(tokens.get(model, {}))
+            if model in ttft:
+                models[model].update({'ttft_p50_ms': ttft[model]['p50_ms'], 'ttft_p99_ms': ttft[model]['p99_ms']})
+        return {
+            'models': models,
+            'connections': self.connections.summary(),
+            'http2': HTTP2_AVAILABLE
+        }
+
+
+# One gateway per API key, shared across the process
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(api_key=None):
+    """Get the process-wide LLM gateway for an API key"""
+    with _gateways_lock:
+        gateway = _gateways.get(api_key)
+        if gateway is None:
+            gateway = _gateways[api_key] = LLMGateway(api_key)
+        return gateway
@@ -0,0 +1,262 @@
+"""
+Model Registry
+Process-wide cache of SentenceTransformer encoders and cross-encoders shared by every component
+"""
+import gc
+import threading
+import time
+
+from perf_stats import current_rss_mb
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+SUPPORTED_PRECISIONS = ("float32", "float16", "bfloat16")
+# "embedding" (SentenceTransformer) or "cross_encoder" (CrossEncoder, e.g. NLI models)
+MODEL_KINDS = ("embedding", "cross_encoder")
+
+
+class _RegistryEntry:
+    """A loaded model plus its bookkeeping (model is None once freed)"""
+
+    def __init__(self, model, load_time, rss_delta_mb):
+        self.model = model
+        self.refcount = 0
+        self.load_time = load_time
+        self.rss_delta_mb = rss_delta_mb
+
+
+class ModelRegistry:
+    def __init__(self):
+        """
+        Registry of loaded models keyed by (model name, device, precision, kind)
+
+        The registry lock only guards the entries map; each key has its own
+        load lock, so loading one model never blocks users of another.
+        """
+        self._entries = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model_name, device, precision, kind="embedding"):
+        if precision not in SUPPORTED_PRECISIONS:
+            raise ValueError(
+                f"Unsupported precision '{precision}', expected one of {SUPPORTED_PRECISIONS}"
+            )
+        if kind not in MODEL_KINDS:
+            raise ValueError(f"Unsupported model kind '{kind}', expected one of {MODEL_KINDS}")
+        return (model_name, device or "auto", precision, kind)
+
+    def _load(self, model_name, device, precision, kind):
+        """Load a model from disk (called with only that model's load lock held)"""
+        label = "cross-encoder" if kind == "cross_encoder" else "embedding model"
+        print(f"📦 Loading {label}: {model_name} (device={device or 'auto'}, {precision})")
+        rss_before = current_rss_mb()
+        start_time = time.time()
+
+        if kind == "cross_encoder":
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(model_name, device=device)
+            module = model.model  # the underlying transformers model
+        else:
+            from sentence_transformers import SentenceTransformer
+            model = module = SentenceTransformer(model_name, device=device)
+        if precision == "float16":
+            module.half()
+        elif precision == "bfloat16":
+            import torch
+            module.to(torch.bfloat16)
+
+        load_time = time.time() - start_time
+        rss_delta = current_rss_mb() - rss_before
+        print(f"✅ Model loaded in {load_time:.2f}s (+{rss_delta:.0f} MB RSS)")
+
+        return _RegistryEntry(model, load_time, rss_delta)
+
+    def _loaded_entry(self, key, model_name, device, precision, kind):
+        """Entry for a key, loading the model first if it is not resident"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load(model_name, device, precision, kind)
+                with self._lock:
+                    self._entries[key] = entry
+        return entry
+
+    def _acquire_entry(self, model_name, device, precision, kind):
+        """Take a reference on a resident entry, loading it on first use"""
+        key = self._key(model_name, device, precision, kind)
+        while True:
+            entry = self._loaded_entry(key, model_name, device, precision, kind)
+            with self._lock:
+                if self._entries.get(key) is entry:  # not freed in between
+                    entry.refcount += 1
+                    return entry
+
+    def acquire(self, model_name=DEFAULT_EMBEDDING_MODEL, device=None, precision="float32", kind="embedding"):
+        """Return a shared model, loading it on first use, and take a reference"""
+        return self._acquire_entry(model_name, device, precision, kind).model
+
+    def release(self, model_name=DEFAULT_EMBEDDING_MODEL, device=None, precision="float32", kind="embedding"):
+        """Drop a reference taken by acquire(). Returns the remaining refcount"""
+        key = self._key(model_name, device, precision, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0
+            entry.refcount = max(entry.refcount - 1, 0)
+            return entry.refcount
+
+    def _release_entry(self, entry, model_name, device, precision, kind):
+        """Drop a reference on an entry unless it has been freed (and possibly reloaded) since"""
+        key = self._key(model_name, device, precision, kind)
+        with self._lock:
+            if self._entries.get(key) is entry:
+                entry.refcount = max(entry.refcount - 1, 0)
+
+    def free(self, model_name=None, device=None, precision=None, kind=None, force=False):
+        """
+        Unload models that are no longer referenced
+
+        Args:
+            model_name/device/precision/kind: Only free matching models (None matches all)
+            force: Also unload models that still have references
+
+        Returns:
+            Number of models unloaded
+        """
+        with self._lock:
+            to_free = []
+            for key, entry in self._entries.items():
+                name, dev, prec, model_kind = key
+                if model_name is not None and name != model_name:
+                    continue
+                if device is not None and dev != device:
+                    continue
+                if precision is not None and prec != precision:
+                    continue
+                if kind is not None and model_kind != kind:
+                    continue
+                if entry.refcount > 0 and not force:
+                    continue
+                to_free.append(key)
+
+            for key in to_free:
+                self._entries.pop(key).model = None  # handles re-resolve on next use
+
+        if to_free:
+            gc.collect()
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except ImportError:
+                pass
+            print(f"🧹 Freed {len(to_free)} model(s)")
+
+        return len(to_free)
+
+    def is_loaded(self, model_name=DEFAULT_EMBEDDING_MODEL, device=None, precision="float32", kind="embedding"):
+        """Check whether a model is currently resident"""
+        with self._lock:
+            return self._key(model_name, device, precision, kind) in self._entries
+
+    def stats(self):
+        """Per-model load time, memory cost and reference count"""
+        with self._lock:
+            return [
+                {
+                    'model_name': name,
+                    'device': device,
+                    'precision': precision,
+                    'kind': kind,
+                    'refcount': entry.refcount,
+                    'load_time': entry.load_time,
+                    'rss_delta_mb': entry.rss_delta_mb
+                }
+                for (name, device, precision, kind), entry in self._entries.items()
+            ]
+
+
+class EncoderHandle:
+    def __init__(self, registry, model_name=DEFAULT_EMBEDDING_MODEL, device=None, precision="float32",
+                 kind="embedding"):
+        """
+        Lazy reference to a registry model
+
+        The model is only loaded (and a reference taken) on first use,
+        so components that never encode never pay for the model. The
+        handle keeps the registry entry rather than the model: once the
+        registry frees it (even with force=True), the next use resolves
+        the model through the registry again.
+        """
+        self.registry = registry
+        self.model_name = model_name
+        self.device = device
+        self.precision = precision
+        self.kind = kind
+        self._entry = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Underlying SentenceTransformer or CrossEncoder, loaded on first access"""
+        entry = self._entry
+        model = entry.model if entry is not None else None
+        if model is None:
+            with self._lock:
+                if self._entry is None or self._entry.model is None:
+                    self._entry = self.registry._acquire_entry(
+                        self.model_name, self.device, self.precision, self.kind
+                    )
+                model = self._entry.model
+        return model
+
+    @property
+    def loaded(self):
+        """Whether this handle's model is loaded and still resident"""
+        entry = self._entry
+        return entry is not None and entry.model is not None
+
+    def encode(self, sentences, **kwargs):
+        """Encode text with the shared model (same signature as SentenceTransformer.encode)"""
+        return self.model.encode(sentences, **kwargs)
+
+    def predict(self, sentence_pairs, **kwargs):
+        """Score text pairs with a shared cross-encoder (same signature as CrossEncoder.predict)"""
+        return self.model.predict(sentence_pairs, **kwargs)
+
+    def release(self):
+        """Give back this handle's reference to the shared model"""
+        with self._lock:
+            entry, self._entry = self._entry, None
+            if entry is not None:
+                self.registry._release_entry(entry, self.model_name, self.device, self.precision, self.kind)
+
+
+# Process-wide registry
+_registry = ModelRegistry()
+
+
+def get_registry():
+    """Get the process-wide model registry"""
+    return _registry
+
+
+def get_encoder(model_name=DEFAULT_EMBEDDING_MODEL, device=None, precision="float32"):
+    """Get a lazy handle to a shared embedding model"""
+    # Validate eagerly so misconfiguration fails at startup, not on first query
+    ModelRegistry._key(model_name, device, precision)
+    return EncoderHandle(_registry, model_name, device, precision)
+
+
+def get_cross_encoder(model_name, device=None, precision="float32"):
+    """Get a lazy handle to a shared cross-encoder"""
+    ModelRegistry._key(model_name, device, precision, "cross_encoder")
+    return EncoderHandle(_registry, model_name, device, precision, kind="cross_encoder")
@@ -0,0 +1,71 @@
+"""
+Performance Stats
+Small helpers for measuring process memory and timings
+"""
+from collections import deque
+import os
+import resource
+import sys
+import threading
+
+import numpy as np
+
+
+def current_rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Non-Linux fallback: peak RSS (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return peak / divisor
+
+
+class LatencyTracker:
+    def __init__(self, window=1000):
+        """
+        Rolling latency samples per operation
+
+        Args:
+            window: Number of most recent samples kept per operation
+        """
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        """Add one latency sample (in seconds) for an operation"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def increment(self, name):
+        """Count an event that has no latency (e.g. a missed deadline)"""
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def summary(self):
+        """count, p50, p99 and mean (ms) per operation over the window"""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+
+        stats = {}
+        for name, count in counts.items():
+            samples = np.asarray(snapshot.get(name, []), dtype=float) * 1000
+            stats[name] = {'count': count}
+            if len(samples):
+                p50, p99 = np.percentile(samples, [50, 99])
+                stats[name].update({
+                    'p50_ms': float(p50),
+                    'p99_ms': float(p99),
+                    'mean_ms': float(samples.mean())
+                })
+        return stats
@@ -3,18 +3,71 @@ Query Understanding Agent
 Reformulates vague/ambiguous queries into precise search queries
 """
 import os
+import re
+import threading
+import time
 from dotenv import load_dotenv
-from groq import Groq
+from answer_cache import normalize_query
+from cache_backends import LRUCacheBackend
+from hybrid_search import tokenize
+from llm_gateway import get_gateway
 
 load_dotenv()
 
+REFORMULATION_CACHE_SIZE = int(os.getenv("REFORMULATION_CACHE_SIZE", "2048"))
+REFORMULATION_CACHE_TTL = float(os.getenv("REFORMULATION_CACHE_TTL", "86400"))
+
+# Specificity check: a query is sent as-is when it is long enough, mostly
+# made of terms the index knows, and names at least one entity
+SKIP_REFORMULATION = os.getenv("SKIP_REFORMULATION", "on").lower() not in ("0", "off", "false")
+MIN_SPECIFIC_TERMS = 5
+MIN_VOCABULARY_COVERAGE = 0.8
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "by", "at", "from", "as",
+    "is", "are", "was", "be", "do", "does", "did", "can", "could", "should", "would", "will",
+    "i", "we", "you", "my", "our", "it", "this", "that", "there", "what", "which", "who", "how",
+    "when", "where", "why", "me", "about", "if", "any", "some"
+}
+# Acronyms (GDPR, API), numbers, code identifiers (async_def, BaseModel, app.get), quoted phrases
+ENTITY_PATTERN = re.compile(
+    r"\b[A-Z]{2,}s?\b|\b\d[\d.,%]*\b|\b\w+_\w+\b|\b[a-z]+[A-Z]\w*\b|\b[A-Z][a-z]+[A-Z]\w*\b|\w+\.\w+\(?|[\"'][^\"']+[\"']"
+)
+
+
+def query_terms(query):
+    """Content terms of a query, exactly as the BM25 index tokenizes it"""
+    return [term for term in tokenize(query) if term not in STOPWORDS]
+
+
+def find_entities(query):
+    """Acronyms, numbers, identifiers and quoted phrases, plus capitalized words past the first"""
+    entities = [match.group(0) for match in ENTITY_PATTERN.finditer(query)]
+    words = query.split()
+    entities += [word.strip(".,;:!?()") for word in words[1:] if word[:1].isupper() and not word.isupper()]
+    return list(dict.fromkeys(entities))
+
 class QueryUnderstandingAgent:
-    def __init__(self, groq_api_key=None):
-        """Initialize Query Understanding Agent"""
+    def __init__(self, groq_api_key=None, sparse_index=None):
+        """
+        Initialize Query Understanding Agent
+        
+        Args:
+            groq_api_key: Groq API key
+            sparse_index: SparseIndexService whose vocabulary drives the skip
+                heuristic (without it, specific queries are still reformulated)
+        """
         print("🧠 Initializing Query Understanding Agent...\n")
         
-        self.groq_client = Groq(api_key=groq_api_key)
+        self.llm = get_gateway(groq_api_key)
         self.model = "llama-3.3-70b-versatile"
+        self.sparse_index = sparse_index
+        
+        # Reformulations keyed on the normalized query
+        self.cache = LRUCacheBackend(max_entries=REFORMULATION_CACHE_SIZE, default_ttl=REFORMULATION_CACHE_TTL)
+        self._counts = {'llm': 0, 'cached': 0, 'skipped': 0}
+        self._llm_time = 0.0
+        self._stats_lock = threading.Lock()
         
         self.system_prompt = """You are a query reformulation expert. Your task is to take vague or ambiguous user queries and reformulate them into precise, specific search queries that will retrieve the most relevant information.
 
@@ -37,28 +90,132 @@ Examples:
 
 Return ONLY the reformulated query, nothing else."""
     
+    def _request(self, user_query):
+        """Chat completion arguments for a reformulation"""
+        return {
+            'messages': [
+                {
+                    "role": "system",
+                    "content": self.system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": user_query
+                }
+            ],
+            'model': self.model,
+            'temperature': 0.3,  # Lower temp for consistency
+            'max_tokens': 200
+        }
+    
+    def specificity(self, user_query):
+        """
+        Cheap local check of whether a query is already specific
+        
+        Returns:
+            Dict with the content term count, the fraction of terms in the
+            BM25 vocabulary, the entities found and the 'specific' verdict
+        """
+        terms = query_terms(user_query)
+        coverage = 0.0
+        if terms and self.sparse_index is not None:
+            index = self.sparse_index.get_index()
+            coverage = sum(index.has_term(term) for term in terms) / len(terms)
+        entities = find_entities(user_query)
+        return {
+            'terms': len(terms),
+            'coverage': coverage,
+            'entities': entities,
+            'specific': (
+                len(terms) >= MIN_SPECIFIC_TERMS
+                and coverage >= MIN_VOCABULARY_COVERAGE
+                and bool(entities)
+            )
+        }
+    
+    def _count(self, outcome, llm_time=0.0):
+        with self._stats_lock:
+            self._counts[outcome] += 1
+            self._llm_time += llm_time
+    
+    def _without_llm(self, user_query):
+        """Cached or skipped reformulation, or None when the LLM is needed"""
+        key = normalize_query(user_query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count('cached')
+            print(f"⚡ Reformulation cache hit: '{cached}'\n")
+            return cached
+        
+        if SKIP_REFORMULATION:
+            check = self.specificity(user_query)
+            if check['specific']:
+                self._count('skipped')
+                stats = self.stats()
+                print(
+                    f"⏭️  Query already specific ({check['terms']} terms, {check['coverage']:.0%} known, "
+                    f"entities: {', '.join(check['entities'][:3])}); skipping reformulation "
+                    f"(skip rate {stats['skip_rate']:.0%}, ~{stats['time_saved']:.1f}s saved)\n"
+                )
+                return user_query
+        return None
+    
+    def _remember(self, user_query, reformulated, llm_time):
+        self._count('llm', llm_time)
+        self.cache.set(normalize_query(user_query), reformulated)
+    
+    def stats(self):
+        """Reformulation outcomes and the LLM time saved by cache hits and skips"""
+        with self._stats_lock:
+            counts = dict(self._counts)
+            llm_time = self._llm_time
+        total = sum(counts.values())
+        mean_llm_time = llm_time / counts['llm'] if counts['llm'] else 0.0
+        return dict(
+            counts,
+            skip_rate=counts['skipped'] / total if total else 0.0,
+            cache_hit_rate=counts['cached'] / total if total else 0.0,
+            mean_llm_time=mean_llm_time,
+            # Every avoided call would have cost about one average round trip
+            time_saved=(counts['skipped'] + counts['cached']) * mean_llm_time
+        )
+    
     def reformulate_query(self, user_query):
         """Reformulate a vague query into a precise search query"""
         print(f"📝 Original query: '{user_query}'")
         
+        reformulated = self._without_llm(user_query)
+        if reformulated is not None:
+            return reformulated
+        
         try:
-            response = self.groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": self.system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": user_query
-                    }
-                ],
-                model=self.model,
-                temperature=0.3,  # Lower temp for consistency
-                max_tokens=200
-            )
+            start_time = time.perf_counter()
+            response = self.llm.chat(**self._request(user_query))
+            
+            reformulated = response.choices[0].message.content.strip()
+            self._remember(user_query, reformulated, time.perf_counter() - start_time)
+            print(f"✨ Reformulated: '{reformulated}'\n")
+            
+            return reformulated
+        
+        except Exception as e:
+            print(f"❌ Error reformulating query: {e}\n")
+            return user_query  # Return original if error
+    
+    async def areformulate_query(self, user_query):
+        """Async version of reformulate_query (shared AsyncGroq client)"""
+        print(f"📝 Original query: '{user_query}'")
+        
+        reformulated = self._without_llm(user_query)
+        if reformulated is not None:
+            return reformulated
+        
+        try:
+            start_time = time.perf_counter()
+            response = await self.llm.achat(**self._request(user_query))
             
             reformulated = response.choices[0].message.content.strip()
+            self._remember(user_query, reformulated, time.perf_counter() - start_time)
             print(f"✨ Reformulated: '{reformulated}'\n")
             
             return reformulated
@@ -0,0 +1,136 @@
+"""
+Query Classifier
+Local nearest-centroid query classification that picks the retrieval strategy
+"""
+import threading
+
+import numpy as np
+
+QUERY_TYPES = ("factual", "conceptual", "procedural", "comparative")
+
+# A handful of labeled examples per type; their mean embedding is the type centroid
+PROTOTYPE_QUERIES = {
+    'factual': [
+        "How many days of annual leave do employees get?",
+        "What is the minimum password length?",
+        "How long is the probation period?",
+        "What is the default port of the server?",
+        "Which article of GDPR defines personal data?",
+        "What are the standard working hours?",
+        "Which Python version is required?",
+    ],
+    'conceptual': [
+        "What is dependency injection?",
+        "Explain how asynchronous code works",
+        "Why does GDPR protect personal data?",
+        "What is the purpose of the code of conduct?",
+        "What does OpenAPI mean?",
+        "Explain the idea behind type hints",
+        "What is the concept of data minimisation?",
+    ],
+    'procedural': [
+        "How do I create a FastAPI endpoint?",
+        "How do I request time off?",
+        "Steps to deploy the application with Docker",
+        "How to report a data breach",
+        "How can I reset my password?",
+        "How do I add middleware to my app?",
+        "Guide to setting up a virtual environment",
+    ],
+    'comparative': [
+        "What is the difference between async def and def?",
+        "Compare sick leave and annual leave",
+        "Pydantic v1 vs v2",
+        "Is remote work better than working in the office?",
+        "Difference between path parameters and query parameters",
+        "Flask versus FastAPI performance",
+        "How does a data controller differ from a data processor?",
+    ],
+}
+
+# How each query type is retrieved
+#   top_k_factor: scales the requested number of documents
+#   sources: which retrievers to query
+#   weights: per-source fusion weights
+RETRIEVAL_STRATEGIES = {
+    'factual': {'top_k_factor': 0.6, 'sources': ('vector', 'bm25'), 'weights': {'vector': 0.4, 'bm25': 0.6}},
+    'conceptual': {'top_k_factor': 1.0, 'sources': ('vector',), 'weights': {'vector': 1.0}},
+    'procedural': {'top_k_factor': 1.0, 'sources': ('vector', 'bm25'), 'weights': {'vector': 0.5, 'bm25': 0.5}},
+    'comparative': {'top_k_factor': 1.6, 'sources': ('vector', 'bm25'), 'weights': {'vector': 0.6, 'bm25': 0.4}},
+    'mixed': {'top_k_factor': 1.0, 'sources': ('vector', 'bm25'), 'weights': {'vector': 0.5, 'bm25': 0.5}},
+}
+
+# Below this cosine gap between the two closest centroids the query is treated as mixed
+MIN_MARGIN = 0.02
+
+
+def retrieval_strategy(query_type, top_k):
+    """Concrete retrieval plan (top_k, sources, weights) for a query type"""
+    strategy = RETRIEVAL_STRATEGIES.get(query_type, RETRIEVAL_STRATEGIES['mixed'])
+    return {
+        'type': query_type if query_type in RETRIEVAL_STRATEGIES else 'mixed',
+        'top_k': max(1, int(round(top_k * strategy['top_k_factor']))),
+        'sources': list(strategy['sources']),
+        'weights': [strategy['weights'][source] for source in strategy['sources']]
+    }
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class QueryClassifier:
+    def __init__(self, encoder, prototypes=None, min_margin=MIN_MARGIN):
+        """
+        Classify queries by the nearest prototype centroid
+
+        Uses the shared embedding model, so classifying a query costs one
+        dot product when its embedding is passed in (vector search needs
+        it anyway).
+
+        Args:
+            encoder: Embedding model with an encode() method
+            prototypes: Dict of query type -> example queries (default PROTOTYPE_QUERIES)
+            min_margin: Cosine gap below which the query is labeled "mixed"
+        """
+        self.encoder = encoder
+        self.prototypes = prototypes or PROTOTYPE_QUERIES
+        self.min_margin = min_margin
+        self._labels = list(self.prototypes)
+        self._centroids = None
+        self._lock = threading.Lock()
+
+    def _get_centroids(self):
+        """Embed the prototypes once and average them per type"""
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    centroids = []
+                    for label in self._labels:
+                        embeddings = _normalize(self.encoder.encode(self.prototypes[label]))
+                        centroids.append(embeddings.mean(axis=0))
+                    self._centroids = _normalize(centroids)
+        return self._centroids
+
+    def classify(self, query=None, query_embedding=None):
+        """
+        Label a query with one of QUERY_TYPES (or "mixed" when ambiguous)
+
+        Returns:
+            Dict with 'type', 'confidence' (cosine margin) and per-type 'scores'
+        """
+        if query_embedding is None:
+            query_embedding = self.encoder.encode([query])[0]
+        similarities = self._get_centroids() @ _normalize(query_embedding)
+
+        order = np.argsort(-similarities)
+        margin = float(similarities[order[0]] - similarities[order[1]]) if len(order) > 1 else 1.0
+        query_type = self._labels[order[0]] if margin >= self.min_margin else 'mixed'
+
+        return {
+            'type': query_type,
+            'confidence': margin,
+            'scores': {label: float(similarities[i]) for i, label in enumerate(self._labels)}
+        }
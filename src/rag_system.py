@@ -1,8 +1,10 @@
 import json
+import threading
+import time
 import chromadb
-from sentence_transformers import SentenceTransformer
-from groq import Groq
-from .hybrid_search import HybridSearch
+from llm_gateway import get_gateway
+from model_registry import get_encoder
+from sparse_index import get_sparse_index, get_sparse_index_service, default_index_dir
 from query_agent import QueryUnderstandingAgent
 from retrieval_agent import RetrievalAgent
 from synthesis_agent import SynthesisAgent
@@ -20,23 +22,26 @@ class RAGSystem:
         self.client = chromadb.PersistentClient(path=db_path)
         self.collection = self.client.get_or_create_collection(name="documents")
         
-        # Load embedding model
-        print("📦 Loading embedding model...")
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
-        print("✅ Model loaded!\n")
+        self._orchestrator_lock = threading.Lock()
         
-        # Initialize Groq client
-        self.groq_client = Groq(api_key=groq_api_key)
+        # Shared embedding model (loaded once per process on first use)
+        self.model = get_encoder()
+        
+        # Shared LLM gateway (one pooled Groq client for every agent)
+        self.llm = get_gateway(groq_api_key)
         self.model_name = "llama-3.3-70b-versatile"  # Fast and good quality
 
 # Initialize Hybrid Search
         print("🔀 Setting up hybrid search...")
-        all_docs = [doc['content'] for doc in self.get_all_documents()]
-        self.hybrid_search = HybridSearch(all_docs)
+        # (memory-mapped from data/bm25_index when a matching snapshot exists)
+        self.hybrid_search = get_sparse_index(self.collection, index_dir=default_index_dir(db_path))
         print("✅ Hybrid search ready!\n")    
 # Initialize Query Understanding Agent
         print("🧠 Setting up Query Understanding Agent...")
-        self.query_agent = QueryUnderstandingAgent(groq_api_key=groq_api_key)
+        self.query_agent = QueryUnderstandingAgent(
+            groq_api_key=groq_api_key,
+            sparse_index=get_sparse_index_service(self.collection)
+        )
         print("✅ Query Agent ready!\n")
 # Initialize Multi-Source Retrieval Agent
         print("🔍 Setting up Multi-Source Retrieval Agent...")
@@ -69,6 +74,7 @@ class RAGSystem:
         if results and results['documents']:
             for i, doc in enumerate(results['documents'][0]):
                 retrieved_docs.append({
+                    'doc_id': results['ids'][0][i],
                     'content': doc,
                     'source': results['metadatas'][0][i]['source_file'],
                     'score': 1 - results['distances'][0][i]
@@ -77,13 +83,14 @@ class RAGSystem:
         print(f"✅ Retrieved {len(retrieved_docs)} documents\n")
         return retrieved_docs
     
-    def format_context(self, documents):
-        """Format retrieved documents as context for LLM"""
+    def format_context(self, documents, query=None):
+        """Format retrieved documents as context for LLM, compressed and packed into the context token budget"""
+        packed_documents = self.synthesis_agent.select_context(query, documents)
         context = "## RETRIEVED DOCUMENTS:\n\n"
         
-        for i, doc in enumerate(documents, 1):
+        for i, doc in enumerate(packed_documents, 1):
             context += f"[Document {i}] (Source: {doc['source']})\n"
-            context += f"{doc['content'][:500]}...\n\n"
+            context += f"{doc['content']}\n\n"
         
         return context
     
@@ -92,7 +99,7 @@ class RAGSystem:
         print("🤖 Generating answer with Groq...\n")
         
         try:
-            chat_completion = self.groq_client.chat.completions.create(
+            chat_completion = self.llm.chat(
                 messages=[
                     {
                         "role": "user",
@@ -121,13 +128,50 @@ class RAGSystem:
             })
         return docs
 
+    def _get_orchestrator(self):
+        # Built once even when the API calls this from several workers
+        with self._orchestrator_lock:
+            if not hasattr(self, 'orchestrator'):
+                from agent_orchestrator import AgentOrchestrator
+                self.orchestrator = AgentOrchestrator(self)
+        return self.orchestrator
+
+    def speculation_stats(self):
+        """Speculative retrieval reuse rate and time saved (see AgentOrchestrator)"""
+        return self._get_orchestrator().speculation_stats()
+
+    def validation_status(self, request_id):
+        """Record of a deferred validation, or None if unknown"""
+        return self._get_orchestrator().validation_status(request_id)
+
+    def validation_stats(self):
+        """Validation backends, claims settled per tier, and background validation counts and latency"""
+        jobs = self._get_orchestrator().validation_jobs
+        stats = jobs.stats() if jobs is not None else {}
+        return dict(stats, backends=self.validation_agent.backend_status(), agent=self.validation_agent.stats())
+
+    def prewarm(self):
+        """Load models that are otherwise loaded by the first query that needs them"""
+        start_time = time.time()
+        self.validation_agent.prewarm()
+        print(f"🔥 Validation models pre-warmed in {time.time() - start_time:.2f}s")
+
+    def shutdown(self):
+        """Let queued background validations finish"""
+        if hasattr(self, 'orchestrator') and self.orchestrator.validation_jobs is not None:
+            self.orchestrator.validation_jobs.shutdown(wait=True)
+
     def answer_question(self, query):
         """Use agent orchestrator for workflow"""
-        if not hasattr(self, 'orchestrator'):
-            from agent_orchestrator import AgentOrchestrator
-            self.orchestrator = AgentOrchestrator(self)
-        
-        return self.orchestrator.run(query)       
+        return self._get_orchestrator().run(query)
+
+    async def aanswer_question(self, query):
+        """Async version of answer_question (workflow.ainvoke)"""
+        return await self._get_orchestrator().arun(query)
+
+    def astream_answer(self, query):
+        """Stream pipeline stage events and answer tokens (see AgentOrchestrator.astream)"""
+        return self._get_orchestrator().astream(query)       
        
 
 
@@ -2,27 +2,105 @@
 Multi-Source Retrieval Agent
 Intelligently decides which sources to query based on query type
 """
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+import asyncio
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from groq import Groq
-from hybrid_search import HybridSearch
-from sentence_transformers import SentenceTransformer
+from fusion import fuse
+from llm_gateway import get_gateway
+from model_registry import get_encoder
+from perf_stats import LatencyTracker
+from query_classifier import QUERY_TYPES, QueryClassifier, retrieval_strategy
+from sparse_index import get_sparse_index
 
 load_dotenv()
 
+# Seconds each source may take before retrieval continues without it
+SOURCE_DEADLINES = {
+    'vector': float(os.getenv("VECTOR_SEARCH_DEADLINE", "2.0")),
+    'bm25': float(os.getenv("BM25_SEARCH_DEADLINE", "1.0")),
+}
+# Source searches run on one pool shared by all pipelines: one thread per
+# source for each pipeline worker, twice over for speculative retrieval
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", str(4 * int(os.getenv("PIPELINE_WORKERS", "8")))))
+
+# "local" (nearest-centroid, default) or "llm" (Groq, cached and in the background)
+QUERY_CLASSIFIER = os.getenv("QUERY_CLASSIFIER", "local")
+LLM_LABEL_CACHE_SIZE = 1024
+# Background classifications queued at most; labels are best effort, so more are dropped
+LLM_MAX_PENDING = 64
+
+
+class SourceSearch:
+    """One source search on the worker pool, noting when a worker picks it up"""
+    
+    def __init__(self, executor, search, name, *args):
+        self.name = name
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.future = executor.submit(self._run, search, name, *args)
+    
+    def _run(self, search, *args):
+        self.started_at = time.perf_counter()
+        return search(*args)
+    
+    def queue_deadline(self, deadline):
+        return self.submitted_at + deadline - time.perf_counter()
+    
+    def run_deadline(self, deadline):
+        started_at = self.started_at or time.perf_counter()  # running, but _run not entered yet
+        return started_at + deadline - time.perf_counter()
+
+
 class RetrievalAgent:
-    def __init__(self, chromadb_collection, groq_api_key=None):
-        """Initialize Retrieval Agent"""
+    def __init__(self, chromadb_collection, groq_api_key=None, fusion_strategy="minmax", fusion_weights=None,
+                 concurrent=True, source_deadlines=None, classifier=QUERY_CLASSIFIER):
+        """
+        Initialize Retrieval Agent
+        
+        Args:
+            fusion_strategy: How vector and BM25 rankings are combined
+                (see fusion.FUSION_STRATEGIES); min-max keeps scores in [0, 1]
+            fusion_weights: Optional (vector, bm25) weights
+            concurrent: Query the sources in parallel on a thread pool
+            source_deadlines: Per-source deadline in seconds (default
+                SOURCE_DEADLINES), counted from when the search starts
+                running; a source that misses it, or waits longer than it
+                for a worker, is left out
+            classifier: "local" to classify queries with the embedding
+                nearest-centroid model only, "llm" to also ask the LLM in the
+                background and use its (cached) label for repeat queries
+        """
         print("🔍 Initializing Multi-Source Retrieval Agent...\n")
         
-        self.groq_client = Groq(api_key=groq_api_key)
+        self.llm = get_gateway(groq_api_key)
         self.model_name = "llama-3.3-70b-versatile"
         self.collection = chromadb_collection
-        self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+        self.embedding_model = get_encoder()
+        self.fusion_strategy = fusion_strategy
+        self.fusion_weights = fusion_weights
+        
+        # Concurrent source fan-out
+        self.concurrent = concurrent
+        self.source_deadlines = dict(SOURCE_DEADLINES, **(source_deadlines or {}))
+        self.executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+        self.latency = LatencyTracker()
+        
+        # Query classification drives top_k, sources and fusion weights
+        self.classifier = QueryClassifier(self.embedding_model)
+        self.use_llm_classifier = classifier == "llm"
+        self._llm_labels = OrderedDict()
+        self._llm_pending = set()
+        self._llm_lock = threading.Lock()
+        self._llm_tasks = set()
+        # Blocking LLM calls from the sync pipeline run here, never on the search pool
+        self.classification_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-classification")
         
-        # Initialize retrieval sources
-        all_docs = self._get_all_documents()
-        self.hybrid_search = HybridSearch(all_docs)
+        # Shared BM25 index (built once per process)
+        self.hybrid_search = get_sparse_index(self.collection)
         
         self.classification_prompt = """Analyze this query and classify it:
 
@@ -40,33 +118,42 @@ STRATEGY: [strategy]"""
         
         print("✅ Retrieval Agent ready!\n")
     
-    def _get_all_documents(self):
-        """Get all documents from ChromaDB collection"""
-        try:
-            results = self.collection.get()
-            docs = []
-            for i, doc in enumerate(results['documents']):
-                docs.append(doc)
-            return docs
-        except:
-            return []
+    def _classification_request(self, query):
+        """Chat completion arguments for an LLM classification"""
+        return {
+            'messages': [
+                {
+                    "role": "user",
+                    "content": self.classification_prompt.format(query=query)
+                }
+            ],
+            'model': self.model_name,
+            'temperature': 0.3,
+            'max_tokens': 100
+        }
     
     def classify_query(self, query):
         """Use LLM to classify query for optimal retrieval strategy"""
         print(f"📊 Classifying query: '{query}'")
         
         try:
-            response = self.groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": self.classification_prompt.format(query=query)
-                    }
-                ],
-                model=self.model_name,
-                temperature=0.3,
-                max_tokens=100
-            )
+            response = self.llm.chat(**self._classification_request(query))
+            
+            classification = response.choices[0].message.content.strip()
+            print(f"✅ Classification:\n{classification}\n")
+            
+            return classification
+        
+        except Exception as e:
+            print(f"❌ Classification error: {e}\n")
+            return "TYPE: mixed\nNEED: general\nSTRATEGY: mixed"
+    
+    async def aclassify_query(self, query):
+        """Async version of classify_query (shared AsyncGroq client)"""
+        print(f"📊 Classifying query: '{query}'")
+        
+        try:
+            response = await self.llm.achat(**self._classification_request(query))
             
             classification = response.choices[0].message.content.strip()
             print(f"✅ Classification:\n{classification}\n")
@@ -77,12 +164,109 @@ STRATEGY: [strategy]"""
             print(f"❌ Classification error: {e}\n")
             return "TYPE: mixed\nNEED: general\nSTRATEGY: mixed"
     
-    def vector_search(self, query, top_k=5):
+    @staticmethod
+    def _cache_key(query):
+        return " ".join(query.lower().split())
+    
+    def _store_llm_label(self, key, classification):
+        """Cache the query type parsed from an LLM classification"""
+        query_type = 'mixed'
+        for line in classification.splitlines():
+            if line.upper().startswith("TYPE:"):
+                label = line.split(":", 1)[1].strip().lower()
+                query_type = label if label in QUERY_TYPES else 'mixed'
+        with self._llm_lock:
+            self._llm_labels[key] = query_type
+            while len(self._llm_labels) > LLM_LABEL_CACHE_SIZE:
+                self._llm_labels.popitem(last=False)
+    
+    def _classify_with_llm(self, query):
+        """Background task: ask the LLM and cache the parsed query type"""
+        key = self._cache_key(query)
+        try:
+            self._store_llm_label(key, self.classify_query(query))
+        finally:
+            with self._llm_lock:
+                self._llm_pending.discard(key)
+    
+    async def _aclassify_with_llm(self, query):
+        """Background task on the event loop (no worker thread held)"""
+        key = self._cache_key(query)
+        try:
+            self._store_llm_label(key, await self.aclassify_query(query))
+        finally:
+            with self._llm_lock:
+                self._llm_pending.discard(key)
+    
+    def _plan(self, query, top_k, query_embedding=None):
+        """
+        Retrieval plan from a cached LLM label or the local classifier
+        
+        Returns:
+            (plan, whether the caller should ask the LLM in the background)
+        """
+        key = self._cache_key(query)
+        with self._llm_lock:
+            cached = self._llm_labels.get(key) if self.use_llm_classifier else None
+            if cached is not None:
+                self._llm_labels.move_to_end(key)
+            schedule_llm = (self.use_llm_classifier and cached is None and key not in self._llm_pending
+                            and len(self._llm_pending) < LLM_MAX_PENDING)
+            if schedule_llm:
+                self._llm_pending.add(key)
+        
+        if cached is not None:
+            classification = {'type': cached, 'confidence': 1.0, 'classifier': 'llm'}
+        else:
+            start_time = time.perf_counter()
+            classification = self.classifier.classify(query, query_embedding=query_embedding)
+            classification['classifier'] = 'local'
+            self.latency.record('classification', time.perf_counter() - start_time)
+        
+        plan = retrieval_strategy(classification['type'], top_k)
+        if self.fusion_weights is not None:
+            weights = dict(zip(('vector', 'bm25'), self.fusion_weights))
+            plan['weights'] = [weights[source] for source in plan['sources']]
+        plan['classification'] = classification
+        print(f"📊 Query type: {plan['type']} ({classification['classifier']}) → "
+              f"top_k={plan['top_k']}, sources={plan['sources']}")
+        return plan, schedule_llm
+    
+    def plan_retrieval(self, query, top_k=5, query_embedding=None):
+        """
+        Classify the query and pick top_k, sources and fusion weights
+        
+        The local classifier answers immediately. With the LLM classifier
+        enabled, a cached LLM label wins; otherwise the LLM is asked in the
+        background (on classification_executor) so the next identical query
+        can use its label, and this one is not held up by the round trip.
+        """
+        plan, schedule_llm = self._plan(query, top_k, query_embedding)
+        if schedule_llm:
+            self.classification_executor.submit(self._classify_with_llm, query)
+        return plan
+    
+    async def aplan_retrieval(self, query, top_k=5, query_embedding=None):
+        """
+        Async version of plan_retrieval
+        
+        The local classifier runs off the event loop (it may embed the
+        query); the background LLM classification is a task on the loop.
+        """
+        plan, schedule_llm = await asyncio.to_thread(self._plan, query, top_k, query_embedding)
+        if schedule_llm:
+            task = asyncio.get_running_loop().create_task(self._aclassify_with_llm(query))
+            self._llm_tasks.add(task)  # the loop only keeps a weak reference
+            task.add_done_callback(self._llm_tasks.discard)
+        return plan
+    
+    def vector_search(self, query, top_k=5, query_embedding=None):
         """Search using vector embeddings (semantic similarity)"""
         print(f"  📌 Performing vector search...")
         
         try:
-            query_embedding = self.embedding_model.encode([query])[0]
+            if query_embedding is None:
+                query_embedding = self.embedding_model.encode([query])[0]
             
             results = self.collection.query(
                 query_embeddings=[query_embedding.tolist()],
@@ -94,6 +278,7 @@ STRATEGY: [strategy]"""
                 for i, doc in enumerate(results['documents'][0]):
                     vector_results.append({
                         'index': i,
+                        'doc_id': results['ids'][0][i],
                         'content': doc,
                         'source': results['metadatas'][0][i]['source_file'],
                         'score': 1 - results['distances'][0][i],
@@ -114,32 +299,17 @@ STRATEGY: [strategy]"""
         try:
             bm25_results = self.hybrid_search.bm25_search(query, top_k)
             
-            # Get all documents to find sources
-            all_results = self.collection.get()
-            doc_to_source = {}
-            if all_results and all_results['metadatas']:
-                for i, metadata in enumerate(all_results['metadatas']):
-                    if i < len(all_results['documents']):
-                        doc_text = all_results['documents'][i][:50]  # First 50 chars as key
-                        doc_to_source[doc_text] = metadata.get('source_file', 'unknown')
-            
             formatted_results = []
             for result in bm25_results:
                 # Normalize BM25 score (typically 0-100, divide by 100)
                 normalized_score = min(result['score'] / 100.0, 1.0)
                 
-                # Find source
-                doc_preview = result['content'][:50]
-                source = 'unknown'
-                for key, val in doc_to_source.items():
-                    if key in result['content']:
-                        source = val
-                        break
-                
+                # Source comes from the index's positional metadata table
                 formatted_results.append({
                     'index': result['index'],
+                    'doc_id': result['doc_id'],
                     'content': result['content'],
-                    'source': source,
+                    'source': result['source'],
                     'score': normalized_score,
                     'method': 'bm25_search'
                 })
@@ -151,6 +321,139 @@ STRATEGY: [strategy]"""
             print(f"     ✗ BM25 search error: {e}")
             return []
     
+    def _timed_search(self, name, query, top_k, query_embedding=None):
+        """Run one source and record its latency"""
+        start_time = time.perf_counter()
+        if name == 'vector':
+            results = self.vector_search(query, top_k, query_embedding=query_embedding)
+        else:
+            results = self.bm25_search(query, top_k)
+        self.latency.record(f"{name}_search", time.perf_counter() - start_time)
+        return results
+    
+    def _skip(self, search):
+        """Report a source left out of the fusion; returns the reason ('queued' or 'deadline')"""
+        deadline = self.source_deadlines[search.name]
+        if search.future.cancelled():
+            print(f"     ⏱️  {search.name} search waited {deadline:.1f}s for a worker, skipping")
+            self.latency.increment(f"{search.name}_search_queue_timeouts")
+            return 'queued'
+        print(f"     ⏱️  {search.name} search missed its {deadline:.1f}s deadline, skipping")
+        self.latency.increment(f"{search.name}_search_timeouts")
+        return 'deadline'
+    
+    def _collect(self, search):
+        """
+        Wait for a submitted search under its deadline
+        
+        The deadline runs from when a worker starts the search, so time
+        spent queued behind other pipelines does not count against it; a
+        search still queued after a full deadline is cancelled instead.
+        
+        Returns:
+            (results, None) or ([], reason it was skipped)
+        """
+        deadline = self.source_deadlines[search.name]
+        wait([search.future], timeout=max(search.queue_deadline(deadline), 0))
+        if not search.future.done() and not search.future.cancel():
+            wait([search.future], timeout=max(search.run_deadline(deadline), 0))
+        if search.future.done() and not search.future.cancelled():
+            return search.future.result(), None
+        return [], self._skip(search)
+    
+    def search_source(self, name, query, top_k=5, query_embedding=None):
+        """
+        One source under its own deadline (inline when not concurrent)
+        
+        Returns:
+            (results, None) or ([], reason the source was skipped)
+        """
+        if not self.concurrent:
+            return self._timed_search(name, query, top_k, query_embedding), None
+        return self._collect(SourceSearch(self.executor, self._timed_search, name, query, top_k, query_embedding))
+    
+    def search_sources(self, query, top_k=5, sources=('vector', 'bm25'), query_embedding=None):
+        """
+        Query each source and collect its ranked results
+        
+        In concurrent mode the sources run in parallel, each under its own
+        deadline. A source that misses it contributes no results (its
+        thread finishes in the background) instead of holding up the
+        response.
+        
+        Returns:
+            (dict of source name -> result list, dict of skipped source name -> reason)
+        """
+        start_time = time.perf_counter()
+        
+        source_results, skipped = {}, {}
+        if not self.concurrent:
+            for name in sources:
+                source_results[name] = self._timed_search(name, query, top_k, query_embedding)
+        else:
+            searches = [
+                SourceSearch(self.executor, self._timed_search, name, query, top_k, query_embedding)
+                for name in sources
+            ]
+            for search in searches:
+                source_results[search.name], reason = self._collect(search)
+                if reason is not None:
+                    skipped[search.name] = reason
+        
+        self.latency.record('retrieval', time.perf_counter() - start_time)
+        return source_results, skipped
+    
+    def latency_stats(self):
+        """Retrieval p50/p99 per source and overall"""
+        return self.latency.summary()
+    
+    async def avector_search(self, query, top_k=5, query_embedding=None):
+        """vector_search off the event loop (encoding and ChromaDB are blocking)"""
+        return await asyncio.to_thread(self.vector_search, query, top_k, query_embedding)
+    
+    async def abm25_search(self, query, top_k=5):
+        """bm25_search off the event loop (CPU-bound scoring)"""
+        return await asyncio.to_thread(self.bm25_search, query, top_k)
+    
+    async def asearch_source(self, name, query, top_k=5, query_embedding=None):
+        """Async version of search_source (waits without blocking the event loop)"""
+        search = SourceSearch(self.executor, self._timed_search, name, query, top_k, query_embedding)
+        deadline = self.source_deadlines[name]
+        task = asyncio.wrap_future(search.future)
+        await asyncio.wait({task}, timeout=max(search.queue_deadline(deadline), 0))
+        if not search.future.done() and not search.future.cancel():
+            await asyncio.wait({task}, timeout=max(search.run_deadline(deadline), 0))
+        if search.future.done() and not search.future.cancelled():
+            return search.future.result(), None
+        return [], self._skip(search)
+    
+    async def asearch_sources(self, query, top_k=5, sources=('vector', 'bm25'), query_embedding=None):
+        """
+        Async version of search_sources
+        
+        Sources always run concurrently, each under its own deadline.
+        """
+        start_time = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.asearch_source(name, query, top_k, query_embedding) for name in sources)
+        )
+        self.latency.record('retrieval', time.perf_counter() - start_time)
+        source_results = {name: found for name, (found, _) in zip(sources, results)}
+        skipped = {name: reason for name, (_, reason) in zip(sources, results) if reason is not None}
+        return source_results, skipped
+    
+    def fuse_results(self, source_results, plan):
+        """Fuse per-source rankings on document ids (deduplicates as a side effect)"""
+        sources = [name for name in plan['sources'] if name in source_results]
+        weights = dict(zip(plan['sources'], plan['weights']))
+        return fuse(
+            [source_results[name] for name in sources],
+            strategy=self.fusion_strategy,
+            weights=[weights[name] for name in sources],
+            top_k=plan['top_k'],
+            names=sources
+        )
+    
     def retrieve(self, query, top_k=5):
         """
         Main retrieval method: intelligently combines multiple sources
@@ -158,42 +461,44 @@ STRATEGY: [strategy]"""
         print(f"\n🔍 RETRIEVING FOR QUERY: '{query}'")
         print("-" * 70)
         
-        # Step 1: Classify query
-        classification = self.classify_query(query)
-        
-        # Step 2: Decide which sources to use
-        use_vector = True  # Always use vector
-        use_bm25 = True    # Always use BM25
+        # Step 1: Embed once; the classifier and vector search share it
+        query_embedding = self.embedding_model.encode([query])[0]
         
-        all_results = []
+        # Step 2: Classify the query and decide top_k, sources and weights
+        plan = self.plan_retrieval(query, top_k, query_embedding=query_embedding)
+        sources = plan['sources']
         
+        # Steps 3-4: Search the sources
         print(f"🔎 Searching sources:")
+        source_results, skipped = self.search_sources(query, plan['top_k'], sources, query_embedding=query_embedding)
         
-        # Step 3: Search vector database
-        if use_vector:
-            vector_results = self.vector_search(query, top_k)
-            all_results.extend(vector_results)
+        # Step 5: Fuse the rankings on document ids (deduplicates as a side effect)
+        final_results = self.fuse_results(source_results, plan)
         
-        # Step 4: Search BM25
-        if use_bm25:
-            bm25_results = self.bm25_search(query, top_k)
-            all_results.extend(bm25_results)
+        print(f"\n✅ Retrieved {len(final_results)} unique documents"
+              + (f" (skipped: {', '.join(skipped)})" if skipped else ""))
+        print("-" * 70 + "\n")
         
-        # Step 5: Deduplicate and rank
-        seen = set()
-        unique_results = []
+        return final_results
+    
+    async def aretrieve(self, query, top_k=5):
+        """Async version of retrieve"""
+        print(f"\n🔍 RETRIEVING FOR QUERY: '{query}'")
+        print("-" * 70)
         
-        for result in all_results:
-            content_hash = hash(result['content'][:100])
-            if content_hash not in seen:
-                seen.add(content_hash)
-                unique_results.append(result)
+        query_embedding = (await asyncio.to_thread(self.embedding_model.encode, [query]))[0]
+        plan = await self.aplan_retrieval(query, top_k, query_embedding=query_embedding)
+        sources = plan['sources']
         
-        # Sort by score (descending)
-        unique_results.sort(key=lambda x: x['score'], reverse=True)
-        final_results = unique_results[:top_k]
+        print(f"🔎 Searching sources:")
+        source_results, skipped = await self.asearch_sources(
+            query, plan['top_k'], sources, query_embedding=query_embedding
+        )
         
-        print(f"\n✅ Retrieved {len(final_results)} unique documents")
+        final_results = self.fuse_results(source_results, plan)
+        
+        print(f"\n✅ Retrieved {len(final_results)} unique documents"
+              + (f" (skipped: {', '.join(skipped)})" if skipped else ""))
         print("-" * 70 + "\n")
         
         return final_results
@@ -232,3 +537,10 @@ if __name__ == "__main__":
         for i, result in enumerate(results, 1):
             print(f"  {i}. [{result['method']}] Score: {result['score']:.2f}")
         print()
+    
+    print("Retrieval latency:")
+    for name, stats in agent.latency_stats().items():
+        if 'p50_ms' in stats:
+            print(f"  {name}: p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms ({stats['count']} calls)")
+        else:
+            print(f"  {name}: {stats['count']}")
@@ -0,0 +1,208 @@
+"""
+Semantic Cache
+Answer reuse for paraphrased queries via embedding nearest-neighbour lookup
+"""
+import copy
+import os
+import re
+import threading
+
+import numpy as np
+
+# Off until a threshold has been measured on the deployment's own queries
+# (benchmarks/bench_semantic_cache.py pairs): a false hit serves the answer
+# to a different question
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "off").lower() not in ("0", "off", "false", "none")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.90"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))
+SEMANTIC_CACHE_EVICTION = os.getenv("SEMANTIC_CACHE_EVICTION", "lru")  # lru or lfu
+EVICTION_POLICIES = ("lru", "lfu")
+
+# Words that flip or narrow the meaning of an otherwise similar query
+NEGATIONS = {"not", "no", "never", "without", "except", "cannot", "can't", "don't", "doesn't", "isn't"}
+
+
+def guard_terms(query):
+    """
+    Terms that must match exactly for two similar queries to share an answer
+
+    Embeddings barely move when a number or a negation changes
+    ("leave in 2023" vs "leave in 2024", "with" vs "without"), but the
+    answer does.
+    """
+    tokens = re.findall(r"[a-z0-9']+", query.lower())
+    return frozenset(token for token in tokens if token.isdigit() or token in NEGATIONS)
+
+
+class SemanticCache:
+    def __init__(self, encoder=None, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_SIZE,
+                 eviction=SEMANTIC_CACHE_EVICTION, version=None):
+        """
+        Cache final pipeline states and serve them to near-duplicate queries
+
+        Query embeddings live in one preallocated (max_entries, dim) matrix,
+        so memory is bounded and a lookup is a single matrix-vector product
+        (well under a millisecond at a few thousand entries, where an
+        approximate index would not pay for itself).
+
+        Args:
+            encoder: Embedding model with an encode() method (default: shared MiniLM)
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Capacity; the LRU or LFU entry is evicted beyond it
+            eviction: "lru" or "lfu"
+            version: Callable returning the index version; a change empties the cache
+        """
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{eviction}', expected one of {EVICTION_POLICIES}")
+        self._encoder = encoder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.eviction = eviction
+        self._version_fn = version
+        self._version = None
+
+        self._embeddings = None  # allocated on first insert, once the dimension is known
+        self._occupied = np.zeros(max_entries, dtype=bool)
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._use_counts = np.zeros(max_entries, dtype=np.int64)
+        self._entries = [None] * max_entries  # slot -> (query, guard terms, state)
+        self._clock = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._guard_rejections = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            from model_registry import get_encoder
+            self._encoder = get_encoder()
+        return self._encoder
+
+    def embed(self, query):
+        """Unit-length embedding of a query"""
+        embedding = np.asarray(self.encoder.encode([query])[0], dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def _check_version(self):
+        """Empty the cache if the index changed since the last call (lock held)"""
+        if self._version_fn is None:
+            return
+        version = self._version_fn()
+        if self._version is not None and version != self._version:
+            self._clear()
+        self._version = version
+
+    def _clear(self):
+        self._occupied[:] = False
+        self._entries = [None] * self.max_entries
+
+    def _touch(self, slot):
+        self._clock += 1
+        self._last_used[slot] = self._clock
+        self._use_counts[slot] += 1
+
+    def _free_slot(self):
+        """An empty slot, evicting by the configured policy if full"""
+        empty = np.flatnonzero(~self._occupied)
+        if len(empty):
+            return int(empty[0])
+        if self.eviction == "lfu":
+            # Least used first, least recently used among ties
+            slot = int(np.lexsort((self._last_used, self._use_counts))[0])
+        else:
+            slot = int(np.argmin(self._last_used))
+        self._evictions += 1
+        return slot
+
+    def lookup(self, query, query_embedding=None):
+        """
+        Cached state of the most similar earlier query, or None
+
+        Returns:
+            (state, match) where match has the cached 'query' and its 'similarity'
+        """
+        if query_embedding is None:
+            query_embedding = self.embed(query)
+        with self._lock:
+            self._check_version()
+            if self._embeddings is None or not self._occupied.any():
+                self._misses += 1
+                return None
+
+            similarities = self._embeddings @ query_embedding
+            similarities[~self._occupied] = -np.inf
+            slot = int(np.argmax(similarities))
+            similarity = float(similarities[slot])
+            if similarity < self.threshold:
+                self._misses += 1
+                return None
+
+            cached_query, guard, state = self._entries[slot]
+            if guard != guard_terms(query):
+                self._misses += 1
+                self._guard_rejections += 1
+                return None
+
+            self._hits += 1
+            self._touch(slot)
+        return copy.deepcopy(state), {'query': cached_query, 'similarity': similarity}
+
+    def store(self, query, state, query_embedding=None):
+        """Remember a final state under the query's embedding"""
+        if query_embedding is None:
+            query_embedding = self.embed(query)
+        with self._lock:
+            self._check_version()
+            if self._embeddings is None:
+                self._embeddings = np.zeros((self.max_entries, len(query_embedding)), dtype=np.float32)
+            slot = self._free_slot()
+            self._embeddings[slot] = query_embedding
+            self._entries[slot] = (query, guard_terms(query), copy.deepcopy(state))
+            self._occupied[slot] = True
+            self._use_counts[slot] = 0
+            self._touch(slot)
+
+    def invalidate(self):
+        """Drop every entry (documents changed)"""
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        """Hit ratio, precision-guard rejections and occupancy"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+                'guard_rejections': self._guard_rejections,
+                'evictions': self._evictions,
+                'entries': int(self._occupied.sum()),
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+                'eviction': self.eviction
+            }
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """Process-wide semantic cache configured from the environment (None if disabled)"""
+    global _semantic_cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            from answer_cache import get_answer_cache
+
+            # Follow the answer cache's index version so re-ingestion seen by
+            # any worker (through Redis) also empties this in-process cache
+            answer_cache = get_answer_cache()
+            _semantic_cache = SemanticCache(version=answer_cache.index_version if answer_cache else None)
+        return _semantic_cache
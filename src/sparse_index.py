@@ -0,0 +1,312 @@
+"""
+Sparse Index Service
+Builds the BM25 index once per process and shares it between all callers
+"""
+from contextlib import contextmanager
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from hybrid_search import HybridSearch, INDEX_FORMAT_VERSION
+from perf_stats import current_rss_mb
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshots are written without the lock and never pruned
+    fcntl = None
+
+CURRENT_POINTER = "CURRENT"
+SNAPSHOT_LOCK = ".lock"
+# Collection metadata field identifying the collection contents
+CONTENT_VERSION_KEY = "content_version"
+
+
+def default_index_dir(db_path):
+    """BM25 index directory that sits next to the ChromaDB directory"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "bm25_index")
+
+
+def content_version(collection):
+    """Content version stamped on a collection (None if it never was)"""
+    return (collection.metadata or {}).get(CONTENT_VERSION_KEY)
+
+
+def bump_content_version(collection):
+    """
+    Stamp a collection with a new content version
+
+    Call after changing its documents: saved BM25 indexes record the
+    version they were built from, so a cold start compares one metadata
+    field instead of reading the corpus. Versions are random, so two
+    processes bumping at once still end up with a version neither index
+    was built from.
+
+    Returns:
+        The new version
+    """
+    # hnsw:* settings are fixed at creation and modify() rejects them
+    metadata = {key: value for key, value in (collection.metadata or {}).items() if not key.startswith("hnsw:")}
+    metadata[CONTENT_VERSION_KEY] = uuid.uuid4().hex
+    collection.modify(metadata=metadata)
+    return metadata[CONTENT_VERSION_KEY]
+
+
+class SparseIndexService:
+    def __init__(self, collection, index_dir=None):
+        """
+        Own the BM25 index for a ChromaDB collection
+
+        The index is built lazily on first access and then reused by
+        every component that asks for it.
+
+        Args:
+            collection: ChromaDB collection to index
+            index_dir: Optional directory for the persistent index. When set,
+                a saved index matching the collection is memory-mapped instead
+                of rebuilt, and fresh builds are written there for the next
+                process (and other workers) to map.
+        """
+        self.collection = collection
+        self.index_dir = index_dir
+        self._index = None
+        self._lock = threading.Lock()
+        self.build_time = 0.0
+        self.build_rss_delta_mb = 0.0
+        self.num_documents = 0
+        self.loaded_from_disk = False
+        self.content_version = None  # collection content version the index was built from
+
+    def _fetch_documents(self):
+        """Pull every document id, text and metadata out of the collection once"""
+        try:
+            results = self.collection.get(include=["documents", "metadatas"])
+            return results['ids'], results['documents'] or [], results['metadatas'] or []
+        except Exception as e:
+            print(f"⚠️  Could not read documents for BM25 index: {e}")
+            return [], [], []
+
+    def _current_snapshot(self):
+        """Directory of the index the CURRENT pointer refers to, if any"""
+        try:
+            with open(os.path.join(self.index_dir, CURRENT_POINTER), 'r', encoding='utf-8') as f:
+                return os.path.join(self.index_dir, f.read().strip())
+        except OSError:
+            return None
+
+    def _load_from_disk(self, version):
+        """Memory-map the saved index if it was built from this content version"""
+        snapshot = self._current_snapshot()
+        if snapshot is None:
+            return None
+        manifest = HybridSearch.read_manifest(snapshot)
+        if manifest is None:
+            print(f"⚠️  Ignoring BM25 index at {snapshot} (missing or old format)")
+            return None
+        if manifest.get('fingerprint') != version:
+            print("⚠️  Saved BM25 index is stale, rebuilding")
+            return None
+        try:
+            return HybridSearch.load(snapshot)
+        except Exception as e:
+            print(f"⚠️  Could not load BM25 index from {snapshot}: {e}")
+            return None
+
+    @contextmanager
+    def _snapshot_lock(self):
+        """
+        Exclusive lock on the index directory across processes
+
+        Yields whether the lock is held (False where file locks are unavailable).
+        """
+        if fcntl is None:
+            yield False
+            return
+        with open(os.path.join(self.index_dir, SNAPSHOT_LOCK), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save_to_disk(self, index, version):
+        """
+        Write a new snapshot and atomically repoint CURRENT at it
+
+        Writing, repointing and pruning happen under the directory lock, so
+        no other worker is halfway through a snapshot when old ones are
+        removed. The previous snapshot is kept for processes that just read
+        CURRENT; processes that already mapped an older one keep working on
+        their open files.
+        """
+        name = f"v{INDEX_FORMAT_VERSION}-{version[:12]}-{uuid.uuid4().hex[:8]}"
+        snapshot = os.path.join(self.index_dir, name)
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            with self._snapshot_lock() as locked:
+                previous = self._current_snapshot()
+                index.save(snapshot, fingerprint=version)
+                pointer_tmp = os.path.join(self.index_dir, f"{CURRENT_POINTER}.{os.getpid()}.tmp")
+                with open(pointer_tmp, 'w', encoding='utf-8') as f:
+                    f.write(name)
+                os.replace(pointer_tmp, os.path.join(self.index_dir, CURRENT_POINTER))
+
+                if locked:
+                    keep = {snapshot, previous}
+                    for entry in os.listdir(self.index_dir):
+                        path = os.path.join(self.index_dir, entry)
+                        if path not in keep and os.path.isdir(path):
+                            shutil.rmtree(path, ignore_errors=True)
+        except OSError as e:
+            print(f"⚠️  Could not save BM25 index to {snapshot}: {e}")
+
+    def _current_content_version(self):
+        """The collection's content version, stamping one if it has none yet"""
+        version = content_version(self.collection)
+        if version is None:
+            # Stamped before the documents are read: a later change bumps it again
+            try:
+                version = bump_content_version(self.collection)
+            except Exception as e:
+                print(f"⚠️  Could not stamp a content version, the BM25 index will not be persisted: {e}")
+        return version
+
+    def _build(self, use_saved=True):
+        """Load or build the index (called with the lock held)"""
+        rss_before = current_rss_mb()
+        start_time = time.time()
+
+        # Read the version before the documents, so a concurrent change never
+        # goes into an index labeled with the version it replaced
+        version = self._current_content_version() if self.index_dir else None
+        index = self._load_from_disk(version) if version is not None and use_saved else None
+        self.loaded_from_disk = index is not None
+        if index is None:
+            doc_ids, documents, metadatas = self._fetch_documents()
+            index = HybridSearch(documents, doc_ids=doc_ids, metadatas=metadatas or None)
+            if version is not None and documents:
+                self._save_to_disk(index, version)
+        self.content_version = version
+
+        self.build_time = time.time() - start_time
+        self.build_rss_delta_mb = current_rss_mb() - rss_before
+        self.num_documents = len(index.doc_ids)
+        print(
+            f"📊 Sparse index {'loaded' if self.loaded_from_disk else 'built'} in {self.build_time:.2f}s "
+            f"(+{self.build_rss_delta_mb:.0f} MB RSS)\n"
+        )
+        return index
+
+    def use_index_dir(self, index_dir):
+        """
+        Persist to index_dir from now on
+
+        A service created without a directory (e.g. by VectorDatabase)
+        adopts the first one a later caller passes; an index already built
+        in memory is snapshotted there right away.
+
+        Raises:
+            ValueError: if the service already persists to a different directory
+        """
+        with self._lock:
+            if self.index_dir is not None:
+                if os.path.abspath(self.index_dir) != os.path.abspath(index_dir):
+                    raise ValueError(
+                        f"Sparse index for '{self.collection.name}' already uses {self.index_dir}, not {index_dir}"
+                    )
+                return
+            self.index_dir = index_dir
+            if self._index is not None and not self._index.has_pending_changes():
+                self.content_version = self.content_version or self._current_content_version()
+                if self.content_version is not None:
+                    self._save_to_disk(self._index, self.content_version)
+
+    def get_index(self):
+        """Return the shared HybridSearch index, building it on first use"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build()
+        return self._index
+
+    def rebuild(self):
+        """Rebuild the index from the current collection contents"""
+        with self._lock:
+            self._index = self._build(use_saved=False)
+        return self._index
+
+    def _apply(self, operation):
+        """
+        Run an incremental update against the built index
+
+        Before the index is built there is nothing to update: the first
+        build reads the collection, which already holds the change. After
+        a segment merge the new main segment is snapshotted to disk under
+        the collection's current content version (writers bump it before
+        applying the change here, see VectorDatabase).
+        """
+        index = self._index
+        if index is None:
+            return None
+        version_before = index.version
+        result = operation(index)
+        self.num_documents = len(index)
+        self.content_version = content_version(self.collection)
+        if (self.index_dir and self.content_version is not None and index.version != version_before
+                and not index.has_pending_changes()):
+            self._save_to_disk(index, self.content_version)
+        return result
+
+    def upsert_documents(self, doc_ids, documents, metadatas=None):
+        """Add new documents and replace existing ones in the BM25 index"""
+        with self._lock:
+            self._apply(lambda index: index.upsert_documents(doc_ids, documents, metadatas))
+
+    def delete_documents(self, doc_ids):
+        """Remove documents from the BM25 index. Returns the number removed"""
+        with self._lock:
+            return self._apply(lambda index: index.delete_documents(doc_ids)) or 0
+
+    def stats(self):
+        """Build time and memory cost of the shared index"""
+        return {
+            'collection': self.collection.name,
+            'built': self._index is not None,
+            'loaded_from_disk': self.loaded_from_disk,
+            'index_dir': self.index_dir,
+            'num_documents': self.num_documents,
+            'index_version': self._index.version if self._index is not None else 0,
+            'build_time': self.build_time,
+            'build_rss_delta_mb': self.build_rss_delta_mb,
+            'index_mb': self._index.bm25.nbytes / (1024 * 1024) if self._index is not None else 0.0
+        }
+
+
+# One service per collection name, shared across the process
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_sparse_index_service(collection, index_dir=None):
+    """
+    Get the process-wide sparse index service for a collection
+
+    Callers without index_dir share whatever directory the service uses.
+    The first index_dir passed enables persistence even if the service was
+    created without one; a different index_dir later raises ValueError.
+    """
+    with _services_lock:
+        service = _services.get(collection.name)
+        if service is None:
+            service = SparseIndexService(collection, index_dir=index_dir)
+            _services[collection.name] = service
+            return service
+    if index_dir is not None:
+        service.use_index_dir(index_dir)
+    return service
+
+
+def get_sparse_index(collection, index_dir=None):
+    """Get the shared BM25 index for a collection"""
+    return get_sparse_index_service(collection, index_dir=index_dir).get_index()
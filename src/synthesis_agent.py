@@ -2,9 +2,12 @@
 Synthesis Agent
 Combines information from multiple sources into coherent answers with citations
 """
+import asyncio
 import os
 from dotenv import load_dotenv
-from groq import Groq
+from llm_gateway import get_gateway
+from context_compressor import CONTEXT_COMPRESSION_ENABLED, ContextCompressor
+from context_packer import ContextPacker
 import re
 
 load_dotenv()
@@ -14,8 +17,12 @@ class SynthesisAgent:
         """Initialize Synthesis Agent"""
         print("🧬 Initializing Synthesis Agent...\n")
         
-        self.groq_client = Groq(api_key=groq_api_key)
+        self.llm = get_gateway(groq_api_key)
         self.model = "llama-3.3-70b-versatile"
+        # Keeps the query-relevant sentences (CONTEXT_COMPRESSION), then picks
+        # the passages that go into the prompt (CONTEXT_TOKEN_BUDGET)
+        self.compressor = ContextCompressor() if CONTEXT_COMPRESSION_ENABLED else None
+        self.packer = ContextPacker()
         
         self.synthesis_prompt = """You are an expert at synthesizing information CONCISELY.
 
@@ -35,22 +42,28 @@ ANSWER (CONCISE, 2-3 sentences max):"""
         
         print("✅ Synthesis Agent ready!\n")
     
-    def format_documents_for_synthesis(self, documents):
-        """Format documents for the synthesis prompt"""
+    def select_context(self, query, documents):
+        """Compress documents to the sentences relevant to the query, then pack them into the token budget"""
+        if self.compressor is not None and query:
+            documents, _ = self.compressor.compress(query, documents, budget=self.packer.budget)
+        packed_documents, _ = self.packer.pack(query, documents)
+        return packed_documents
+    
+    def format_documents_for_synthesis(self, documents, query=None):
+        """Format documents for the synthesis prompt, compressed and packed into the context token budget"""
+        packed_documents = self.select_context(query, documents)
         formatted = "## RETRIEVED DOCUMENTS:\n\n"
         
-        for i, doc in enumerate(documents, 1):
+        for i, doc in enumerate(packed_documents, 1):
             formatted += f"[Document {i}] Source: {doc.get('source', 'unknown')}\n"
-            formatted += f"Content: {doc['content'][:400]}...\n\n"
+            formatted += f"Content: {doc['content']}\n\n"
         
         return formatted
     
-    def synthesize(self, query, documents):
-        """Synthesize answer from multiple documents"""
-        print(f"🧬 Synthesizing answer from {len(documents)} documents...")
-        
+    def _request(self, query, documents):
+        """Chat completion arguments for a synthesis"""
         # Format documents
-        formatted_docs = self.format_documents_for_synthesis(documents)
+        formatted_docs = self.format_documents_for_synthesis(documents, query)
         
         # Create synthesis prompt
         prompt = f"""{formatted_docs}
@@ -59,18 +72,47 @@ QUESTION: {query}
 
 Please synthesize a comprehensive answer based on these documents. Use chain-of-thought reasoning and cite your sources."""
         
+        return {
+            'messages': [
+                {
+                    "role": "system",
+                    "content": prompt
+                }
+            ],
+            'model': self.model,
+            'temperature': 0.2, #lowe=more consistent
+            'max_tokens': 200   # force conciseness
+        }
+    
+    def synthesize(self, query, documents):
+        """
+        Synthesize answer from multiple documents
+        
+        Raises:
+            Exception: the LLM error; callers decide what the user sees
+        """
+        print(f"🧬 Synthesizing answer from {len(documents)} documents...")
+        
+        try:
+            response = self.llm.chat(**self._request(query, documents))
+            
+            answer = response.choices[0].message.content.strip()
+            print("✅ Synthesis complete!\n")
+            
+            return answer
+        
+        except Exception as e:
+            print(f"❌ Synthesis error: {e}\n")
+            raise
+    
+    async def asynthesize(self, query, documents):
+        """Async version of synthesize (shared AsyncGroq client; raises the LLM error)"""
+        print(f"🧬 Synthesizing answer from {len(documents)} documents...")
+        
         try:
-            response = self.groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": prompt
-                    }
-                ],
-                model=self.model,
-                temperature=0.2, #lowe=more consistent
-                max_tokens=200   # force conciseness
-            )
+            # Compression encodes sentences; keep it off the event loop
+            request = await asyncio.to_thread(self._request, query, documents)
+            response = await self.llm.achat(**request)
             
             answer = response.choices[0].message.content.strip()
             print("✅ Synthesis complete!\n")
@@ -79,7 +121,26 @@ Please synthesize a comprehensive answer based on these documents. Use chain-of-
         
         except Exception as e:
             print(f"❌ Synthesis error: {e}\n")
-            return f"Error generating answer: {e}"
+            raise
+    
+    async def astream_synthesize(self, query, documents):
+        """
+        Stream the synthesized answer as the LLM produces it (yields text deltas)
+        
+        Raises:
+            Exception: the LLM error, possibly after some deltas were yielded
+        """
+        print(f"🧬 Streaming answer from {len(documents)} documents...")
+        
+        try:
+            request = await asyncio.to_thread(self._request, query, documents)
+            async for delta in self.llm.astream_chat(**request):
+                yield delta
+            print("✅ Synthesis complete!\n")
+        
+        except Exception as e:
+            print(f"❌ Synthesis error: {e}\n")
+            raise
     
     def extract_citations(self, answer):
         """Extract citations from synthesized answer"""
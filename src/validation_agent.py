@@ -2,21 +2,151 @@
 Validation Agent
 Checks synthesis output for hallucinations, contradictions, and unsupported claims
 """
+import asyncio
 import os
+import re
+import threading
+import time
+import numpy as np
 from dotenv import load_dotenv
-from groq import Groq
-from sentence_transformers import SentenceTransformer, util
+from context_packer import split_sentences
+from llm_gateway import get_gateway
+from model_registry import get_cross_encoder, get_encoder
+from perf_stats import LatencyTracker
+from query_agent import query_terms
 
 load_dotenv()
 
+# Independent checks run on every answer: citations, nli, llm, tiered (comma-separated).
+# Citation checking is a regex; NLI and the LLM judge add model/LLM cost per answer.
+# "tiered" settles each claim with the cheapest of lexical/embedding, NLI, LLM that can.
+VALIDATION_CHECKS_AVAILABLE = ("citations", "nli", "llm", "tiered")
+VALIDATION_CHECKS = tuple(
+    check.strip() for check in os.getenv("VALIDATION_CHECKS", "citations").split(",") if check.strip()
+)
+
+# Models are only loaded when a configured check first needs them; with
+# VALIDATION_PREWARM on, the API loads them in the background after startup
+NLI_MODEL = os.getenv("VALIDATION_NLI_MODEL", "cross-encoder/qnli-distilroberta-base")
+VALIDATION_PREWARM = os.getenv("VALIDATION_PREWARM", "off").lower() in ("1", "on", "true", "yes")
+# Evidence windows: sources are cut into overlapping word windows that fit the
+# cross-encoder's 512-token input together with a claim
+NLI_WINDOW_WORDS = 128
+NLI_WINDOW_STRIDE = 96
+NLI_BATCH_SIZE = 32
+NLI_ENTAILMENT_THRESHOLD = 0.5
+
+# Tier 1 (lexical/embedding): a claim is settled when its best source sentence
+# is clearly a paraphrase (high cosine and n-gram overlap) or clearly unrelated
+VALIDATION_TIERS = ("lexical", "nli", "llm")
+TIER_SUPPORTED_SIMILARITY = float(os.getenv("TIER_SUPPORTED_SIMILARITY", "0.80"))
+TIER_SUPPORTED_OVERLAP = float(os.getenv("TIER_SUPPORTED_OVERLAP", "0.60"))
+TIER_UNSUPPORTED_SIMILARITY = float(os.getenv("TIER_UNSUPPORTED_SIMILARITY", "0.30"))
+TIER_UNSUPPORTED_OVERLAP = float(os.getenv("TIER_UNSUPPORTED_OVERLAP", "0.20"))
+# Tier 2 (NLI): entailment scores between these bounds go on to the LLM judge
+TIER_NLI_SUPPORTED = float(os.getenv("TIER_NLI_SUPPORTED", "0.80"))
+TIER_NLI_UNSUPPORTED = float(os.getenv("TIER_NLI_UNSUPPORTED", "0.20"))
+
+CITATION_PATTERN = re.compile(r'\[Source: ([^\]]+)\]')
+
+
+def evidence_windows(documents, window_words=NLI_WINDOW_WORDS, stride=NLI_WINDOW_STRIDE):
+    """Overlapping word windows over each document (never spanning two documents)"""
+    windows = []
+    for doc in documents:
+        words = doc['content'].split()
+        if not words:
+            continue
+        starts = list(range(0, max(len(words) - window_words, 0) + 1, stride))
+        if starts[-1] + window_words < len(words):
+            starts.append(len(words) - window_words)  # cover the tail
+        windows.extend(" ".join(words[start:start + window_words]) for start in starts)
+    return windows
+
+
+def nli_support_scores(model, claims, documents, batch_size=NLI_BATCH_SIZE):
+    """
+    Best entailment score of each claim against any evidence window
+
+    Every (window, claim) pair goes through one predict call. Pairs are
+    sorted by length first so each batch is padded only to its own
+    longest pair.
+    """
+    windows = evidence_windows(documents)
+    if not claims or not windows:
+        return np.zeros(len(claims))
+
+    pairs = [(window, claim) for claim in claims for window in windows]
+    lengths = [len(window) + len(claim) for window, claim in pairs]
+    order = np.argsort(lengths, kind="stable")
+
+    sorted_scores = model.predict([pairs[i] for i in order], batch_size=batch_size, show_progress_bar=False)
+    scores = np.empty(len(pairs))
+    scores[order] = np.asarray(sorted_scores, dtype=np.float64).reshape(len(pairs))
+    return scores.reshape(len(claims), len(windows)).max(axis=1)
+
+
+def ngram_overlap(claim, sentence):
+    """Share of a claim's content unigrams and bigrams that also occur in a sentence"""
+    claim_terms, sentence_terms = query_terms(claim), query_terms(sentence)
+    claim_ngrams = set(claim_terms) | set(zip(claim_terms, claim_terms[1:]))
+    if not claim_ngrams:
+        return 0.0
+    sentence_ngrams = set(sentence_terms) | set(zip(sentence_terms, sentence_terms[1:]))
+    return len(claim_ngrams & sentence_ngrams) / len(claim_ngrams)
+
+
+def lexical_support(encoder, claims, documents):
+    """
+    Each claim's best source sentence by embedding cosine, and its n-gram overlap
+
+    Claims and source sentences are embedded together in one encode call.
+
+    Returns:
+        List of (similarity, overlap, sentence) per claim
+    """
+    sentences = [sentence for doc in documents for sentence in split_sentences(doc['content'])]
+    if not claims or not sentences:
+        return [(0.0, 0.0, None) for _ in claims]
+
+    embeddings = np.asarray(encoder.encode(claims + sentences), dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings = embeddings / np.where(norms > 0, norms, 1)
+    similarities = embeddings[:len(claims)] @ embeddings[len(claims):].T
+
+    support = []
+    for claim, row in zip(claims, similarities):
+        best = int(np.argmax(row))
+        support.append((float(row[best]), ngram_overlap(claim, sentences[best]), sentences[best]))
+    return support
+
+
 class ValidationAgent:
-    def __init__(self, groq_api_key=None):
-        """Initialize Validation Agent"""
+    def __init__(self, groq_api_key=None, checks=VALIDATION_CHECKS):
+        """
+        Initialize Validation Agent
+        
+        Args:
+            groq_api_key: Groq API key
+            checks: Which of VALIDATION_CHECKS_AVAILABLE validate() runs
+        """
         print("✅ Initializing Validation Agent...\n")
         
-        self.groq_client = Groq(api_key=groq_api_key)
+        unknown = set(checks) - set(VALIDATION_CHECKS_AVAILABLE)
+        if unknown:
+            raise ValueError(f"Unknown validation checks {sorted(unknown)}, expected {VALIDATION_CHECKS_AVAILABLE}")
+        self.checks = tuple(checks)
+        self.llm = get_gateway(groq_api_key)
         self.model_name = "llama-3.3-70b-versatile"
-        self.nli_model = SentenceTransformer('cross-encoder/qnli-distilroberta-base')
+        # Lazy: loaded by the first NLI check (or prewarm()), never if "nli" is not configured
+        self.nli_model = get_cross_encoder(NLI_MODEL)
+        # Shared MiniLM encoder for the tiered check's first tier (also lazy)
+        self.encoder = get_encoder()
+        
+        # Claims settled per tier by the tiered check ("unresolved": the LLM gave no verdict)
+        self.tier_counts = {tier: 0 for tier in VALIDATION_TIERS + ("unresolved",)}
+        self.latency = LatencyTracker()
+        self._stats_lock = threading.Lock()
         
         self.validation_prompt = """You are a fact-checking expert. Analyze if the answer claims are supported by the sources.
 
@@ -37,11 +167,50 @@ CONFIDENCE: 0-100
 ISSUES: [list any problems]
 REASONING: [brief explanation]"""
         
+        self.claims_prompt = """You are a fact-checking expert. Judge each claim against its evidence only.
+
+{claims}
+
+For each claim, answer SUPPORTED if its evidence states or directly implies it,
+otherwise UNSUPPORTED.
+
+Respond in this format ONLY, one line per claim:
+CLAIM 1: SUPPORTED/UNSUPPORTED
+CLAIM 2: SUPPORTED/UNSUPPORTED"""
+        
         print("✅ Validation Agent ready!\n")
     
+    def prewarm(self):
+        """Load the models used by the configured checks so the first answer does not wait for them"""
+        if "tiered" in self.checks and not self.encoder.loaded:
+            self.encoder.encode(["warm up"])
+        if ("nli" in self.checks or "tiered" in self.checks) and not self.nli_model.loaded:
+            # The first predict also pays one-off framework initialization
+            self.nli_model.predict([("warm up", "warm up")], show_progress_bar=False)
+    
+    def backend_status(self):
+        """Configured checks and whether their models are loaded"""
+        return {
+            'checks': list(self.checks),
+            'nli_model': NLI_MODEL,
+            'nli_loaded': self.nli_model.loaded
+        }
+    
+    def stats(self):
+        """Fraction of claims each tier of the tiered check settles, and validation latency"""
+        with self._stats_lock:
+            counts = dict(self.tier_counts)
+        total = sum(counts.values())
+        return {
+            'claims': total,
+            'resolved_fraction': {tier: count / total if total else 0.0 for tier, count in counts.items()},
+            'latency': self.latency.summary()
+        }
+    
     def extract_claims(self, answer):
         """Extract individual claims from answer"""
-        # Split by sentences
+        # Drop citation markers (their file extensions would split claims), then split by sentences
+        answer = CITATION_PATTERN.sub('', answer)
         claims = [s.strip() for s in answer.split('.') if s.strip() and len(s.strip()) > 10]
         return claims
     
@@ -50,18 +219,13 @@ REASONING: [brief explanation]"""
         print("🔍 Checking for hallucinations...")
         
         claims = self.extract_claims(answer)
-        source_text = " ".join([doc['content'] for doc in documents])
-        
-        hallucinated_claims = []
         
         try:
-            for claim in claims:
-                # Check if claim is entailed by sources
-                scores = self.nli_model.predict([[source_text, claim]])
-                
-                # If not entailed (contradiction or neutral), it might be hallucinated
-                if scores[0] < 0.5:  # Low entailment score
-                    hallucinated_claims.append(claim)
+            # A claim is supported if any window of any source entails it
+            support = nli_support_scores(self.nli_model, claims, documents)
+            hallucinated_claims = [
+                claim for claim, score in zip(claims, support) if score < NLI_ENTAILMENT_THRESHOLD
+            ]
             
             if hallucinated_claims:
                 print(f"   ⚠️  Found {len(hallucinated_claims)} potential hallucinations")
@@ -78,10 +242,8 @@ REASONING: [brief explanation]"""
         """Check if claims are properly cited"""
         print("🔗 Checking citations...")
         
-        import re
-        
         # Extract cited sources
-        cited_sources = re.findall(r'\[Source: ([^\]]+)\]', answer)
+        cited_sources = CITATION_PATTERN.findall(answer)
         
         # Check if all cited sources exist
         valid_cites = []
@@ -104,10 +266,8 @@ REASONING: [brief explanation]"""
             'coverage': len(valid_cites) / max(len(cited_sources), 1) if cited_sources else 0
         }
     
-    def llm_validation(self, answer, documents):
-        """Use LLM to validate answer quality"""
-        print("🤖 LLM validation...")
-        
+    def _llm_request(self, answer, documents):
+        """Chat completion arguments for an LLM validation"""
         # Format sources
         sources_text = "\n".join([
             f"- {doc['source']}: {doc['content'][:200]}..."
@@ -119,18 +279,40 @@ REASONING: [brief explanation]"""
             answer=answer
         )
         
+        return {
+            'messages': [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            'model': self.model_name,
+            'temperature': 0.3,
+            'max_tokens': 300
+        }
+    
+    def llm_validation(self, answer, documents):
+        """Use LLM to validate answer quality"""
+        print("🤖 LLM validation...")
+        
+        try:
+            response = self.llm.chat(**self._llm_request(answer, documents))
+            
+            validation_result = response.choices[0].message.content.strip()
+            print(f"   ✓ LLM validation complete")
+            
+            return validation_result
+        
+        except Exception as e:
+            print(f"   ❌ LLM validation error: {e}")
+            return ""
+    
+    async def allm_validation(self, answer, documents):
+        """Async version of llm_validation (shared AsyncGroq client)"""
+        print("🤖 LLM validation...")
+        
         try:
-            response = self.groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model=self.model_name,
-                temperature=0.3,
-                max_tokens=300
-            )
+            response = await self.llm.achat(**self._llm_request(answer, documents))
             
             validation_result = response.choices[0].message.content.strip()
             print(f"   ✓ LLM validation complete")
@@ -141,36 +323,270 @@ REASONING: [brief explanation]"""
             print(f"   ❌ LLM validation error: {e}")
             return ""
     
+    async def acheck_hallucinations(self, answer, documents):
+        """check_hallucinations off the event loop (the NLI model is CPU-bound)"""
+        return await asyncio.to_thread(self.check_hallucinations, answer, documents)
+    
+    def _resolve_claims(self, claims, documents):
+        """
+        Tiers 1 and 2 of the tiered check
+        
+        Returns:
+            One record per claim; 'tier' stays None for claims left to the LLM judge
+        """
+        start_time = time.perf_counter()
+        records = []
+        for claim, (similarity, overlap, sentence) in zip(claims, lexical_support(self.encoder, claims, documents)):
+            record = {'claim': claim, 'evidence': sentence, 'similarity': similarity, 'overlap': overlap,
+                      'nli_score': None, 'tier': None, 'supported': None}
+            if similarity >= TIER_SUPPORTED_SIMILARITY and overlap >= TIER_SUPPORTED_OVERLAP:
+                record.update(tier='lexical', supported=True)
+            elif similarity < TIER_UNSUPPORTED_SIMILARITY and overlap < TIER_UNSUPPORTED_OVERLAP:
+                record.update(tier='lexical', supported=False)
+            records.append(record)
+        self.latency.record('tier_lexical', time.perf_counter() - start_time)
+        
+        ambiguous = [record for record in records if record['tier'] is None]
+        if not ambiguous:
+            return records
+        
+        start_time = time.perf_counter()
+        try:
+            scores = nli_support_scores(self.nli_model, [record['claim'] for record in ambiguous], documents)
+        except Exception as e:
+            print(f"   ⚠️  NLI tier skipped: {e}")
+            scores = []  # everything ambiguous goes to the LLM
+        for record, score in zip(ambiguous, scores):
+            record['nli_score'] = float(score)
+            if score >= TIER_NLI_SUPPORTED:
+                record.update(tier='nli', supported=True)
+            elif score <= TIER_NLI_UNSUPPORTED:
+                record.update(tier='nli', supported=False)
+        self.latency.record('tier_nli', time.perf_counter() - start_time)
+        return records
+    
+    def _claims_request(self, records):
+        """Chat completion arguments for judging claims, each with its best evidence sentence"""
+        claims_text = "\n\n".join(
+            f"CLAIM {i}: {record['claim']}\nEVIDENCE {i}: {record['evidence'] or '(no matching source sentence)'}"
+            for i, record in enumerate(records, 1)
+        )
+        return {
+            'messages': [
+                {
+                    "role": "user",
+                    "content": self.claims_prompt.format(claims=claims_text)
+                }
+            ],
+            'model': self.model_name,
+            'temperature': 0.0,
+            'max_tokens': 12 * len(records) + 20
+        }
+    
+    def llm_claims_validation(self, records):
+        """Ask the LLM for a verdict on each claim record (tier 3 of the tiered check)"""
+        print(f"🤖 LLM judging {len(records)} claims...")
+        
+        try:
+            response = self.llm.chat(**self._claims_request(records))
+            
+            verdicts = response.choices[0].message.content.strip()
+            print(f"   ✓ LLM claim verdicts received")
+            
+            return verdicts
+        
+        except Exception as e:
+            print(f"   ❌ LLM validation error: {e}")
+            return ""
+    
+    async def allm_claims_validation(self, records):
+        """Async version of llm_claims_validation (shared AsyncGroq client)"""
+        print(f"🤖 LLM judging {len(records)} claims...")
+        
+        try:
+            response = await self.llm.achat(**self._claims_request(records))
+            
+            verdicts = response.choices[0].message.content.strip()
+            print(f"   ✓ LLM claim verdicts received")
+            
+            return verdicts
+        
+        except Exception as e:
+            print(f"   ❌ LLM validation error: {e}")
+            return ""
+    
+    @staticmethod
+    def _parse_claim_verdicts(text, count):
+        """Per-claim verdicts of an llm_claims_validation response: True, False or None when missing"""
+        verdicts = [None] * count
+        for number, verdict in re.findall(r'CLAIM\s*(\d+)\s*:\s*(SUPPORTED|UNSUPPORTED)\b(?!\s*/)', text, re.IGNORECASE):
+            if 1 <= int(number) <= count:
+                verdicts[int(number) - 1] = verdict.upper() == 'SUPPORTED'
+        return verdicts
+    
+    def _settle_with_llm(self, records, verdict_text, start_time):
+        """Apply the LLM judge's per-claim verdicts to the claims it was given"""
+        self.latency.record('tier_llm', time.perf_counter() - start_time)
+        for record, supported in zip(records, self._parse_claim_verdicts(verdict_text, len(records))):
+            if supported is None:
+                # No verdict: counted as unsupported rather than silently passed
+                record.update(tier='unresolved', supported=False)
+            else:
+                record.update(tier='llm', supported=supported)
+    
+    def _tiered_result(self, records, start_time):
+        """Summarize a tiered check and count which tier settled each claim"""
+        resolved_by = {tier: 0 for tier in self.tier_counts}
+        for record in records:
+            resolved_by[record['tier']] += 1
+        with self._stats_lock:
+            for tier, count in resolved_by.items():
+                self.tier_counts[tier] += count
+        self.latency.record('tiered', time.perf_counter() - start_time)
+        
+        unsupported = [record['claim'] for record in records if not record['supported']]
+        settled = ", ".join(f"{tier} {count}" for tier, count in resolved_by.items() if count)
+        print(f"   ✓ {len(records)} claims settled ({settled or 'none'}), {len(unsupported)} unsupported")
+        return {'claims': records, 'unsupported': unsupported, 'resolved_by': resolved_by}
+    
+    def check_claims_tiered(self, answer, documents):
+        """
+        Settle each claim with the cheapest tier that can
+        
+        1. Lexical: n-gram overlap and MiniLM cosine against the claim's best
+           source sentence settle clear paraphrases and clearly unrelated claims.
+        2. NLI: the remaining claims go through one batched cross-encoder call;
+           confident entailment scores settle them.
+        3. LLM: whatever is still ambiguous is judged in one llm_claims_validation
+           call, each claim against its best source sentence, with a verdict per claim.
+        """
+        print("🪜 Tiered claim validation...")
+        start_time = time.perf_counter()
+        
+        records = self._resolve_claims(self.extract_claims(answer), documents)
+        unresolved = [record for record in records if record['tier'] is None]
+        if unresolved:
+            llm_start = time.perf_counter()
+            verdict = self.llm_claims_validation(unresolved)
+            self._settle_with_llm(unresolved, verdict, llm_start)
+        
+        return self._tiered_result(records, start_time)
+    
+    async def acheck_claims_tiered(self, answer, documents):
+        """Async version of check_claims_tiered (model tiers run off the event loop)"""
+        print("🪜 Tiered claim validation...")
+        start_time = time.perf_counter()
+        
+        records = await asyncio.to_thread(self._resolve_claims, self.extract_claims(answer), documents)
+        unresolved = [record for record in records if record['tier'] is None]
+        if unresolved:
+            llm_start = time.perf_counter()
+            verdict = await self.allm_claims_validation(unresolved)
+            self._settle_with_llm(unresolved, verdict, llm_start)
+        
+        return self._tiered_result(records, start_time)
+    
+    def run_check(self, check, answer, documents):
+        """Run one validation check; results feed combine_checks"""
+        if check == "citations":
+            return self.check_citations(answer, [doc['source'] for doc in documents])
+        if check == "nli":
+            return self.check_hallucinations(answer, documents)
+        if check == "tiered":
+            return self.check_claims_tiered(answer, documents)
+        return self.llm_validation(answer, documents)
+    
+    async def arun_check(self, check, answer, documents):
+        """Async version of run_check (model checks run off the event loop)"""
+        if check == "citations":
+            return self.check_citations(answer, [doc['source'] for doc in documents])
+        if check == "nli":
+            return await self.acheck_hallucinations(answer, documents)
+        if check == "tiered":
+            return await self.acheck_claims_tiered(answer, documents)
+        return await self.allm_validation(answer, documents)
+    
+    @staticmethod
+    def _parse_llm_verdict(text):
+        """VALID / CONFIDENCE fields of an llm_validation response (None when absent)"""
+        valid = re.search(r'VALID:\s*(yes|no)', text, re.IGNORECASE)
+        confidence = re.search(r'CONFIDENCE:\s*(\d+)', text)
+        return (
+            valid.group(1).lower() == 'yes' if valid else None,
+            min(int(confidence.group(1)), 100) if confidence else None
+        )
+    
+    def combine_checks(self, documents, checks):
+        """
+        Merge per-check results into one verdict
+        
+        Without checks this is the simplified policy (80% confidence, 50%
+        without sources). Each invalid citation or unsupported claim (from
+        the nli or tiered check) costs 10 points; an LLM verdict, when
+        present, overrides both.
+        """
+        tiered = checks.get('tiered', {'unsupported': [], 'resolved_by': {}})
+        hallucinations = checks.get('nli', [])
+        hallucinations = hallucinations + [claim for claim in tiered['unsupported'] if claim not in hallucinations]
+        citations = checks.get('citations', {'valid': [], 'invalid': []})
+        llm_text = checks.get('llm', '')
+        
+        is_valid = True
+        confidence = 80 if documents else 50
+        confidence = max(confidence - 10 * (len(citations['invalid']) + len(hallucinations)), 0)
+        
+        llm_valid, llm_confidence = self._parse_llm_verdict(llm_text)
+        if llm_valid is not None:
+            is_valid = llm_valid
+        if llm_confidence is not None:
+            confidence = llm_confidence
+        
+        return {
+            'hallucinations': hallucinations,
+            'citations': citations,
+            'llm_validation': llm_text,
+            'claim_tiers': tiered['resolved_by'],
+            'is_valid': is_valid,
+            'confidence': confidence
+        }
+    
+    @staticmethod
+    def _print_result(validation_result):
+        print("\n" + "=" * 70)
+        print("VALIDATION RESULT")
+        print("=" * 70)
+        print(f"Valid: {validation_result['is_valid']}")
+        print(f"Confidence: {validation_result['confidence']}%")
+        print("=" * 70 + "\n")
+    
     def validate(self, answer, documents):
-      """Main validation pipeline - SIMPLIFIED"""
-      print("\n" + "=" * 70)
-      print("VALIDATION PHASE")
-      print("=" * 70 + "\n")
-    
-      # Simple logic: if we have an answer, it's valid
-      is_valid = True
-      final_confidence = 80
-    
-      # Only decrease confidence if no sources
-      if not documents or len(documents) == 0:
-          final_confidence = 50
-    
-      validation_result = {
-          'hallucinations': [],
-          'citations': {'valid': [], 'invalid': []},
-          'llm_validation': '',
-          'is_valid': is_valid,
-          'confidence': final_confidence
-      }
-    
-      print("\n" + "=" * 70)
-      print("VALIDATION RESULT")
-      print("=" * 70)
-      print(f"Valid: {validation_result['is_valid']}")
-      print(f"Confidence: {validation_result['confidence']}%")
-      print("=" * 70 + "\n")
-    
-      return validation_result
+        """Main validation pipeline: run the configured checks and combine them"""
+        print("\n" + "=" * 70)
+        print("VALIDATION PHASE")
+        print("=" * 70 + "\n")
+        
+        start_time = time.perf_counter()
+        checks = {check: self.run_check(check, answer, documents) for check in self.checks}
+        validation_result = self.combine_checks(documents, checks)
+        self.latency.record('validate', time.perf_counter() - start_time)
+        self._print_result(validation_result)
+        
+        return validation_result
+
+    async def avalidate(self, answer, documents):
+        """Async version of validate; the configured checks run concurrently"""
+        print("\n" + "=" * 70)
+        print("VALIDATION PHASE")
+        print("=" * 70 + "\n")
+        
+        start_time = time.perf_counter()
+        results = await asyncio.gather(*(self.arun_check(check, answer, documents) for check in self.checks))
+        validation_result = self.combine_checks(documents, dict(zip(self.checks, results)))
+        self.latency.record('validate', time.perf_counter() - start_time)
+        self._print_result(validation_result)
+        
+        return validation_result
+
 # Test the agent
 if __name__ == "__main__":
     from dotenv import load_dotenv
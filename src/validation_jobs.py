@@ -0,0 +1,121 @@
+"""
+Validation Jobs
+Background validation of returned answers, with results published by request id
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+
+from cache_backends import make_backend
+from perf_stats import LatencyTracker
+
+# "sync" (default): every answer waits for validation, as /query always did
+# "async" (opt-in): answers are returned after synthesis with a pending
+# validation, which clients fetch from /validation/{request_id}
+VALIDATION_MODE = os.getenv("VALIDATION_MODE", "sync")
+# In async mode, query types (see query_classifier.QUERY_TYPES) still validated before answering
+SYNC_VALIDATION_TYPES = tuple(
+    query_type.strip() for query_type in os.getenv("SYNC_VALIDATION_TYPES", "factual").split(",")
+    if query_type.strip()
+)
+VALIDATION_WORKERS = int(os.getenv("VALIDATION_WORKERS", "4"))
+VALIDATION_RESULT_TTL = float(os.getenv("VALIDATION_RESULT_TTL", "3600"))
+# memory, or redis so any API worker can answer a status request
+VALIDATION_STORE_BACKEND = os.getenv("VALIDATION_STORE_BACKEND", "memory")
+VALIDATION_STORE_SIZE = 10000
+
+
+def pending_result(request_id):
+    """Placeholder validation_result for an answer whose validation is deferred"""
+    return {'status': 'pending', 'request_id': request_id, 'is_valid': None, 'confidence': None}
+
+
+class ValidationJobs:
+    def __init__(self, validation_agent, backend=None, workers=VALIDATION_WORKERS, ttl=VALIDATION_RESULT_TTL):
+        """
+        Run ValidationAgent.validate on a worker pool after the answer is sent
+
+        Each job's record ('pending', then 'done' or 'error') is stored under
+        its request id for VALIDATION_RESULT_TTL seconds.
+
+        Args:
+            validation_agent: ValidationAgent whose validate() is run
+            backend: Cache backend for the records (default from VALIDATION_STORE_BACKEND)
+            workers: Background validation threads
+            ttl: Seconds a record is kept
+        """
+        self.validation_agent = validation_agent
+        self.backend = backend or make_backend(
+            VALIDATION_STORE_BACKEND, prefix="kb:validation", max_entries=VALIDATION_STORE_SIZE, default_ttl=ttl
+        )
+        self.ttl = ttl
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="validation")
+        self.latency = LatencyTracker()
+        self._counts = {'submitted': 0, 'completed': 0, 'failed': 0}
+        self._lock = threading.Lock()
+
+    def _key(self, request_id):
+        return f"job:{request_id}"
+
+    def _count(self, outcome):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def submit(self, request_id, answer, documents, on_done=None):
+        """
+        Queue validation of an answer
+
+        Args:
+            on_done: Called with the validation result once it succeeds
+        """
+        self.backend.set(self._key(request_id), {'status': 'pending', 'submitted_at': time.time()}, ttl=self.ttl)
+        self._count('submitted')
+        self.executor.submit(self._run, request_id, answer, documents, on_done, time.perf_counter())
+
+    def _run(self, request_id, answer, documents, on_done, submitted_at):
+        start_time = time.perf_counter()
+        self.latency.record('queue_wait', start_time - submitted_at)
+        try:
+            result = self.validation_agent.validate(answer, documents)
+        except Exception as e:
+            print(f"❌ Background validation {request_id} failed: {e}")
+            self._count('failed')
+            self.backend.set(self._key(request_id), {'status': 'error', 'error': str(e)}, ttl=self.ttl)
+            return
+
+        result = self.record(request_id, result)
+        self.latency.record('validation', time.perf_counter() - start_time)
+        self._count('completed')
+        print(f"✅ Background validation {request_id}: confidence {result['confidence']}%")
+
+        if on_done is not None:
+            try:
+                on_done(result)
+            except Exception as e:
+                print(f"⚠️  Validation callback failed: {e}")
+
+    def record(self, request_id, result):
+        """
+        Store a finished validation result under a request id
+
+        Returns:
+            The result as published, with status 'done' and the request id
+        """
+        result = dict(result, status='done', request_id=request_id)
+        self.backend.set(self._key(request_id), {'status': 'done', 'result': result}, ttl=self.ttl)
+        return result
+
+    def status(self, request_id):
+        """Stored record for a request ('pending', 'done' with 'result', or 'error'); None if unknown"""
+        return self.backend.get(self._key(request_id))
+
+    def stats(self):
+        """Job counts plus queue wait and validation latency"""
+        with self._lock:
+            counts = dict(self._counts)
+        counts['pending'] = counts['submitted'] - counts['completed'] - counts['failed']
+        return dict(counts, latency=self.latency.summary(), sync_types=list(SYNC_VALIDATION_TYPES))
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
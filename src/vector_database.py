@@ -1,7 +1,10 @@
 import json
 import chromadb
-from sentence_transformers import SentenceTransformer
 from pathlib import Path
+from model_registry import get_encoder
+from sparse_index import bump_content_version, get_sparse_index_service
+from answer_cache import get_answer_cache
+from semantic_cache import get_semantic_cache
 
 class VectorDatabase:
     def __init__(self, db_path="data/vectordb", model_name="all-MiniLM-L6-v2"):
@@ -19,10 +22,8 @@ class VectorDatabase:
             metadata={"hnsw:space": "cosine"}
         )
         
-        # Load embedding model
-        print(f"📦 Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
-        print("✅ Model loaded!")
+        # Shared embedding model (reuses the process-wide copy if already loaded)
+        self.model = get_encoder(model_name)
     
     def load_documents(self, json_path):
         """Load documents from JSON file"""
@@ -71,8 +72,32 @@ class VectorDatabase:
             metadatas=metadatas
         )
         
+        # Saved BM25 indexes of the old contents are stale from here on
+        bump_content_version(self.collection)
+        # Keep an already-built BM25 index in step without a rebuild
+        get_sparse_index_service(self.collection).upsert_documents(ids, texts, metadatas)
+        self._invalidate_answers()
+        
         print(f"✅ Stored {len(documents)} documents in ChromaDB")
     
+    @staticmethod
+    def _invalidate_answers():
+        """Cached answers may cite changed documents"""
+        answer_cache = get_answer_cache()
+        if answer_cache is not None:
+            answer_cache.invalidate()
+        semantic_cache = get_semantic_cache()
+        if semantic_cache is not None:
+            semantic_cache.invalidate()
+    
+    def delete_documents(self, doc_ids):
+        """Delete documents from ChromaDB and the BM25 index"""
+        self.collection.delete(ids=list(doc_ids))
+        bump_content_version(self.collection)
+        removed = get_sparse_index_service(self.collection).delete_documents(doc_ids)
+        self._invalidate_answers()
+        print(f"🗑️  Deleted {len(doc_ids)} documents ({removed} from the BM25 index)")
+    
     def search(self, query, top_k=5):
         """Search for similar documents"""
         print(f"\n🔍 Searching for: '{query}'")
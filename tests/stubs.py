@@ -0,0 +1,99 @@
+"""
+Test stubs
+Deterministic stand-ins for the embedding model, cross-encoder and LLM client
+"""
+import re
+import threading
+import types
+import zlib
+
+import numpy as np
+
+from model_registry import ModelRegistry, _RegistryEntry
+
+
+def words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class StubEncoder:
+    """Hashed bag of words: texts sharing words get a high cosine"""
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in words(text):
+                vectors[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+        return vectors
+
+
+class StubCrossEncoder:
+    """Entailment score: share of the hypothesis' words found in the premise"""
+
+    def predict(self, pairs, **kwargs):
+        scores = []
+        for premise, hypothesis in pairs:
+            hypothesis_words = set(words(hypothesis))
+            scores.append(len(hypothesis_words & set(words(premise))) / max(len(hypothesis_words), 1))
+        return np.asarray(scores)
+
+
+class StubRegistry(ModelRegistry):
+    """Registry loading stub encoders; loads of "slow" wait for release_slow"""
+
+    def __init__(self):
+        super().__init__()
+        self.loads = []
+        self.slow_started = threading.Event()
+        self.release_slow = threading.Event()
+
+    def _load(self, model_name, device, precision, kind):
+        self.loads.append(model_name)
+        if model_name == "slow":
+            self.slow_started.set()
+            assert self.release_slow.wait(5)
+        return _RegistryEntry(StubCrossEncoder() if kind == "cross_encoder" else StubEncoder(), 0.0, 0.0)
+
+
+class StubCollection:
+    """The parts of a ChromaDB collection the sparse index uses"""
+
+    def __init__(self, name="documents"):
+        self.name = name
+        self.metadata = {"hnsw:space": "cosine"}
+        self.ids = ["a", "b", "c"]
+        self.documents = ["annual leave days", "vpn remote access", "gdpr data processing"]
+        self.metadatas = [{"source_file": f"{doc_id}.md"} for doc_id in self.ids]
+        self.reads = 0
+
+    def get(self, include=None, limit=None, offset=0):
+        self.reads += 1
+        return {'ids': list(self.ids), 'documents': list(self.documents), 'metadatas': list(self.metadatas)}
+
+    def modify(self, metadata=None):
+        assert not any(key.startswith("hnsw:") for key in metadata)
+        self.metadata = metadata
+
+
+def completion(content):
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))])
+
+
+class StubLLM:
+    """LLM gateway answering every request with reply(messages)"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.requests = []
+
+    def chat(self, **request):
+        self.requests.append(request)
+        return completion(self.reply(request['messages']))
+
+    async def achat(self, **request):
+        return self.chat(**request)
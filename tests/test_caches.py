@@ -0,0 +1,64 @@
+from answer_cache import AnswerCache
+from cache_backends import make_backend
+from semantic_cache import SemanticCache
+from stubs import StubEncoder
+
+QUERY = "How many days of annual leave do employees get?"
+
+
+def make_state(answer="Employees receive 25 days of annual leave per year."):
+    return {'final_answer': answer, 'request_id': "r1", 'metadata': {}}
+
+
+def test_answer_cache_ignores_case_and_trailing_punctuation():
+    cache = AnswerCache(make_backend("memory", prefix="test"))
+    cache.set(QUERY, make_state(), pipeline_time=2.0)
+
+    assert cache.get("how many days of  annual leave do employees get")['final_answer'].startswith("Employees")
+    assert cache.get("How many days of sick leave do employees get?") is None
+
+
+def test_invalidation_reaches_every_cache_on_the_backend():
+    backend = make_backend("memory", prefix="test")
+    worker, other_worker = AnswerCache(backend), AnswerCache(backend)
+    worker.set(QUERY, make_state(), pipeline_time=2.0)
+    assert other_worker.get(QUERY) is not None
+
+    other_worker.invalidate()
+
+    assert worker.get(QUERY) is None
+    assert worker.index_version() == other_worker.index_version() == 1
+
+
+def test_cached_states_are_copies():
+    cache = AnswerCache(make_backend("memory", prefix="test"))
+    state = make_state()
+    cache.set(QUERY, state, pipeline_time=2.0)
+    state['metadata']['cache'] = "changed after caching"
+    cache.get(QUERY)['metadata']['cache'] = "hit"
+
+    assert cache.get(QUERY)['metadata'] == {}
+
+
+def test_semantic_cache_serves_paraphrases_but_not_changed_numbers():
+    cache = SemanticCache(StubEncoder(), threshold=0.8)
+    cache.store("annual leave days for employees in 2024", make_state())
+
+    state, match = cache.lookup("Employees: annual leave days in 2024?")
+    assert state['final_answer'].startswith("Employees")
+    assert match['similarity'] >= 0.8
+    assert cache.lookup("annual leave days for employees in 2023") is None
+    assert cache.lookup("sick leave rules for contractors") is None
+    assert cache.stats()['guard_rejections'] == 1
+
+
+def test_semantic_cache_empties_when_the_answer_cache_is_invalidated():
+    answer_cache = AnswerCache(make_backend("memory", prefix="test"))
+    cache = SemanticCache(StubEncoder(), threshold=0.9, version=answer_cache.index_version)
+    cache.store(QUERY, make_state())
+    assert cache.lookup(QUERY) is not None
+
+    answer_cache.invalidate()
+
+    assert cache.lookup(QUERY) is None
+    assert cache.stats()['entries'] == 0
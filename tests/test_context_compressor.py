@@ -0,0 +1,45 @@
+from context_compressor import ContextCompressor
+from context_packer import approximate_token_count
+from stubs import StubEncoder
+
+QUERY = "How many days of annual leave do employees receive?"
+DOCUMENTS = [
+    {'source': "leave.md", 'content': (
+        "Employees receive 25 days of annual leave per year. The office closes at six on Fridays. "
+        "Leave requests go to managers. Parking spaces are free for staff."
+    )},
+    {'source': "it.md", 'content': "Printers are on the second floor. Laptops are replaced every four years."},
+]
+
+
+def make_compressor(top_sentences, window):
+    return ContextCompressor(StubEncoder(), top_sentences=top_sentences, window=window,
+                             token_counter=approximate_token_count)
+
+
+def test_keeps_the_best_sentences_and_marks_gaps():
+    compressed, stats = make_compressor(top_sentences=2, window=0).compress(QUERY, DOCUMENTS)
+
+    assert compressed == [dict(DOCUMENTS[0], content=(
+        "Employees receive 25 days of annual leave per year. ... Leave requests go to managers."
+    ))]
+    assert (stats['sentences'], stats['kept_sentences']) == (6, 2)
+
+
+def test_window_keeps_neighbours_from_the_same_document_only():
+    compressed, stats = make_compressor(top_sentences=1, window=1).compress("Parking spaces for staff", DOCUMENTS)
+
+    assert [doc['content'] for doc in compressed] == [
+        "Leave requests go to managers. Parking spaces are free for staff."
+    ]
+    assert stats['kept_sentences'] == 2
+
+
+def test_prompt_savings_are_capped_by_the_budget():
+    compressor = make_compressor(top_sentences=2, window=0)
+    _, stats = compressor.compress(QUERY, DOCUMENTS)
+    _, capped = compressor.compress(QUERY, DOCUMENTS, budget=stats['compressed_tokens'] + 5)
+
+    assert stats['prompt_tokens_saved'] == stats['original_tokens'] - stats['compressed_tokens']
+    assert capped['prompt_tokens_saved'] == 5
+    assert compressor.stats()['requests'] == 2
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from hybrid_search import BM25Index, HybridSearch, tokenize
+
+WORDS = [f"w{i}" for i in range(60)]
+QUERIES = ["w1", "w2 w3", "w0 w7 w7", "w5 w11 w40 w59", "w13 missing"]
+
+
+def make_corpus(num_docs, seed=0):
+    """Documents with Zipf-like word frequencies, so idf varies and some terms are very common"""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(WORDS) + 1)
+    weights /= weights.sum()
+    return [" ".join(rng.choice(WORDS, size=rng.integers(3, 30), p=weights)) for _ in range(num_docs)]
+
+
+def scores_by_id(results):
+    return {result['doc_id']: result['score'] for result in results}
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_scores_match_rank_bm25(query):
+    tokenized = [tokenize(doc) for doc in make_corpus(300)]
+    expected = BM25Okapi(tokenized).get_scores(tokenize(query))
+
+    np.testing.assert_allclose(BM25Index(tokenized).get_scores(tokenize(query)), expected, atol=1e-9)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_block_max_matches_exhaustive(query):
+    index = BM25Index([tokenize(doc) for doc in make_corpus(500)])
+    for top_k in (1, 5, 20):
+        docs, scores = index.search(tokenize(query), top_k, "exhaustive")
+        pruned_docs, pruned_scores = index.search(tokenize(query), top_k, "block_max")
+
+        np.testing.assert_allclose(pruned_scores, scores)
+        np.testing.assert_array_equal(pruned_docs, docs)
+
+
+def assert_same_results(index, rebuilt, top_k=10):
+    """Same scores as a full rebuild, for every returned document and in the same order"""
+    for query in QUERIES:
+        expected = scores_by_id(rebuilt.bm25_search(query, len(rebuilt)))
+        results = index.bm25_search(query, top_k)
+        assert [result['score'] for result in results] == pytest.approx(sorted(expected.values(), reverse=True)[:top_k])
+        for doc_id, score in scores_by_id(results).items():
+            assert score == pytest.approx(expected[doc_id])
+
+
+def test_incremental_updates_match_a_rebuild():
+    corpus = make_corpus(300)
+    ids = [f"doc{i}" for i in range(len(corpus))]
+    index = HybridSearch(corpus[:200], doc_ids=ids[:200])
+
+    index.add_documents(ids[200:], corpus[200:])
+    index.delete_documents(ids[:20] + ["unknown"])
+    index.update_documents(ids[50:55], ["w1 w2 w3 new"] * 5)
+    live = dict(zip(ids, corpus))
+    for doc_id in ids[:20]:
+        del live[doc_id]
+    live.update({doc_id: "w1 w2 w3 new" for doc_id in ids[50:55]})
+    rebuilt = HybridSearch(list(live.values()), doc_ids=list(live))
+
+    assert len(index) == len(rebuilt)
+    assert index.has_term("new") and not index.has_term("missing")
+    assert_same_results(index, rebuilt)
+
+    index.merge()
+    assert not index.has_pending_changes()
+    assert_same_results(index, rebuilt)
+
+
+def test_deleting_every_occurrence_removes_the_term():
+    index = HybridSearch(["annual leave", "vpn access", "rare term"], doc_ids=["a", "b", "c"])
+    index.delete_documents(["c"])
+
+    assert not index.has_term("rare")
+    assert index.bm25_search("rare") == []
+    index.merge()
+    assert not index.has_term("rare")
+    assert [result['doc_id'] for result in index.bm25_search("vpn")] == ["b"]
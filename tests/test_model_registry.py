@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from model_registry import EncoderHandle
+from stubs import StubRegistry
+
+
+def test_loading_one_model_does_not_block_others():
+    registry = StubRegistry()
+    fast = registry.acquire("fast")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        slow = executor.submit(registry.acquire, "slow")
+        assert registry.slow_started.wait(5)
+        assert registry.acquire("fast") is fast
+        assert registry.is_loaded("fast") and not registry.is_loaded("slow")
+        registry.release_slow.set()
+        slow.result(5)
+
+    assert registry.loads == ["fast", "slow"]
+
+
+def test_concurrent_acquires_load_once():
+    registry = StubRegistry()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        models = list(executor.map(lambda _: registry.acquire("model"), range(8)))
+
+    assert registry.loads == ["model"]
+    assert all(model is models[0] for model in models)
+    assert registry.stats()[0]['refcount'] == 8
+
+
+def test_handle_reloads_after_forced_free():
+    registry = StubRegistry()
+    handle = EncoderHandle(registry, "model")
+    first = handle.model
+
+    assert registry.free(force=True) == 1
+    assert not handle.loaded
+
+    handle.encode(["annual leave"])
+    assert handle.model is not first
+    assert registry.loads == ["model", "model"]
+    assert registry.stats()[0]['refcount'] == 1
+
+    handle.release()
+    assert registry.stats()[0]['refcount'] == 0
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import types
+
+import pytest
+
+from agent_orchestrator import AgentOrchestrator
+from answer_cache import AnswerCache
+from cache_backends import make_backend
+from perf_stats import LatencyTracker
+from validation_agent import VALIDATION_CHECKS_AVAILABLE, ValidationAgent
+from validation_jobs import ValidationJobs
+from stubs import StubCrossEncoder, StubEncoder, StubLLM
+
+DOCUMENT = "Employees receive 25 days of annual leave per year. Unused leave expires in March."
+
+
+class StubQueryAgent:
+    def reformulate_query(self, query):
+        return query
+
+    async def areformulate_query(self, query):
+        return query
+
+
+class StubRetrievalAgent:
+    def __init__(self, query_type='factual'):
+        self.embedding_model = StubEncoder()
+        self.latency = LatencyTracker()
+        self.query_type = query_type
+
+    def plan_retrieval(self, query, top_k=5):
+        return {'type': self.query_type, 'top_k': 3, 'sources': ['vector', 'bm25'], 'weights': [0.5, 0.5]}
+
+    async def aplan_retrieval(self, query, top_k=5):
+        return self.plan_retrieval(query, top_k)
+
+    def _results(self, top_k):
+        return {name: [{'doc_id': 'd1', 'content': DOCUMENT, 'source': 'leave.md', 'score': 0.9}][:top_k]
+                for name in ('vector', 'bm25')}
+
+    def search_sources(self, query, top_k=5):
+        return self._results(top_k), {}
+
+    async def asearch_sources(self, query, top_k=5):
+        return self.search_sources(query, top_k)
+
+    def search_source(self, name, query, top_k=5):
+        return self._results(top_k)[name], None
+
+    async def asearch_source(self, name, query, top_k=5):
+        return self.search_source(name, query, top_k)
+
+    def fuse_results(self, source_results, plan):
+        return [results[0] for results in source_results.values() if results][:1]
+
+
+class StubSynthesisAgent:
+    answer = "Employees receive 25 days of annual leave per year [Source: leave.md]."
+
+    def synthesize(self, query, documents):
+        return self.answer
+
+    async def astream_synthesize(self, query, documents):
+        for part in self.answer.split(" "):
+            yield part + " "
+
+
+def llm_reply(messages):
+    if "CLAIM 1" in messages[0]['content']:
+        return "CLAIM 1: SUPPORTED"
+    return "VALID: yes\nCONFIDENCE: 90\nISSUES: none\nREASONING: supported"
+
+
+def make_orchestrator(checks, query_type='factual'):
+    validation_agent = ValidationAgent(groq_api_key="test", checks=checks)
+    validation_agent.encoder = StubEncoder()
+    validation_agent.nli_model = StubCrossEncoder()
+    validation_agent.llm = StubLLM(llm_reply)
+    rag = types.SimpleNamespace(
+        query_agent=StubQueryAgent(),
+        retrieval_agent=StubRetrievalAgent(query_type),
+        synthesis_agent=StubSynthesisAgent(),
+        validation_agent=validation_agent
+    )
+    orchestrator = AgentOrchestrator(rag)
+    orchestrator.cache = orchestrator.semantic_cache = None
+    return orchestrator
+
+
+@pytest.mark.parametrize("check", VALIDATION_CHECKS_AVAILABLE)
+def test_every_check_runs_in_the_graph(check):
+    orchestrator = make_orchestrator((check,))
+    state = orchestrator.run("How many days of annual leave do employees get?")
+
+    assert set(state["validation_checks"]) == {check}
+    assert state["validation_result"]["status"] == "done"
+    assert state["final_answer"] == StubSynthesisAgent.answer
+
+
+@pytest.mark.parametrize("check", VALIDATION_CHECKS_AVAILABLE)
+def test_every_check_runs_in_the_async_graph(check):
+    orchestrator = make_orchestrator((check,))
+    state = asyncio.run(orchestrator.arun("How many days of annual leave do employees get?"))
+
+    assert set(state["validation_checks"]) == {check}
+    assert state["validation_result"]["status"] == "done"
+
+
+def test_answers_are_validated_before_returning_by_default():
+    orchestrator = make_orchestrator(("citations",), query_type='conceptual')
+    state = orchestrator.run("Why does the company offer annual leave?")
+
+    assert orchestrator.validation_jobs is None
+    assert state["validation_result"]["status"] == "done"
+
+
+def with_validation_jobs(orchestrator):
+    orchestrator.validation_jobs = ValidationJobs(
+        orchestrator.rag.validation_agent, backend=make_backend("memory", prefix="test:validation")
+    )
+    return orchestrator
+
+
+@pytest.mark.parametrize("query_type, status", [('factual', "done"), ('conceptual', "pending")])
+def test_async_mode_defers_validation_by_query_type(query_type, status):
+    orchestrator = with_validation_jobs(make_orchestrator(("citations",), query_type=query_type))
+    state = orchestrator.run("How many days of annual leave do employees get?")
+
+    assert state["validation_result"]["status"] == status
+    assert bool(state["validation_checks"]) == (status == "done")  # deferred runs skip the check nodes
+    orchestrator.validation_jobs.shutdown()
+
+
+def test_deferred_validation_is_published_and_cached_once_done():
+    orchestrator = with_validation_jobs(make_orchestrator(("citations",), query_type='conceptual'))
+    orchestrator.cache = AnswerCache(make_backend("memory", prefix="test"))
+    validation_agent = orchestrator.rag.validation_agent
+    validate, released = validation_agent.validate, threading.Event()
+    validation_agent.validate = lambda answer, documents: released.wait(5) and validate(answer, documents)
+    query = "Why does the company offer annual leave?"
+
+    state = orchestrator.run(query)
+    assert orchestrator.cache.get(query) is None  # not cached while pending
+    released.set()
+    orchestrator.validation_jobs.shutdown()
+
+    record = orchestrator.validation_status(state["request_id"])
+    assert record["status"] == "done"
+    assert orchestrator.cache.get(query)["validation_result"] == record["result"]
+
+
+def test_cache_hit_gets_its_own_request_id():
+    orchestrator = make_orchestrator(("citations",))
+    orchestrator = with_validation_jobs(orchestrator)
+    orchestrator.cache = AnswerCache(make_backend("memory", prefix="test"))
+    query = "How many days of annual leave do employees get?"
+
+    first = orchestrator.run(query)
+    hit = orchestrator.run(query)
+
+    assert hit["metadata"]["cache"] == "hit"
+    assert hit["request_id"] != first["request_id"]
+    assert hit["metadata"]["cached_request_id"] == first["request_id"]
+    assert hit["validation_result"]["request_id"] == hit["request_id"]
+    record = orchestrator.validation_status(hit["request_id"])
+    assert record["status"] == "done"
+    assert record["result"]["confidence"] == first["validation_result"]["confidence"]
+    orchestrator.validation_jobs.shutdown()
+
+
+class FailingSynthesisAgent(StubSynthesisAgent):
+    def synthesize(self, query, documents):
+        raise RuntimeError("connection reset")
+
+    async def astream_synthesize(self, query, documents):
+        yield "Employees receive "
+        raise RuntimeError("connection reset")
+
+
+def test_failed_stream_is_flagged_and_not_cached():
+    orchestrator = make_orchestrator(("citations",))
+    orchestrator.rag.synthesis_agent = FailingSynthesisAgent()
+    orchestrator.cache = AnswerCache(make_backend("memory", prefix="test"))
+    query = "How many days of annual leave do employees get?"
+
+    async def stream():
+        return [event async for event in orchestrator.astream(query)]
+
+    events = asyncio.run(stream())
+    tokens = "".join(data['text'] for event, data in events if event == "token")
+    validation = [data for event, data in events if event == "validation"][-1]
+
+    assert tokens.startswith("Employees receive Error generating answer")
+    assert validation['status'] == "error"
+    assert orchestrator.cache.get(query) is None
+
+
+def test_failed_synthesis_skips_validation_and_cache():
+    orchestrator = make_orchestrator(("citations",))
+    orchestrator.rag.synthesis_agent = FailingSynthesisAgent()
+    orchestrator.cache = AnswerCache(make_backend("memory", prefix="test"))
+    query = "How many days of annual leave do employees get?"
+
+    state = orchestrator.run(query)
+
+    assert state["metadata"]["synthesis_error"] == "connection reset"
+    assert state["validation_checks"] == {}
+    assert orchestrator.cache.get(query) is None
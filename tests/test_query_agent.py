@@ -0,0 +1,20 @@
+from hybrid_search import tokenize
+from query_agent import QueryUnderstandingAgent, query_terms
+from sparse_index import SparseIndexService
+from stubs import StubCollection
+
+
+def test_query_terms_match_the_index_tokens():
+    assert tokenize("How many days of (annual) leave?") == ["how", "many", "days", "of", "annual", "leave"]
+    assert query_terms("How many days of (annual) leave?") == ["many", "days", "annual", "leave"]
+
+
+def test_punctuated_terms_count_as_indexed():
+    collection = StubCollection()
+    collection.documents = ["Annual leave: 25 days.", "VPN (remote access) setup!", "GDPR, data processing?"]
+    agent = QueryUnderstandingAgent(groq_api_key="test", sparse_index=SparseIndexService(collection))
+
+    specificity = agent.specificity("GDPR data processing for remote access?")
+
+    assert specificity['coverage'] == 1.0
+    assert specificity['specific']
@@ -0,0 +1,42 @@
+import asyncio
+
+from query_classifier import QueryClassifier
+from retrieval_agent import RetrievalAgent
+from stubs import StubCollection, StubEncoder, StubLLM
+
+
+def make_agent(name):
+    agent = RetrievalAgent(StubCollection(name), groq_api_key="test", classifier="llm")
+    agent.classifier = QueryClassifier(StubEncoder())
+    agent.llm = StubLLM(lambda messages: "TYPE: procedural\nNEED: step-by-step guide\nSTRATEGY: narrow")
+    return agent
+
+
+def test_llm_label_is_used_for_the_repeat_query():
+    agent = make_agent("retrieval-sync")
+    query = "How do I request annual leave?"
+
+    assert agent.plan_retrieval(query)['classification']['classifier'] == 'local'
+    agent.classification_executor.shutdown(wait=True)
+
+    plan = agent.plan_retrieval(query)
+    assert plan['classification'] == {'type': 'procedural', 'confidence': 1.0, 'classifier': 'llm'}
+    assert len(agent.llm.requests) == 1
+
+
+def test_async_plan_asks_the_llm_on_the_event_loop():
+    agent = make_agent("retrieval-async")
+    agent.classification_executor.shutdown()  # submitting to it would raise
+    query = "How do I request annual leave?"
+
+    async def run():
+        first = await agent.aplan_retrieval(query)
+        assert len(agent._llm_tasks) == 1
+        await asyncio.gather(*agent._llm_tasks)
+        return first, await agent.aplan_retrieval(query)
+
+    first, second = asyncio.run(run())
+    assert first['classification']['classifier'] == 'local'
+    assert second['classification']['classifier'] == 'llm'
+    assert second['type'] == 'procedural'
+    assert len(agent.llm.requests) == 1
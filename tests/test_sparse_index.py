@@ -0,0 +1,53 @@
+import os
+
+from sparse_index import CONTENT_VERSION_KEY, SparseIndexService, bump_content_version
+from stubs import StubCollection
+
+
+def snapshots(index_dir):
+    return sorted(entry for entry in os.listdir(index_dir) if os.path.isdir(os.path.join(index_dir, entry)))
+
+
+def test_saved_index_loads_without_reading_the_collection(tmp_path):
+    collection = StubCollection()
+    SparseIndexService(collection, index_dir=str(tmp_path)).get_index()
+    assert collection.metadata[CONTENT_VERSION_KEY]
+
+    collection.reads = 0
+    service = SparseIndexService(collection, index_dir=str(tmp_path))
+    index = service.get_index()
+
+    assert service.loaded_from_disk
+    assert collection.reads == 0
+    assert index.bm25_search("vpn", 1)[0]['doc_id'] == "b"
+
+
+def test_bumped_version_rebuilds_the_saved_index(tmp_path):
+    collection = StubCollection()
+    SparseIndexService(collection, index_dir=str(tmp_path)).get_index()
+
+    collection.documents[1] = "changed vpn policy"
+    bump_content_version(collection)
+    service = SparseIndexService(collection, index_dir=str(tmp_path))
+    index = service.get_index()
+
+    assert not service.loaded_from_disk
+    assert index.bm25_search("changed", 1)[0]['doc_id'] == "b"
+    assert SparseIndexService(collection, index_dir=str(tmp_path))._build().bm25_search("changed", 1)
+
+
+def test_saving_keeps_the_previous_snapshot_only(tmp_path):
+    collection = StubCollection()
+    service = SparseIndexService(collection, index_dir=str(tmp_path))
+    service.get_index()
+    first = snapshots(tmp_path)
+    os.makedirs(tmp_path / "v0-abandoned")
+
+    for _ in range(2):
+        bump_content_version(collection)
+        service.rebuild()
+
+    remaining = snapshots(tmp_path)
+    current = (tmp_path / "CURRENT").read_text()
+    assert len(remaining) == 2 and current in remaining
+    assert first[0] not in remaining and "v0-abandoned" not in remaining
@@ -0,0 +1,108 @@
+from model_registry import EncoderHandle
+from stubs import StubCrossEncoder, StubEncoder, StubLLM, StubRegistry
+from validation_agent import ValidationAgent, evidence_windows, nli_support_scores
+
+DOCUMENTS = [
+    {'source': "leave.md", 'content': "Employees receive 25 days of annual leave per year. Leave requests go to managers."},
+    {'source': "vpn.md", 'content': "Remote VPN access requires approval. The VPN uses multi-factor authentication."},
+]
+
+
+class CountingCrossEncoder(StubCrossEncoder):
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, **kwargs):
+        self.calls.append(len(pairs))
+        return super().predict(pairs, **kwargs)
+
+
+def make_agent(checks, reply=lambda messages: ""):
+    agent = ValidationAgent(groq_api_key="test", checks=checks)
+    agent.encoder = StubEncoder()
+    agent.nli_model = CountingCrossEncoder()
+    agent.llm = StubLLM(reply)
+    return agent
+
+
+def test_evidence_windows_cover_each_document_separately():
+    documents = [{'content': " ".join(f"a{i}" for i in range(200))}, {'content': "short document"}, {'content': ""}]
+    windows = evidence_windows(documents, window_words=128, stride=96)
+
+    assert [len(window.split()) for window in windows] == [128, 128, 2]
+    assert windows[1].split()[-1] == "a199"
+    assert windows[2] == "short document"
+
+
+def test_nli_scores_every_claim_window_pair_in_one_call():
+    model = CountingCrossEncoder()
+    claims = ["Remote VPN access requires approval", "Employees receive annual leave", "The cafeteria serves pizza"]
+
+    scores = nli_support_scores(model, claims, DOCUMENTS)
+
+    assert model.calls == [len(claims) * len(DOCUMENTS)]
+    assert list(scores) == [1.0, 1.0, 0.25]
+
+
+def test_hallucination_check_flags_unsupported_claims():
+    agent = make_agent(("nli",))
+    answer = "Employees receive 25 days of annual leave [Source: leave.md]. The cafeteria serves vegan pizza on Fridays."
+
+    assert agent.check_hallucinations(answer, DOCUMENTS) == ["The cafeteria serves vegan pizza on Fridays"]
+
+
+def test_models_load_only_for_the_checks_that_use_them():
+    registry = StubRegistry()
+    agent = ValidationAgent(groq_api_key="test", checks=("citations",))
+    agent.encoder = EncoderHandle(registry, "encoder")
+    agent.nli_model = EncoderHandle(registry, "nli", kind="cross_encoder")
+
+    agent.prewarm()
+    result = agent.validate("Employees receive 25 days of annual leave [Source: leave.md].", DOCUMENTS)
+
+    assert result['is_valid']
+    assert registry.loads == []
+    assert not agent.backend_status()['nli_loaded']
+
+    agent.checks = ("nli",)
+    agent.prewarm()
+    assert registry.loads == ["nli"]
+    assert agent.backend_status()['nli_loaded']
+
+
+def judge(verdict):
+    """LLM reply giving the same verdict for every claim in the request"""
+    def reply(messages):
+        count = messages[0]['content'].count("EVIDENCE ")
+        return "\n".join(f"CLAIM {i}: {verdict}" for i in range(1, count + 1))
+    return reply
+
+
+TIERED_ANSWER = (
+    "Remote VPN access requires approval [Source: vpn.md]. "          # verbatim: lexical, supported
+    "The cafeteria serves vegan pizza on Fridays. "                   # unrelated: lexical, unsupported
+    "Employees send leave requests to managers. "                     # paraphrase: NLI, supported
+    "Employees receive annual leave and free lunch."                  # partly supported: left to the LLM
+)
+
+
+def test_each_claim_is_settled_by_the_cheapest_tier():
+    agent = make_agent(("tiered",), reply=judge("UNSUPPORTED"))
+    result = agent.check_claims_tiered(TIERED_ANSWER, DOCUMENTS)
+
+    tiers = [(record['tier'], record['supported']) for record in result['claims']]
+    assert tiers == [('lexical', True), ('lexical', False), ('nli', True), ('llm', False)]
+    assert result['resolved_by'] == {'lexical': 2, 'nli': 1, 'llm': 1, 'unresolved': 0}
+    assert agent.nli_model.calls == [2 * len(DOCUMENTS)]  # only the two ambiguous claims
+    assert agent.llm.requests[0]['messages'][0]['content'].count("EVIDENCE ") == 1
+    assert result['unsupported'] == ["The cafeteria serves vegan pizza on Fridays",
+                                     "Employees receive annual leave and free lunch"]
+
+
+def test_claims_without_an_llm_verdict_count_as_unsupported():
+    agent = make_agent(("tiered",))
+    result = agent.check_claims_tiered("Employees receive annual leave and free lunch.", DOCUMENTS)
+
+    assert result['resolved_by']['unresolved'] == 1
+    assert result['unsupported'] == ["Employees receive annual leave and free lunch"]
+    assert agent.stats()['resolved_fraction']['unresolved'] == 1.0